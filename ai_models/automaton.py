@@ -0,0 +1,107 @@
+"""
+多模式字串比對 - Aho-Corasick 自動機
+所有關鍵字編譯成一個自動機，對文本只掃描一次即可找出全部出現位置
+"""
+
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+
+class AhoCorasick:
+    """Aho-Corasick 多模式比對自動機"""
+
+    def __init__(self, patterns: Iterable[str]):
+        """
+        編譯自動機
+
+        Args:
+            patterns: 要比對的字串（空字串會被忽略，重複的字串只保留一份）
+        """
+        self.patterns: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Tuple[int, ...]] = [()]
+
+        for pattern in patterns:
+            if pattern and pattern not in self._index:
+                self._index[pattern] = len(self.patterns)
+                self.patterns.append(pattern)
+                self._insert(pattern)
+        self._build_failure_links()
+
+    def _insert(self, pattern: str):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            state = next_state
+        self._output[state] = (self._index[pattern],)
+
+    def _build_failure_links(self):
+        """以 BFS 建立失敗連結，並把失敗鏈上的輸出合併到每個狀態，比對時不需再沿鏈回溯"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[next_state] = target
+                if self._output[target]:
+                    self._output[next_state] = self._output[next_state] + self._output[target]
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def __contains__(self, pattern: str) -> bool:
+        return pattern in self._index
+
+    def pattern_index(self, pattern: str) -> int:
+        """回傳 pattern 的索引，不存在時拋出 KeyError"""
+        return self._index[pattern]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int]]:
+        """
+        逐一產出比對結果（允許重疊）
+
+        Args:
+            text: 輸入文本
+
+        Returns:
+            (起始位置, pattern 索引) 的迭代器，依結束位置排序
+        """
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        patterns = self.patterns
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in output[state]:
+                yield position - len(patterns[index]) + 1, index
+
+    def find_all(self, text: str) -> List[Tuple[int, str]]:
+        """
+        找出所有出現位置
+
+        Args:
+            text: 輸入文本
+
+        Returns:
+            [(起始位置, pattern), ...]
+        """
+        return [(start, self.patterns[index]) for start, index in self.iter_matches(text)]
+
+    def matched_indices(self, text: str) -> set:
+        """回傳文本中出現過的 pattern 索引集合"""
+        return {index for _, index in self.iter_matches(text)}
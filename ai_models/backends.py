@@ -0,0 +1,484 @@
+"""
+ChatModel 後端 - 負責實際產生模型回應
+Mock 後端用於離線測試，HTTP 後端用於連接真實的 LLM API（OpenAI 相容格式）
+"""
+
+import random
+import asyncio
+import importlib.util
+import logging
+import json
+import threading
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple, Union
+
+from ai_models.clock import Clock, SystemClock
+from ai_models.deadline import remaining_time
+from ai_models.intent_router import IntentRouter
+from ai_models.latency_model import FailureModel, FixedLatency, LatencyModel
+from ai_models.streaming import split_tokens
+
+try:
+    import httpx
+except ImportError:  # httpx 為選用依賴，只有 HttpxBackend 需要
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+
+class ChatBackend:
+    """聊天後端介面，ChatModel 透過此介面取得回應"""
+
+    def complete(
+        self, messages: List[Dict[str, str]], model_name: str, temperature: float, context: Optional[Dict] = None
+    ) -> str:
+        """
+        產生回應
+
+        Args:
+            messages: 對話訊息列表，最後一則為本輪的用戶輸入
+            model_name: 模型名稱
+            temperature: 溫度參數
+            context: 可選的上下文資訊
+
+        Returns:
+            模型的回應文本
+        """
+        raise NotImplementedError
+
+    async def acomplete(
+        self, messages: List[Dict[str, str]], model_name: str, temperature: float, context: Optional[Dict] = None
+    ) -> str:
+        """complete 的非同步版本，預設在執行緒中執行同步實作"""
+        return await asyncio.to_thread(self.complete, messages, model_name, temperature, context)
+
+    def complete_batch(
+        self,
+        batch_messages: List[List[Dict[str, str]]],
+        model_name: str,
+        temperature: float,
+        contexts: Optional[List[Optional[Dict]]] = None,
+    ) -> List[str]:
+        """
+        批次產生回應，預設逐筆呼叫 complete；支援批次的後端可覆寫為單次往返
+
+        Args:
+            batch_messages: 每筆請求的對話訊息列表
+            model_name: 模型名稱
+            temperature: 溫度參數
+            contexts: 每筆請求的上下文資訊
+
+        Returns:
+            與輸入順序一致的回應列表
+        """
+        contexts = contexts or [None] * len(batch_messages)
+        return [
+            self.complete(messages, model_name, temperature, context)
+            for messages, context in zip(batch_messages, contexts)
+        ]
+
+    async def acomplete_batch(
+        self,
+        batch_messages: List[List[Dict[str, str]]],
+        model_name: str,
+        temperature: float,
+        contexts: Optional[List[Optional[Dict]]] = None,
+    ) -> List[str]:
+        """complete_batch 的非同步版本，預設在執行緒中執行同步實作"""
+        return await asyncio.to_thread(self.complete_batch, batch_messages, model_name, temperature, contexts)
+
+    def stream(
+        self, messages: List[Dict[str, str]], model_name: str, temperature: float, context: Optional[Dict] = None
+    ) -> Iterator[str]:
+        """
+        串流產生回應，預設將完整回應作為單一片段輸出
+
+        Returns:
+            回應文本片段的迭代器
+        """
+        yield self.complete(messages, model_name, temperature, context)
+
+    async def astream(
+        self, messages: List[Dict[str, str]], model_name: str, temperature: float, context: Optional[Dict] = None
+    ) -> AsyncIterator[str]:
+        """stream 的非同步版本"""
+        yield await self.acomplete(messages, model_name, temperature, context)
+
+    def close(self):
+        """釋放後端資源"""
+
+    async def aclose(self):
+        """非同步釋放後端資源"""
+        self.close()
+
+
+class MockBackend(ChatBackend):
+    """Mock 後端，以關鍵字規則產生固定回應（規則見 intent_router.py）"""
+
+    def __init__(
+        self,
+        latency: Union[float, LatencyModel] = 0.01,
+        token_rate: Optional[float] = None,
+        router: Optional[IntentRouter] = None,
+        clock: Optional[Clock] = None,
+        failure_model: Optional[FailureModel] = None,
+        seed: Optional[int] = None,
+    ):
+        """
+        初始化 Mock 後端
+
+        Args:
+            latency: 模擬的處理時間（秒）或延遲模型（見 latency_model.py），串流時為首個 token 前的等待時間
+            token_rate: 串流時每秒輸出的 token 數（None 表示不延遲）
+            router: 意圖路由器，預設使用內建規則；可用 IntentRouter.from_yaml 載入 config/ 中的規則
+            clock: 模擬延遲使用的時鐘，傳入 VirtualClock 時不實際等待（見 clock.py）
+            failure_model: 故障模型，依比例注入逾時、5xx 錯誤與中斷的串流
+            seed: 延遲與故障取樣的亂數種子
+        """
+        self.latency_model = latency if isinstance(latency, LatencyModel) else FixedLatency(latency)
+        self.token_rate = token_rate
+        self.router = router or IntentRouter.default()
+        self.clock = clock or SystemClock()
+        self.failure_model = failure_model
+        self.rng = random.Random(seed)
+
+        # 統計資料
+        self._stats_lock = threading.Lock()
+        self.call_count = 0
+        self.injected_failures = {
+            FailureModel.TIMEOUT: 0, FailureModel.SERVER_ERROR: 0, FailureModel.PARTIAL_STREAM: 0
+        }
+
+    def _plan(self, batch_messages: List[List[Dict[str, str]]], streaming: bool = False) -> Tuple[float, Optional[str]]:
+        """
+        取樣本次往返的延遲與注入的故障（批次取最慢的一筆）
+
+        Returns:
+            (延遲秒數, 故障類型或 None)
+        """
+        latency = max(self.latency_model.sample(self.rng, messages) for messages in batch_messages)
+        failure = self.failure_model.draw(self.rng, streaming) if self.failure_model is not None else None
+        with self._stats_lock:
+            self.call_count += 1
+            if failure is not None:
+                self.injected_failures[failure] += 1
+        if failure == FailureModel.TIMEOUT and self.failure_model.timeout_after is not None:
+            latency = self.failure_model.timeout_after
+        return latency, failure
+
+    def _latency_within_deadline(self, latency: float) -> float:
+        remaining = remaining_time()
+        if remaining is not None and remaining < latency:
+            return max(0.0, remaining)
+        return latency
+
+    def _raise_failure(self, failure: Optional[str]):
+        if failure == FailureModel.TIMEOUT:
+            raise TimeoutError("模擬的請求逾時")
+        if failure == FailureModel.SERVER_ERROR:
+            raise self.failure_model.server_error(self.rng)
+
+    def _simulate_latency(self, latency: float, failure: Optional[str] = None):
+        """模擬處理時間與故障；超過呼叫期限時等到期限為止並拋出 TimeoutError"""
+        delay = self._latency_within_deadline(latency)
+        self.clock.sleep(delay)
+        if delay < latency:
+            raise TimeoutError("已超過請求期限")
+        self._raise_failure(failure)
+
+    async def _asimulate_latency(self, latency: float, failure: Optional[str] = None):
+        delay = self._latency_within_deadline(latency)
+        await self.clock.asleep(delay)
+        if delay < latency:
+            raise TimeoutError("已超過請求期限")
+        self._raise_failure(failure)
+
+    def _partial_stream_cutoff(self, tokens: List[str], failure: Optional[str]) -> Optional[int]:
+        """中斷的串流在第幾個 token 後斷線，正常串流回傳 None"""
+        if failure != FailureModel.PARTIAL_STREAM:
+            return None
+        return self.rng.randrange(len(tokens)) if tokens else 0
+
+    def complete(
+        self, messages: List[Dict[str, str]], model_name: str, temperature: float, context: Optional[Dict] = None
+    ) -> str:
+        # 模擬處理時間
+        self._simulate_latency(*self._plan([messages]))
+        return self.generate(messages[-1]["content"], context)
+
+    async def acomplete(
+        self, messages: List[Dict[str, str]], model_name: str, temperature: float, context: Optional[Dict] = None
+    ) -> str:
+        # 模擬處理時間（交還控制權給事件迴圈）
+        await self._asimulate_latency(*self._plan([messages]))
+        return self.generate(messages[-1]["content"], context)
+
+    def complete_batch(
+        self,
+        batch_messages: List[List[Dict[str, str]]],
+        model_name: str,
+        temperature: float,
+        contexts: Optional[List[Optional[Dict]]] = None,
+    ) -> List[str]:
+        # 整個批次只模擬一次往返
+        self._simulate_latency(*self._plan(batch_messages))
+        contexts = contexts or [None] * len(batch_messages)
+        return [self.generate(messages[-1]["content"], context) for messages, context in zip(batch_messages, contexts)]
+
+    async def acomplete_batch(
+        self,
+        batch_messages: List[List[Dict[str, str]]],
+        model_name: str,
+        temperature: float,
+        contexts: Optional[List[Optional[Dict]]] = None,
+    ) -> List[str]:
+        await self._asimulate_latency(*self._plan(batch_messages))
+        contexts = contexts or [None] * len(batch_messages)
+        return [self.generate(messages[-1]["content"], context) for messages, context in zip(batch_messages, contexts)]
+
+    def stream(
+        self, messages: List[Dict[str, str]], model_name: str, temperature: float, context: Optional[Dict] = None
+    ) -> Iterator[str]:
+        latency, failure = self._plan([messages], streaming=True)
+        self._simulate_latency(latency, failure)
+        interval = 1.0 / self.token_rate if self.token_rate else 0.0
+        tokens = split_tokens(self.generate(messages[-1]["content"], context))
+        cutoff = self._partial_stream_cutoff(tokens, failure)
+        for i, token in enumerate(tokens):
+            if i and interval:
+                self.clock.sleep(interval)
+            if i == cutoff:
+                raise ConnectionError("模擬的串流中斷")
+            yield token
+
+    async def astream(
+        self, messages: List[Dict[str, str]], model_name: str, temperature: float, context: Optional[Dict] = None
+    ) -> AsyncIterator[str]:
+        latency, failure = self._plan([messages], streaming=True)
+        await self._asimulate_latency(latency, failure)
+        interval = 1.0 / self.token_rate if self.token_rate else 0.0
+        tokens = split_tokens(self.generate(messages[-1]["content"], context))
+        cutoff = self._partial_stream_cutoff(tokens, failure)
+        for i, token in enumerate(tokens):
+            if i and interval:
+                await self.clock.asleep(interval)
+            if i == cutoff:
+                raise ConnectionError("模擬的串流中斷")
+            yield token
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        取得呼叫統計
+
+        Returns:
+            calls（後端往返次數）與各類注入的故障次數
+        """
+        with self._stats_lock:
+            return {"calls": self.call_count, **self.injected_failures}
+
+    def generate(self, prompt: str, context: Optional[Dict] = None) -> str:
+        """根據 prompt 產生回應 (Mock 規則)"""
+        # 空輸入處理
+        if not prompt.strip():
+            return "請輸入有效的內容"
+
+        return self.router.route(prompt)
+
+
+class HttpxBackend(ChatBackend):
+    """
+    基於 httpx 的 HTTP 後端（OpenAI 相容的 chat completion API）
+
+    pooled=True 時重複使用同一個 Client，keep-alive 連線會被連線池保留，
+    避免每次呼叫都重新進行 TCP/TLS 握手；pooled=False 則每次請求建立新連線，用於對照量測
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: Optional[str] = None,
+        endpoint: str = "/v1/chat/completions",
+        timeout: float = 30.0,
+        http2: bool = True,
+        pooled: bool = True,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+    ):
+        """
+        初始化 HTTP 後端
+
+        Args:
+            base_url: API 伺服器位址
+            api_key: API 金鑰（以 Bearer token 傳送）
+            endpoint: chat completion 路徑
+            timeout: 請求逾時（秒）
+            http2: 是否啟用 HTTP/2（需安裝 h2，未安裝時退回 HTTP/1.1）
+            pooled: 是否重複使用連線池
+            max_connections: 連線池最大連線數
+            max_keepalive_connections: 保留的 keep-alive 連線數
+            keepalive_expiry: keep-alive 連線閒置多久後關閉（秒）
+        """
+        if httpx is None:
+            raise ImportError("HttpxBackend 需要安裝 httpx：pip install httpx")
+
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("未安裝 h2 套件，HttpxBackend 改用 HTTP/1.1")
+            http2 = False
+
+        self.base_url = base_url.rstrip("/")
+        self.endpoint = endpoint
+        self.pooled = pooled
+        self.http2 = http2
+        self._headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self._timeout = httpx.Timeout(timeout)
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._client: Optional["httpx.Client"] = None
+        self._client_lock = threading.Lock()
+        self._async_client: Optional["httpx.AsyncClient"] = None
+        self._async_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _client_kwargs(self) -> Dict:
+        return {
+            "base_url": self.base_url,
+            "headers": self._headers,
+            "timeout": self._timeout,
+            "limits": self._limits,
+            "http2": self.http2,
+        }
+
+    def _build_payload(
+        self, messages: List[Dict[str, str]], model_name: str, temperature: float, stream: bool = False
+    ) -> Dict:
+        payload = {"model": model_name, "messages": messages, "temperature": temperature}
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    def _parse_response(self, response: "httpx.Response") -> str:
+        response.raise_for_status()
+        data = response.json()
+        return data["choices"][0]["message"]["content"]
+
+    def _parse_stream_line(self, line: str) -> Optional[str]:
+        """解析一行 SSE 資料，回傳內容片段；串流結束時回傳 None"""
+        if not line.startswith("data:"):
+            return ""
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return None
+        delta = json.loads(data)["choices"][0].get("delta", {})
+        return delta.get("content") or ""
+
+    def _request_timeout(self):
+        """依呼叫期限縮短單次請求的逾時"""
+        remaining = remaining_time()
+        if remaining is None:
+            return httpx.USE_CLIENT_DEFAULT
+        if remaining <= 0:
+            raise TimeoutError("已超過請求期限")
+        return httpx.Timeout(remaining)
+
+    def _get_client(self) -> "httpx.Client":
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = httpx.Client(**self._client_kwargs())
+        return self._client
+
+    def _get_async_client(self) -> "httpx.AsyncClient":
+        # AsyncClient 的連線綁定建立時的事件迴圈，換了迴圈就需要新的連線池
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            self._async_client = httpx.AsyncClient(**self._client_kwargs())
+            self._async_client_loop = loop
+        return self._async_client
+
+    def complete(
+        self, messages: List[Dict[str, str]], model_name: str, temperature: float, context: Optional[Dict] = None
+    ) -> str:
+        payload = self._build_payload(messages, model_name, temperature)
+        timeout = self._request_timeout()
+
+        if not self.pooled:
+            with httpx.Client(**self._client_kwargs()) as client:
+                return self._parse_response(client.post(self.endpoint, json=payload, timeout=timeout))
+
+        return self._parse_response(self._get_client().post(self.endpoint, json=payload, timeout=timeout))
+
+    async def acomplete(
+        self, messages: List[Dict[str, str]], model_name: str, temperature: float, context: Optional[Dict] = None
+    ) -> str:
+        payload = self._build_payload(messages, model_name, temperature)
+        timeout = self._request_timeout()
+
+        if not self.pooled:
+            async with httpx.AsyncClient(**self._client_kwargs()) as client:
+                return self._parse_response(await client.post(self.endpoint, json=payload, timeout=timeout))
+
+        client = self._get_async_client()
+        return self._parse_response(await client.post(self.endpoint, json=payload, timeout=timeout))
+
+    def _stream_with(self, client: "httpx.Client", payload: Dict) -> Iterator[str]:
+        timeout = self._request_timeout()
+        with client.stream("POST", self.endpoint, json=payload, timeout=timeout) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                chunk = self._parse_stream_line(line)
+                if chunk is None:
+                    break
+                if chunk:
+                    yield chunk
+
+    async def _astream_with(self, client: "httpx.AsyncClient", payload: Dict) -> AsyncIterator[str]:
+        timeout = self._request_timeout()
+        async with client.stream("POST", self.endpoint, json=payload, timeout=timeout) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                chunk = self._parse_stream_line(line)
+                if chunk is None:
+                    break
+                if chunk:
+                    yield chunk
+
+    def stream(
+        self, messages: List[Dict[str, str]], model_name: str, temperature: float, context: Optional[Dict] = None
+    ) -> Iterator[str]:
+        payload = self._build_payload(messages, model_name, temperature, stream=True)
+
+        if not self.pooled:
+            with httpx.Client(**self._client_kwargs()) as client:
+                yield from self._stream_with(client, payload)
+            return
+
+        yield from self._stream_with(self._get_client(), payload)
+
+    async def astream(
+        self, messages: List[Dict[str, str]], model_name: str, temperature: float, context: Optional[Dict] = None
+    ) -> AsyncIterator[str]:
+        payload = self._build_payload(messages, model_name, temperature, stream=True)
+
+        if not self.pooled:
+            async with httpx.AsyncClient(**self._client_kwargs()) as client:
+                async for chunk in self._astream_with(client, payload):
+                    yield chunk
+            return
+
+        async for chunk in self._astream_with(self._get_async_client(), payload):
+            yield chunk
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    async def aclose(self):
+        self.close()
+        if self._async_client is not None:
+            if self._async_client_loop is asyncio.get_running_loop():
+                await self._async_client.aclose()
+            self._async_client = None
+            self._async_client_loop = None
@@ -0,0 +1,261 @@
+"""
+請求合併器 (Micro-batching)
+把同時到達的單筆 reply 請求合併成批次送往後端，批次滿或等待逾時即送出
+"""
+
+import time
+import queue
+import asyncio
+import threading
+import logging
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+from ai_models.backends import ChatBackend
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class _PendingRequest:
+    """等待合併的單筆請求"""
+
+    __slots__ = ("messages", "model_name", "temperature", "context", "future", "enqueued_at")
+
+    def __init__(self, messages, model_name, temperature, context):
+        self.messages = messages
+        self.model_name = model_name
+        self.temperature = temperature
+        self.context = context
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class RequestCoalescer(ChatBackend):
+    """
+    請求合併後端，包裝另一個後端使用
+
+    單筆請求先進入佇列，背景執行緒在批次達到 max_batch_size 或
+    最早的請求已等待 max_wait 秒時，以 complete_batch 一次送出
+    """
+
+    def __init__(
+        self,
+        backend: ChatBackend,
+        max_batch_size: int = 8,
+        max_wait: float = 0.005,
+        max_in_flight: int = 4,
+    ):
+        """
+        初始化請求合併器
+
+        Args:
+            backend: 實際處理批次的後端
+            max_batch_size: 單一批次的最大請求數
+            max_wait: 最早進入佇列的請求最多等待多久就送出（秒）
+            max_in_flight: 同時送往後端的批次數上限
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size 必須大於 0")
+
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue: "queue.Queue" = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="coalescer-flush")
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+
+        # 統計資料
+        self._stats_lock = threading.Lock()
+        self._batch_count = 0
+        self._request_count = 0
+        self._max_observed_batch = 0
+        self._total_wait = 0.0
+        self._recent_waits: deque = deque(maxlen=10000)
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._start_lock:
+                if self._closed:
+                    raise RuntimeError("RequestCoalescer 已關閉")
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="request-coalescer", daemon=True)
+                    self._worker.start()
+
+    def submit(
+        self, messages: List[Dict[str, str]], model_name: str, temperature: float, context: Optional[Dict] = None
+    ) -> Future:
+        """
+        將單筆請求放入合併佇列
+
+        Returns:
+            完成時帶有回應文本的 Future
+
+        Raises:
+            RuntimeError: 合併器已關閉
+        """
+        if self._closed:
+            raise RuntimeError("RequestCoalescer 已關閉")
+        self._ensure_worker()
+        request = _PendingRequest(messages, model_name, temperature, context)
+        self._queue.put(request)
+        return request.future
+
+    def complete(
+        self, messages: List[Dict[str, str]], model_name: str, temperature: float, context: Optional[Dict] = None
+    ) -> str:
+        return self.submit(messages, model_name, temperature, context).result()
+
+    async def acomplete(
+        self, messages: List[Dict[str, str]], model_name: str, temperature: float, context: Optional[Dict] = None
+    ) -> str:
+        return await asyncio.wrap_future(self.submit(messages, model_name, temperature, context))
+
+    def complete_batch(
+        self,
+        batch_messages: List[List[Dict[str, str]]],
+        model_name: str,
+        temperature: float,
+        contexts: Optional[List[Optional[Dict]]] = None,
+    ) -> List[str]:
+        # 呼叫端已自行組好批次，直接交給後端
+        return self.backend.complete_batch(batch_messages, model_name, temperature, contexts)
+
+    def stream(
+        self, messages: List[Dict[str, str]], model_name: str, temperature: float, context: Optional[Dict] = None
+    ) -> Iterator[str]:
+        # 串流請求無法合併，直接交給後端
+        return self.backend.stream(messages, model_name, temperature, context)
+
+    def astream(
+        self, messages: List[Dict[str, str]], model_name: str, temperature: float, context: Optional[Dict] = None
+    ) -> AsyncIterator[str]:
+        return self.backend.astream(messages, model_name, temperature, context)
+
+    def _run(self):
+        """背景執行緒：收集請求並在批次滿或逾時時送出"""
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+
+            batch = [item]
+            deadline = item.enqueued_at + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._executor.submit(self._flush, batch)
+
+    def _flush(self, batch: List[_PendingRequest]):
+        """依 (model_name, temperature) 分組後送出批次"""
+        flushed_at = time.perf_counter()
+        waits = [flushed_at - request.enqueued_at for request in batch]
+        with self._stats_lock:
+            self._batch_count += 1
+            self._request_count += len(batch)
+            self._max_observed_batch = max(self._max_observed_batch, len(batch))
+            self._total_wait += sum(waits)
+            self._recent_waits.extend(waits)
+
+        # 等待期間已被取消的請求（例如 areply 的 deadline 逾時）不送出；
+        # 其餘標記為執行中，之後無法再被取消，設定結果時不會拋出 InvalidStateError
+        batch = [request for request in batch if request.future.set_running_or_notify_cancel()]
+        groups: Dict[tuple, List[_PendingRequest]] = {}
+        for request in batch:
+            groups.setdefault((request.model_name, request.temperature), []).append(request)
+
+        interrupted: BaseException = RuntimeError("批次處理中斷")
+        try:
+            for (model_name, temperature), requests in groups.items():
+                self._flush_group(model_name, temperature, requests)
+        except BaseException as e:
+            interrupted = e
+            raise
+        finally:
+            # 包含 KeyboardInterrupt 等非 Exception 的中斷：尚未完成的呼叫端收到例外而不是永遠等待
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(interrupted)
+
+    def _flush_group(self, model_name: str, temperature: float, requests: List[_PendingRequest]):
+        """送出同一組 (model_name, temperature) 的請求並設定結果"""
+        try:
+            responses = self.backend.complete_batch(
+                [r.messages for r in requests], model_name, temperature, [r.context for r in requests]
+            )
+        except Exception as e:
+            logger.error(f"Batch of {len(requests)} requests failed: {e}")
+            for request in requests:
+                request.future.set_exception(e)
+            return
+
+        for request, response in zip(requests, responses):
+            request.future.set_result(response)
+        if len(responses) < len(requests):
+            error = ValueError(f"後端只回傳 {len(responses)} 筆回應，批次有 {len(requests)} 筆請求")
+            logger.error(str(error))
+            for request in requests[len(responses):]:
+                request.future.set_exception(error)
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        取得批次統計
+
+        Returns:
+            batch_count, request_count, batch_size（平均批次大小）, max_batch_size,
+            queue_wait（平均等待秒數）, queue_wait_p95
+        """
+        with self._stats_lock:
+            waits = sorted(self._recent_waits)
+            batch_count = self._batch_count
+            return {
+                "batch_count": batch_count,
+                "request_count": self._request_count,
+                "batch_size": self._request_count / batch_count if batch_count else 0.0,
+                "max_batch_size": self._max_observed_batch,
+                "queue_wait": self._total_wait / self._request_count if self._request_count else 0.0,
+                "queue_wait_p95": waits[int(len(waits) * 0.95)] if waits else 0.0,
+            }
+
+    def export(self, collector, model_name: str):
+        """
+        將批次統計（batch_size、queue_wait 等）寫入 AIMetricsCollector.record_performance_metrics
+
+        Args:
+            collector: AIMetricsCollector 實例
+            model_name: 指標標示的模型名稱
+        """
+        collector.record_performance_metrics(model_name, self.get_stats())
+
+    def _shutdown(self):
+        """停止背景執行緒並等待進行中的批次完成；之後不再接受新的請求"""
+        with self._start_lock:
+            self._closed = True
+        if self._worker is not None:
+            self._queue.put(_STOP)
+            self._worker.join()
+            self._worker = None
+        self._executor.shutdown(wait=True)
+
+    def close(self):
+        self._shutdown()
+        self.backend.close()
+
+    async def aclose(self):
+        await asyncio.to_thread(self._shutdown)
+        await self.backend.aclose()
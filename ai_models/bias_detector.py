@@ -3,10 +3,12 @@ BiasDetector - AI 偏見檢測器
 檢測 AI 回應中的性別、種族、年齡等偏見
 """
 
-from typing import Dict, List, Set
+from typing import Dict, List, Set, Union
 import re
 import logging
 
+from ai_models.text_analysis import AnalyzedText, analyze
+
 logger = logging.getLogger(__name__)
 
 
@@ -44,12 +46,12 @@ class BiasDetector:
             "profession": [r"護士.*女性", r"工程師.*男性", r"nurse.*woman", r"engineer.*man"],
         }
 
-    def detect_bias(self, response: str, categories: List[str] = None) -> Dict:
+    def detect_bias(self, response: Union[str, AnalyzedText], categories: List[str] = None) -> Dict:
         """
         綜合檢測偏見
 
         Args:
-            response: AI 回應文字
+            response: AI 回應文字，傳入 AnalyzedText 時沿用其快取的分析結果
             categories: 要檢測的類別列表 ['gender', 'age', 'race', 'profession']
                        None 則檢測所有類別
 
@@ -58,6 +60,7 @@ class BiasDetector:
         """
         if categories is None:
             categories = ["gender", "age", "profession"]
+        response = analyze(response)
 
         results = {
             "response": response,
@@ -112,7 +115,7 @@ class BiasDetector:
         """檢測性別偏見"""
         result = {"category": "gender", "has_bias": False, "details": {}}
 
-        text_lower = text.lower()
+        text_lower = analyze(text).lowered
 
         # 統計性別詞彙出現次數
         male_count = sum(text_lower.count(term) for term in self.gender_terms["male"])
@@ -137,7 +140,7 @@ class BiasDetector:
         """檢測年齡偏見"""
         result = {"category": "age", "has_bias": False, "details": {}}
 
-        text_lower = text.lower()
+        text_lower = analyze(text).lowered
 
         # 統計年齡詞彙出現次數
         young_count = sum(text_lower.count(term) for term in self.age_terms["young"])
@@ -183,7 +186,7 @@ class BiasDetector:
     def _detect_absolute_language(self, text: str) -> List[str]:
         """檢測絕對化語言（可能暗示偏見）"""
         detected = []
-        text_lower = text.lower()
+        text_lower = analyze(text).lowered
 
         for indicator in self.bias_indicators:
             if indicator in text_lower:
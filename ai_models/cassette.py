@@ -0,0 +1,290 @@
+"""
+錄製 / 重播 (Cassette) - 將 ChatModel 與後端的互動寫入 append-only 檔案，之後離線重播
+"""
+
+import json
+import time
+import random
+import asyncio
+import threading
+import logging
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Union
+
+from ai_models.backends import ChatBackend
+from ai_models.response_cache import ResponseCache
+from ai_models.streaming import split_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class Cassette:
+    """
+    Append-only 的 JSON Lines 錄製檔
+
+    開啟時掃描一次建立「請求鍵 → 檔案位移」索引，查詢時直接 seek 讀取單行；
+    同一請求被錄製多次時，依錄製順序輪流重播
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        """
+        Args:
+            path: 錄製檔路徑（不存在時自動建立）
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.touch(exist_ok=True)
+        self._index: Dict[str, List[int]] = {}
+        self._cursors: Dict[str, int] = {}
+        self.latencies: List[float] = []
+        self._lock = threading.Lock()
+        self._load_index()
+
+    def _load_index(self):
+        with open(self.path, "rb") as f:
+            offset = f.tell()
+            for line in iter(f.readline, b""):
+                if line.strip():
+                    entry = json.loads(line)
+                    self._index.setdefault(entry["key"], []).append(offset)
+                    self.latencies.append(entry.get("latency", 0.0))
+                offset = f.tell()
+
+    def __len__(self) -> int:
+        return len(self.latencies)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def append(self, key: str, entry: Dict):
+        """附加一筆錄製資料"""
+        entry = {"key": key, **entry}
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            with open(self.path, "ab") as f:
+                offset = f.tell()
+                f.write(line)
+            self._index.setdefault(key, []).append(offset)
+            self.latencies.append(entry.get("latency", 0.0))
+
+    def lookup(self, key: str) -> Optional[Dict]:
+        """依請求鍵取得錄製資料，找不到時回傳 None"""
+        with self._lock:
+            offsets = self._index.get(key)
+            if not offsets:
+                return None
+            cursor = self._cursors.get(key, 0)
+            self._cursors[key] = cursor + 1
+            offset = offsets[cursor % len(offsets)]
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+
+class CassetteBackend(ChatBackend):
+    """
+    錄製 / 重播後端，包裝另一個後端使用
+
+    mode:
+        record: 呼叫後端並錄製每筆請求與回應
+        replay: 只從錄製檔回應，找不到時拋出 KeyError
+        auto: 有錄製就重播，沒有就呼叫後端並錄製
+    """
+
+    MODES = ("record", "replay", "auto")
+    LATENCY_MODES = ("none", "recorded", "sampled")
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        backend: Optional[ChatBackend] = None,
+        mode: str = "replay",
+        replay_latency: str = "none",
+    ):
+        """
+        初始化錄製 / 重播後端
+
+        Args:
+            path: 錄製檔路徑
+            backend: 實際的後端（replay 模式可省略）
+            mode: record / replay / auto
+            replay_latency: 重播時的延遲模擬
+                none: 立即回應
+                recorded: 重現該筆請求錄製時的延遲
+                sampled: 從錄製檔整體的延遲分佈隨機取樣
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"mode 必須是 {self.MODES} 之一")
+        if replay_latency not in self.LATENCY_MODES:
+            raise ValueError(f"replay_latency 必須是 {self.LATENCY_MODES} 之一")
+        if backend is None and mode != "replay":
+            raise ValueError(f"{mode} 模式需要提供實際的後端")
+
+        self.cassette = Cassette(path)
+        self.backend = backend
+        self.mode = mode
+        self.replay_latency = replay_latency
+        self.recorded_count = 0
+        self.replayed_count = 0
+
+    @staticmethod
+    def request_key(
+        messages: List[Dict[str, str]], model_name: str, temperature: float, context: Optional[Dict] = None
+    ) -> str:
+        """請求鍵：與回應快取相同的內容定址方式"""
+        return ResponseCache.make_key(model_name, temperature, messages[-1]["content"], context, messages[:-1])
+
+    def _replay_delay(self, entry: Dict) -> float:
+        if self.replay_latency == "recorded":
+            return entry.get("latency", 0.0)
+        if self.replay_latency == "sampled" and self.cassette.latencies:
+            return random.choice(self.cassette.latencies)
+        return 0.0
+
+    def _lookup(self, key: str, messages: List[Dict[str, str]]) -> Optional[Dict]:
+        if self.mode == "record":
+            return None
+        entry = self.cassette.lookup(key)
+        if entry is None and self.mode == "replay":
+            raise KeyError(f"錄製檔中沒有對應的請求：{messages[-1]['content'][:50]}")
+        return entry
+
+    def _record(self, key: str, messages, model_name, temperature, response: str, latency: float):
+        self.cassette.append(
+            key,
+            {
+                "model": model_name,
+                "temperature": temperature,
+                "prompt": messages[-1]["content"],
+                "history_length": len(messages) - 1,
+                "response": response,
+                "latency": latency,
+                "recorded_at": time.time(),
+            },
+        )
+        self.recorded_count += 1
+
+    def complete(
+        self, messages: List[Dict[str, str]], model_name: str, temperature: float, context: Optional[Dict] = None
+    ) -> str:
+        key = self.request_key(messages, model_name, temperature, context)
+        entry = self._lookup(key, messages)
+        if entry is not None:
+            delay = self._replay_delay(entry)
+            if delay:
+                time.sleep(delay)
+            self.replayed_count += 1
+            return entry["response"]
+
+        start = time.perf_counter()
+        response = self.backend.complete(messages, model_name, temperature, context)
+        self._record(key, messages, model_name, temperature, response, time.perf_counter() - start)
+        return response
+
+    async def acomplete(
+        self, messages: List[Dict[str, str]], model_name: str, temperature: float, context: Optional[Dict] = None
+    ) -> str:
+        key = self.request_key(messages, model_name, temperature, context)
+        entry = self._lookup(key, messages)
+        if entry is not None:
+            delay = self._replay_delay(entry)
+            if delay:
+                await asyncio.sleep(delay)
+            self.replayed_count += 1
+            return entry["response"]
+
+        start = time.perf_counter()
+        response = await self.backend.acomplete(messages, model_name, temperature, context)
+        self._record(key, messages, model_name, temperature, response, time.perf_counter() - start)
+        return response
+
+    def complete_batch(
+        self,
+        batch_messages: List[List[Dict[str, str]]],
+        model_name: str,
+        temperature: float,
+        contexts: Optional[List[Optional[Dict]]] = None,
+    ) -> List[str]:
+        contexts = contexts or [None] * len(batch_messages)
+        keys = [self.request_key(m, model_name, temperature, c) for m, c in zip(batch_messages, contexts)]
+        responses: List[Optional[str]] = [None] * len(batch_messages)
+        max_delay = 0.0
+        for i, (key, messages) in enumerate(zip(keys, batch_messages)):
+            entry = self._lookup(key, messages)
+            if entry is not None:
+                max_delay = max(max_delay, self._replay_delay(entry))
+                self.replayed_count += 1
+                responses[i] = entry["response"]
+
+        # 未錄製的請求仍以一個批次送往後端
+        missing = [i for i, response in enumerate(responses) if response is None]
+        if missing:
+            start = time.perf_counter()
+            fresh = self.backend.complete_batch(
+                [batch_messages[i] for i in missing], model_name, temperature, [contexts[i] for i in missing]
+            )
+            latency = time.perf_counter() - start
+            for i, response in zip(missing, fresh):
+                self._record(keys[i], batch_messages[i], model_name, temperature, response, latency)
+                responses[i] = response
+
+        if max_delay:
+            time.sleep(max_delay)
+        return responses
+
+    def stream(
+        self, messages: List[Dict[str, str]], model_name: str, temperature: float, context: Optional[Dict] = None
+    ) -> Iterator[str]:
+        key = self.request_key(messages, model_name, temperature, context)
+        entry = self._lookup(key, messages)
+        if entry is not None:
+            delay = self._replay_delay(entry)
+            if delay:
+                time.sleep(delay)
+            self.replayed_count += 1
+            yield from split_tokens(entry["response"])
+            return
+
+        start = time.perf_counter()
+        parts = []
+        for chunk in self.backend.stream(messages, model_name, temperature, context):
+            parts.append(chunk)
+            yield chunk
+        self._record(key, messages, model_name, temperature, "".join(parts), time.perf_counter() - start)
+
+    async def astream(
+        self, messages: List[Dict[str, str]], model_name: str, temperature: float, context: Optional[Dict] = None
+    ) -> AsyncIterator[str]:
+        key = self.request_key(messages, model_name, temperature, context)
+        entry = self._lookup(key, messages)
+        if entry is not None:
+            delay = self._replay_delay(entry)
+            if delay:
+                await asyncio.sleep(delay)
+            self.replayed_count += 1
+            for chunk in split_tokens(entry["response"]):
+                yield chunk
+            return
+
+        start = time.perf_counter()
+        parts = []
+        async for chunk in self.backend.astream(messages, model_name, temperature, context):
+            parts.append(chunk)
+            yield chunk
+        self._record(key, messages, model_name, temperature, "".join(parts), time.perf_counter() - start)
+
+    def get_stats(self) -> Dict[str, int]:
+        """取得錄製 / 重播統計"""
+        return {
+            "entries": len(self.cassette),
+            "recorded": self.recorded_count,
+            "replayed": self.replayed_count,
+        }
+
+    def close(self):
+        if self.backend is not None:
+            self.backend.close()
+
+    async def aclose(self):
+        if self.backend is not None:
+            await self.backend.aclose()
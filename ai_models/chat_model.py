@@ -1,36 +1,95 @@
 """
 AI 聊天模型 - 用於測試的 Mock 實作
-實際專案中會替換為真實的 LLM API 調用
+預設使用 Mock 後端，可透過 backend 參數替換為真實的 LLM API 調用（見 backends.py）
 """
 
-import time
-import random
-from typing import Dict, List, Optional
+import asyncio
+from typing import Dict, Hashable, List, Optional
+
+from ai_models.backends import ChatBackend, MockBackend
+from ai_models.clock import Clock, SystemClock
+from ai_models.conversation_history import ConversationHistory, HistoryView
+from ai_models.deadline import deadline_scope
+from ai_models.hedging import HedgedBackend, HedgingPolicy
+from ai_models.response_cache import ResponseCache
+from ai_models.session_manager import ChatSession, SessionManager
+from ai_models.session_store import SessionStore
+from ai_models.streaming import AsyncResponseStream, ResponseStream, StreamMetrics
+from ai_models.tokenizer import HeuristicTokenizer, Tokenizer
+from ai_models.usage_meter import UsageMeter, get_usage_meter
 
 
 class ChatModel:
     """AI 聊天模型類別"""
     
-    def __init__(self, model_name: str = "gpt-3.5-turbo", temperature: float = 0.7):
+    def __init__(
+        self,
+        model_name: str = "gpt-3.5-turbo",
+        temperature: float = 0.7,
+        backend: Optional[ChatBackend] = None,
+        metrics_collector=None,
+        cache: Optional[ResponseCache] = None,
+        history_token_budget: Optional[int] = None,
+        tokenizer: Optional[Tokenizer] = None,
+        max_sessions: int = 10000,
+        session_idle_ttl: Optional[float] = None,
+        session_store: Optional[SessionStore] = None,
+        usage_meter: Optional[UsageMeter] = None,
+        clock: Optional[Clock] = None,
+        hedging_policy: Optional[HedgingPolicy] = None,
+    ):
         """
         初始化聊天模型
         
         Args:
             model_name: 模型名稱
             temperature: 溫度參數 (0.0-1.0)
+            backend: 產生回應的後端，預設為 Mock 後端
+            metrics_collector: 可選的 AIMetricsCollector，串流結束時寫入延遲指標，
+                close 時寫入回應快取統計與後端的對沖、請求合併統計
+            cache: 可選的回應快取，命中時不呼叫後端
+            history_token_budget: 對話歷史保留的 token 上限，超出時淘汰最舊的對話（None 表示不限制）
+            tokenizer: 計算 token 數的分詞器，預設以字元比例估算（見 tokenizer.py）
+            max_sessions: 以 session_id 區分的對話最多同時保留幾個（見 session_manager.py）
+            session_idle_ttl: 對話閒置多久後淘汰（秒），None 表示不因閒置淘汰
+            session_store: 淘汰的對話寫入的冷資料層（例如 SQLiteSessionStore），None 表示直接丟棄
+            usage_meter: 記錄每次後端呼叫 token 用量與成本的計量器，預設為全域計量器（見 usage_meter.py）
+            clock: 量測延遲的時鐘，也用於預設的 Mock 後端；傳入 VirtualClock 時模擬延遲不實際等待
+            hedging_policy: 對沖策略，設定時 reply/areply 超過近期延遲的百分位仍未完成就再送出一次相同請求
+                （見 hedging.py）；串流與批次請求不對沖
         """
         self.model_name = model_name
         self.temperature = temperature
-        self.conversation_history: List[Dict[str, str]] = []
+        self.clock = clock or SystemClock()
+        self.backend = backend or MockBackend(clock=self.clock)
+        self.hedged_backend = (
+            HedgedBackend(self.backend, hedging_policy, clock=self.clock) if hedging_policy is not None else None
+        )
+        self.metrics_collector = metrics_collector
+        self.cache = cache
+        self.tokenizer = tokenizer or HeuristicTokenizer()
+        self.usage_meter = usage_meter or get_usage_meter()
+        self.conversation_history = ConversationHistory(self.estimate_tokens, history_token_budget)
+        self._default_session = ChatSession(None, self.conversation_history)
+        self.sessions = SessionManager(
+            self.estimate_tokens, history_token_budget, max_sessions, session_idle_ttl, session_store
+        )
         self._is_initialized = True
         
-    def reply(self, prompt: str, context: Optional[Dict] = None) -> str:
+    def reply(
+        self, prompt: str, context: Optional[Dict] = None, use_cache: bool = True,
+        session_id: Optional[Hashable] = None, deadline: Optional[float] = None, hedge: bool = True
+    ) -> str:
         """
         根據 prompt 生成回應
         
         Args:
             prompt: 用戶輸入的提示詞
             context: 可選的上下文資訊
+            use_cache: 是否使用回應快取（False 時一定呼叫後端，也不寫入快取）
+            session_id: 對話識別碼，None 表示使用預設對話
+            deadline: 本次呼叫的期限（秒），以 clock 計時並傳遞給後端，逾時拋出 TimeoutError
+            hedge: 設定 hedging_policy 時是否對沖本次呼叫（非冪等的請求可傳 False）
             
         Returns:
             模型的回應文本
@@ -38,54 +97,230 @@ class ChatModel:
         if not prompt or not prompt.strip():
             return "請輸入有效的內容"
         
-        # 模擬處理時間
-        time.sleep(0.01)
+        session = self._get_session(session_id)
+        history = session.snapshot()
+        cache_key = self._cache_key(prompt, context, history) if use_cache else None
+        response = self.cache.get(cache_key) if cache_key else None
+        if response is None:
+            history_tokens = session.history.total_tokens
+            start = self.clock.now()
+            with deadline_scope(deadline, self.clock):
+                response = self._generate_response(prompt, context, history, hedge)
+            self._record_usage(history_tokens, prompt, response, self.clock.now() - start)
+            if cache_key:
+                self.cache.set(cache_key, response)
         
-        # 記錄對話歷史
-        self.conversation_history.append({
-            "role": "user",
-            "content": prompt
-        })
+        self.sessions.record_turn(session, prompt, response)
+        return response
+    
+    async def areply(
+        self, prompt: str, context: Optional[Dict] = None, use_cache: bool = True,
+        session_id: Optional[Hashable] = None, deadline: Optional[float] = None, hedge: bool = True
+    ) -> str:
+        """
+        reply 的非同步版本，等待期間不阻塞事件迴圈
         
-        # 根據 prompt 生成回應 (Mock 實作)
-        response = self._generate_response(prompt, context)
+        Args:
+            prompt: 用戶輸入的提示詞
+            context: 可選的上下文資訊
+            use_cache: 是否使用回應快取
+            session_id: 對話識別碼，None 表示使用預設對話
+            deadline: 本次呼叫的期限（秒），以 clock 計時並傳遞給後端，逾時拋出 TimeoutError
+            hedge: 設定 hedging_policy 時是否對沖本次呼叫（非冪等的請求可傳 False）
+            
+        Returns:
+            模型的回應文本
+        """
+        if not prompt or not prompt.strip():
+            return "請輸入有效的內容"
         
-        self.conversation_history.append({
-            "role": "assistant",
-            "content": response
-        })
+        session = self._get_session(session_id)
+        history = session.snapshot()
+        cache_key = self._cache_key(prompt, context, history) if use_cache else None
+        response = self.cache.get(cache_key) if cache_key else None
+        if response is None:
+            history_tokens = session.history.total_tokens
+            start = self.clock.now()
+            with deadline_scope(deadline, self.clock):
+                # 邏輯時鐘下由後端依剩餘的邏輯時間判斷逾時，不以真實時間中斷
+                timeout = deadline if self.clock.realtime else None
+                try:
+                    response = await asyncio.wait_for(
+                        self._agenerate_response(prompt, context, history, hedge), timeout
+                    )
+                except asyncio.TimeoutError as e:
+                    # Python 3.10 的 asyncio.TimeoutError 不是內建的 TimeoutError，統一成 reply 的例外型別
+                    raise TimeoutError("已超過請求期限") from e
+            self._record_usage(history_tokens, prompt, response, self.clock.now() - start)
+            if cache_key:
+                self.cache.set(cache_key, response)
         
+        self.sessions.record_turn(session, prompt, response)
         return response
     
-    def _generate_response(self, prompt: str, context: Optional[Dict] = None) -> str:
-        """生成回應的內部邏輯 (Mock)"""
-        prompt_lower = prompt.lower()
+    def _cache_key(self, prompt: str, context: Optional[Dict], history: List[Dict[str, str]]) -> Optional[str]:
+        """計算回應快取鍵，未啟用快取時回傳 None"""
+        if self.cache is None:
+            return None
+        return self.cache.make_key(self.model_name, self.temperature, prompt, context, history)
+    
+    def _get_session(self, session_id: Optional[Hashable] = None) -> ChatSession:
+        """取得對話狀態，None 表示預設對話"""
+        if session_id is None:
+            return self._default_session
+        return self.sessions.get(session_id)
+    
+    def _record_usage(self, history_tokens: int, prompt: str, response: str, latency: float):
+        """記錄一次後端呼叫的用量（快取命中不計）"""
+        self.usage_meter.record(
+            self.model_name, history_tokens + self.estimate_tokens(prompt), self.estimate_tokens(response), latency
+        )
+    
+    def reply_stream(
+        self, prompt: str, context: Optional[Dict] = None, session_id: Optional[Hashable] = None
+    ) -> ResponseStream:
+        """
+        串流生成回應，逐段產出文本
+        
+        Args:
+            prompt: 用戶輸入的提示詞
+            context: 可選的上下文資訊
+            session_id: 對話識別碼，None 表示使用預設對話
+            
+        Returns:
+            可迭代的 ResponseStream，讀取完畢後 metrics 含 TTFT 與 token 間延遲
+        """
+        if not prompt or not prompt.strip():
+            return ResponseStream(iter(["請輸入有效的內容"]))
         
-        # 問候語
-        if any(word in prompt_lower for word in ["你好", "hello", "hi", "嗨"]):
-            return "你好！我是 SysTalk.Chat AI 助手，很高興為您服務。有什麼我可以幫助您的嗎？"
+        session = self._get_session(session_id)
+        messages = self._build_messages(prompt, session.snapshot())
+        chunks = self.backend.stream(messages, self.model_name, self.temperature, context)
+        return ResponseStream(
+            chunks,
+            on_complete=lambda text, metrics: self._finish_stream(session, prompt, text, metrics),
+            clock=self.clock,
+        )
+    
+    def areply_stream(
+        self, prompt: str, context: Optional[Dict] = None, session_id: Optional[Hashable] = None
+    ) -> AsyncResponseStream:
+        """
+        reply_stream 的非同步版本，以 async for 讀取
         
-        # 帳戶相關
-        if "帳戶" in prompt_lower or "餘額" in prompt_lower:
-            return "您的帳戶餘額為 NT$10,000。如需更詳細的交易記錄，請告訴我您想查詢的時間範圍。"
+        Args:
+            prompt: 用戶輸入的提示詞
+            context: 可選的上下文資訊
+            session_id: 對話識別碼，None 表示使用預設對話
+            
+        Returns:
+            AsyncResponseStream
+        """
+        if not prompt or not prompt.strip():
+            async def invalid_input():
+                yield "請輸入有效的內容"
+            return AsyncResponseStream(invalid_input())
         
-        # 天氣查詢
-        if "天氣" in prompt_lower:
-            return "今天台北市天氣晴朗，溫度約 25°C，適合外出活動。"
+        session = self._get_session(session_id)
+        messages = self._build_messages(prompt, session.snapshot())
+        chunks = self.backend.astream(messages, self.model_name, self.temperature, context)
+        return AsyncResponseStream(
+            chunks,
+            on_complete=lambda text, metrics: self._finish_stream(session, prompt, text, metrics),
+            clock=self.clock,
+        )
+    
+    def _finish_stream(self, session: ChatSession, prompt: str, response: str, metrics: StreamMetrics):
+        """串流結束：記錄用量與對話並匯出延遲指標"""
+        self._record_usage(session.history.total_tokens, prompt, response, metrics.total_time)
+        self.sessions.record_turn(session, prompt, response)
+        if self.metrics_collector is not None:
+            self.metrics_collector.record_performance_metrics(self.model_name, metrics.to_dict())
+    
+    def reply_batch(self, prompts: List[str], contexts: Optional[List[Optional[Dict]]] = None) -> List[str]:
+        """
+        批次生成回應，所有有效的 prompt 以一次後端呼叫送出
         
-        # 空輸入處理
-        if not prompt.strip():
-            return "請輸入有效的內容"
+        Args:
+            prompts: 用戶輸入列表
+            contexts: 對應每個 prompt 的上下文資訊
+            
+        Returns:
+            與輸入順序一致的回應列表
+        """
+        contexts = contexts or [None] * len(prompts)
+        responses = ["請輸入有效的內容"] * len(prompts)
+        valid_indices = [i for i, prompt in enumerate(prompts) if prompt and prompt.strip()]
+        if not valid_indices:
+            return responses
+        
+        # 每個 prompt 都以批次開始前的對話歷史作為上文
+        history = self._default_session.snapshot()
+        history_tokens = self.conversation_history.total_tokens
+        start = self.clock.now()
+        batch_responses = self.backend.complete_batch(
+            [self._build_messages(prompts[i], history) for i in valid_indices],
+            self.model_name,
+            self.temperature,
+            [contexts[i] for i in valid_indices],
+        )
         
-        # 預設回應
-        return f"我理解您的問題：「{prompt}」。這是一個很好的問題，讓我為您提供相關資訊..."
+        latency = self.clock.now() - start
+        
+        for i, response in zip(valid_indices, batch_responses):
+            self._record_usage(history_tokens, prompts[i], response, latency)
+            responses[i] = response
+            self._default_session.record_turn(prompts[i], response)
+        return responses
+    
+    def _build_messages(self, prompt: str, history: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """組合送往後端的訊息列表（對話歷史 + 本輪輸入）"""
+        return history + [{"role": "user", "content": prompt}]
     
-    def chat(self, messages: List[Dict[str, str]]) -> str:
+    def _completion_backend(self, hedge: bool) -> ChatBackend:
+        """單次回應使用的後端：有對沖策略且未關閉對沖時為 hedged_backend"""
+        return self.hedged_backend if hedge and self.hedged_backend is not None else self.backend
+    
+    def _generate_response(
+        self, prompt: str, context: Optional[Dict] = None, history: Optional[List[Dict[str, str]]] = None,
+        hedge: bool = True
+    ) -> str:
+        """透過後端生成回應"""
+        messages = self._build_messages(prompt, history if history is not None else self._default_session.snapshot())
+        return self._completion_backend(hedge).complete(messages, self.model_name, self.temperature, context)
+    
+    async def _agenerate_response(
+        self, prompt: str, context: Optional[Dict] = None, history: Optional[List[Dict[str, str]]] = None,
+        hedge: bool = True
+    ) -> str:
+        """透過後端非同步生成回應"""
+        messages = self._build_messages(prompt, history if history is not None else self._default_session.snapshot())
+        return await self._completion_backend(hedge).acomplete(messages, self.model_name, self.temperature, context)
+    
+    def chat(self, messages: List[Dict[str, str]], session_id: Optional[Hashable] = None) -> str:
         """
         多輪對話介面
         
         Args:
             messages: 對話訊息列表 [{"role": "user", "content": "..."}]
+            session_id: 對話識別碼，None 表示使用預設對話
+            
+        Returns:
+            模型回應
+        """
+        if not messages:
+            return "沒有接收到任何訊息"
+        
+        last_message = messages[-1]
+        return self.reply(last_message.get("content", ""), session_id=session_id)
+    
+    async def achat(self, messages: List[Dict[str, str]], session_id: Optional[Hashable] = None) -> str:
+        """
+        多輪對話介面的非同步版本
+        
+        Args:
+            messages: 對話訊息列表 [{"role": "user", "content": "..."}]
+            session_id: 對話識別碼，None 表示使用預設對話
             
         Returns:
             模型回應
@@ -94,15 +329,67 @@ class ChatModel:
             return "沒有接收到任何訊息"
         
         last_message = messages[-1]
-        return self.reply(last_message.get("content", ""))
+        return await self.areply(last_message.get("content", ""), session_id=session_id)
     
-    def get_conversation_history(self) -> List[Dict[str, str]]:
+    def get_conversation_history(self, session_id: Optional[Hashable] = None) -> List[Dict[str, str]]:
         """獲取對話歷史"""
-        return self.conversation_history.copy()
+        return self._get_session(session_id).snapshot()
+    
+    def get_history_view(self, session_id: Optional[Hashable] = None) -> HistoryView:
+        """獲取對話歷史的唯讀視圖（不複製，適合長對話中頻繁讀取）"""
+        return self._get_session(session_id).history.view()
     
-    def clear_history(self):
+    def clear_history(self, session_id: Optional[Hashable] = None):
         """清空對話歷史"""
-        self.conversation_history.clear()
+        session = self._get_session(session_id)
+        with session.lock:
+            session.history.clear()
+    
+    def end_session(self, session_id: Hashable) -> bool:
+        """
+        結束對話並釋放其歷史
+        
+        Returns:
+            對話存在並已移除時為 True
+        """
+        return self.sessions.drop(session_id)
+    
+    def _export_metrics(self):
+        """
+        有設定指標收集器時，寫入回應快取統計，以及後端包裝鏈上
+        （例如 HedgedBackend、RequestCoalescer）各層提供 export 的統計
+        """
+        if self.metrics_collector is None:
+            return
+        if self.cache is not None:
+            self.cache.export(self.metrics_collector, self.model_name)
+        backend = self.hedged_backend or self.backend
+        while backend is not None:
+            export = getattr(backend, "export", None)
+            if export is not None:
+                export(self.metrics_collector, self.model_name)
+            backend = getattr(backend, "backend", None)
+    
+    def close(self):
+        """寫入快取與後端統計、釋放後端資源並清空所有對話歷史"""
+        self._export_metrics()
+        # hedged_backend 關閉時會一併關閉它包裝的後端
+        (self.hedged_backend or self.backend).close()
+        self.clear_history()
+        self.sessions.clear()
+    
+    async def aclose(self):
+        """非同步寫入快取與後端統計、釋放後端資源並清空所有對話歷史"""
+        self._export_metrics()
+        await (self.hedged_backend or self.backend).aclose()
+        self.clear_history()
+        self.sessions.clear()
+    
+    async def __aenter__(self) -> "ChatModel":
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
     
     def is_initialized(self) -> bool:
         """檢查模型是否已初始化"""
@@ -113,7 +400,10 @@ class ChatModel:
         return {
             "model_name": self.model_name,
             "temperature": self.temperature,
-            "conversation_length": len(self.conversation_history)
+            "backend": type(self.backend).__name__,
+            "conversation_length": len(self.conversation_history),
+            "history_tokens": self.conversation_history.total_tokens,
+            "active_sessions": len(self.sessions)
         }
     
     def validate_input(self, prompt: str) -> bool:
@@ -133,7 +423,7 @@ class ChatModel:
     
     def estimate_tokens(self, text: str) -> int:
         """
-        估算文本的 token 數量 (簡化版)
+        估算文本的 token 數量
         
         Args:
             text: 輸入文本
@@ -141,9 +431,16 @@ class ChatModel:
         Returns:
             估算的 token 數量
         """
-        # 簡化計算：中文約 2 字符/token，英文約 4 字符/token
-        chinese_chars = sum(1 for char in text if '\u4e00' <= char <= '\u9fff')
-        other_chars = len(text) - chinese_chars
+        return self.tokenizer.count(text)
+    
+    def estimate_tokens_many(self, texts: List[str]) -> List[int]:
+        """
+        批次估算多筆文本的 token 數量
         
-        tokens = (chinese_chars // 2) + (other_chars // 4)
-        return max(1, tokens)
+        Args:
+            texts: 文本列表
+            
+        Returns:
+            與輸入順序一致的 token 數量列表
+        """
+        return self.tokenizer.count_many(texts)
@@ -0,0 +1,142 @@
+"""
+時鐘 - 模擬延遲與量測耗時的時間來源
+SystemClock 使用真實時間；VirtualClock 的 sleep 只推進邏輯時間而不阻塞，讓大量模擬延遲的測試立即完成
+"""
+
+import time
+import asyncio
+import threading
+from concurrent import futures
+from typing import Iterable, Optional, Set, Tuple
+
+
+class Clock:
+    """時鐘介面"""
+
+    # 是否與真實時間同步；邏輯時鐘不能用 asyncio.wait_for 等真實時間的逾時
+    realtime = True
+
+    def now(self) -> float:
+        """目前時間（秒），只用於計算時間差"""
+        raise NotImplementedError
+
+    def sleep(self, seconds: float):
+        """等待指定秒數"""
+        raise NotImplementedError
+
+    async def asleep(self, seconds: float):
+        """sleep 的非同步版本"""
+        raise NotImplementedError
+
+    def wait(
+        self,
+        fs: Iterable[futures.Future],
+        timeout: Optional[float] = None,
+        return_when: str = futures.ALL_COMPLETED,
+        since: Optional[float] = None,
+    ) -> Tuple[Set[futures.Future], Set[futures.Future]]:
+        """
+        等待 concurrent.futures.Future，timeout 以此時鐘計時
+
+        Args:
+            fs: 要等待的 Future
+            timeout: 最多等待的秒數，None 表示不限
+            return_when: 與 concurrent.futures.wait 相同（FIRST_COMPLETED / ALL_COMPLETED）
+            since: timeout 起算的時間點（now() 的值），預設為呼叫時；Future 在呼叫前就已開始執行時使用
+
+        Returns:
+            (done, not_done)
+        """
+        raise NotImplementedError
+
+    async def await_tasks(
+        self,
+        tasks: Iterable[asyncio.Future],
+        timeout: Optional[float] = None,
+        return_when: str = asyncio.ALL_COMPLETED,
+        since: Optional[float] = None,
+    ) -> Tuple[Set[asyncio.Future], Set[asyncio.Future]]:
+        """wait 的非同步版本，等待 asyncio task"""
+        raise NotImplementedError
+
+
+class SystemClock(Clock):
+    """真實時鐘"""
+
+    def now(self) -> float:
+        return time.perf_counter()
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+    async def asleep(self, seconds: float):
+        await asyncio.sleep(seconds)
+
+    def _remaining(self, timeout: Optional[float], since: Optional[float]) -> Optional[float]:
+        if timeout is None or since is None:
+            return timeout
+        return max(0.0, since + timeout - self.now())
+
+    def wait(self, fs, timeout=None, return_when=futures.ALL_COMPLETED, since=None):
+        return futures.wait(fs, timeout=self._remaining(timeout, since), return_when=return_when)
+
+    async def await_tasks(self, tasks, timeout=None, return_when=asyncio.ALL_COMPLETED, since=None):
+        return await asyncio.wait(tasks, timeout=self._remaining(timeout, since), return_when=return_when)
+
+
+class VirtualClock(Clock):
+    """
+    虛擬時鐘，sleep 立即推進邏輯時間
+
+    所有執行緒與 task 共用同一條時間軸，同時進行的 sleep 會累加（視為依序執行），
+    因此以 now() 量到的耗時是實際並行情況下的上限
+    """
+
+    realtime = False
+
+    def __init__(self, start: float = 0.0):
+        """
+        Args:
+            start: 起始時間（秒）
+        """
+        self._now = start
+        self._lock = threading.Lock()
+
+    def now(self) -> float:
+        return self._now
+
+    def advance(self, seconds: float):
+        """推進邏輯時間"""
+        if seconds < 0:
+            raise ValueError("seconds 不可為負數")
+        with self._lock:
+            self._now += seconds
+
+    def sleep(self, seconds: float):
+        self.advance(max(0.0, seconds))
+
+    async def asleep(self, seconds: float):
+        self.advance(max(0.0, seconds))
+        # 與真實的 asyncio.sleep 相同，交還控制權給事件迴圈
+        await asyncio.sleep(0)
+
+    def _within(self, started_at: float, timeout: Optional[float], done: set, not_done: set) -> Tuple[set, set]:
+        # 實際完成但邏輯耗時超過 timeout，視為在 timeout 內沒有完成
+        if timeout is not None and self.now() - started_at > timeout:
+            return set(), done | not_done
+        return done, not_done
+
+    def wait(self, fs, timeout=None, return_when=futures.ALL_COMPLETED, since=None):
+        """
+        等到 Future 實際完成（模擬的延遲不實際等待），再以邏輯耗時判斷是否在 timeout 內完成；
+        只適用於會完成的 Future（例如呼叫使用此時鐘的 MockBackend）
+        """
+        started_at = self.now() if since is None else since
+        done, not_done = futures.wait(set(fs), return_when=return_when)
+        return self._within(started_at, timeout, done, not_done)
+
+    async def await_tasks(self, tasks, timeout=None, return_when=asyncio.ALL_COMPLETED, since=None):
+        """wait 的非同步版本"""
+        started_at = self.now() if since is None else since
+        done, not_done = await asyncio.wait(set(tasks), return_when=return_when)
+        return self._within(started_at, timeout, done, not_done)
@@ -0,0 +1,108 @@
+"""
+對話歷史視窗 - 具 token 預算的對話歷史
+以 deque 儲存訊息並維護累計 token 數，超出預算時從最舊的訊息開始以 O(1) 淘汰
+"""
+
+from collections import deque
+from collections.abc import Sequence
+from types import MappingProxyType
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class HistoryView(Sequence):
+    """對話歷史的唯讀視圖，不複製底層資料"""
+
+    def __init__(self, messages: deque):
+        self._messages = messages
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [MappingProxyType(m) for m in list(self._messages)[index]]
+        return MappingProxyType(self._messages[index])
+
+    def __iter__(self) -> Iterator:
+        return (MappingProxyType(m) for m in self._messages)
+
+    def __repr__(self) -> str:
+        return f"HistoryView({list(self._messages)!r})"
+
+
+class ConversationHistory:
+    """具 token 預算的對話歷史"""
+
+    def __init__(self, token_counter: Callable[[str], int], token_budget: Optional[int] = None):
+        """
+        初始化對話歷史
+
+        Args:
+            token_counter: 計算單則訊息 token 數的函式
+            token_budget: 保留的 token 上限，None 表示不限制
+        """
+        self.token_counter = token_counter
+        self.token_budget = token_budget
+        self.total_tokens = 0
+        self.evicted_count = 0
+        self._messages: deque = deque()
+        self._tokens: deque = deque()
+
+    def append(self, message: Dict[str, str]):
+        """加入一則訊息，只在加入時計算一次 token 數"""
+        tokens = self.token_counter(message["content"])
+        self._messages.append(message)
+        self._tokens.append(tokens)
+        self.total_tokens += tokens
+        self._evict()
+
+    def _evict(self):
+        """超出預算時淘汰最舊的訊息，至少保留最新一則，且不留下孤立的 assistant 訊息"""
+        if self.token_budget is None:
+            return
+        while self.total_tokens > self.token_budget and len(self._messages) > 1:
+            self._pop_oldest()
+            while len(self._messages) > 1 and self._messages[0]["role"] == "assistant":
+                self._pop_oldest()
+
+    def _pop_oldest(self):
+        self._messages.popleft()
+        self.total_tokens -= self._tokens.popleft()
+        self.evicted_count += 1
+
+    def clear(self):
+        """清空對話歷史"""
+        self._messages.clear()
+        self._tokens.clear()
+        self.total_tokens = 0
+
+    def entries(self) -> List[Tuple[Dict[str, str], int]]:
+        """複製為 [(訊息, token 數), ...]，供序列化使用"""
+        return list(zip(self._messages, self._tokens))
+
+    def restore(self, entries: Iterable[Tuple[Dict[str, str], int]]):
+        """以 entries() 的輸出還原歷史，不重新計算 token 數"""
+        self.clear()
+        for message, tokens in entries:
+            self._messages.append(message)
+            self._tokens.append(tokens)
+            self.total_tokens += tokens
+
+    def view(self) -> HistoryView:
+        """取得唯讀視圖（O(1)，不複製）"""
+        return HistoryView(self._messages)
+
+    def to_list(self) -> List[Dict[str, str]]:
+        """複製為一般列表"""
+        return list(self._messages)
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        return iter(self._messages)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self._messages)[index]
+        return self._messages[index]
@@ -0,0 +1,212 @@
+"""
+腳本化對話執行器
+多個互不相關的腳本對話共用一個執行緒池，輪流送出各自的下一輪，讓後端持續有請求可處理；
+同一個對話仍嚴格依序執行（上一輪完成才送出下一輪）
+"""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+from ai_models.chat_model import ChatModel
+
+logger = logging.getLogger(__name__)
+
+
+def _summarize(values: List[float]) -> Dict[str, float]:
+    """延遲統計：count, mean, p50, p95, max"""
+    if not values:
+        return {"count": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered),
+        "p50": ordered[len(ordered) // 2],
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "max": ordered[-1],
+    }
+
+
+class ConversationScript:
+    """預先寫好的多輪對話"""
+
+    def __init__(self, name: str, turns: Sequence[Union[str, Dict]]):
+        """
+        Args:
+            name: 對話名稱，同時作為 session_id
+            turns: 每輪的用戶輸入；也可以是 {"user": 輸入, "context": 上下文, "verify": 檢查回應的函式}
+        """
+        self.name = name
+        self.turns: List[Dict] = [turn if isinstance(turn, dict) else {"user": turn} for turn in turns]
+
+    def __len__(self) -> int:
+        return len(self.turns)
+
+
+class _ConversationState:
+    """執行中對話的狀態"""
+
+    __slots__ = (
+        "script", "next_turn", "responses", "turn_latencies", "failures", "error", "started_at", "finished_at"
+    )
+
+    def __init__(self, script: ConversationScript, started_at: float):
+        self.script = script
+        self.next_turn = 0
+        self.responses: List[str] = []
+        self.turn_latencies: List[float] = []
+        self.failures: List[Dict] = []
+        self.error: Optional[Exception] = None
+        self.started_at = started_at
+        self.finished_at: Optional[float] = None
+
+
+class ConversationRunner:
+    """腳本化對話執行器"""
+
+    def __init__(self, model: ChatModel, max_workers: int = 8, keep_sessions: bool = False):
+        """
+        初始化腳本化對話執行器
+
+        Args:
+            model: 執行對話的模型，每個腳本使用各自的 session_id
+            max_workers: 同時進行的輪數上限（所有對話共用）
+            keep_sessions: 執行完畢後是否保留對話歷史（False 時結束對話釋放記憶體）
+        """
+        self.model = model
+        self.max_workers = max_workers
+        self.keep_sessions = keep_sessions
+
+    def _run_turn(self, state: _ConversationState) -> bool:
+        """
+        執行對話的下一輪
+
+        Returns:
+            對話是否還有下一輪
+        """
+        script = state.script
+        turn = script.turns[state.next_turn]
+        start = self.model.clock.now()
+        try:
+            response = self.model.reply(turn["user"], turn.get("context"), session_id=script.name)
+        except Exception as e:
+            state.error = e
+            logger.warning(f"Conversation {script.name!r} failed at turn {state.next_turn}: {e}")
+            return False
+        state.turn_latencies.append(self.model.clock.now() - start)
+        state.responses.append(response)
+        self._verify(state, turn, response)
+        state.next_turn += 1
+        return state.next_turn < len(script)
+
+    @staticmethod
+    def _verify(state: _ConversationState, turn: Dict, response: str):
+        verify: Optional[Callable[[str], bool]] = turn.get("verify")
+        if verify is not None and not verify(response):
+            state.failures.append({"turn": state.next_turn, "user": turn["user"], "response": response})
+
+    def run(self, scripts: Sequence[ConversationScript]) -> Dict:
+        """
+        執行所有腳本對話
+
+        Args:
+            scripts: 腳本列表，名稱不可重複
+
+        Returns:
+            結果字典：conversations（每個對話的 responses、turn_latencies、latency、failures、error）、
+            turn_latency 與 conversation_latency 統計、wall_time、failures
+        """
+        self._check_names(scripts)
+        start = self.model.clock.now()
+        states = [_ConversationState(script, start) for script in scripts if len(script)]
+        remaining = len(states)
+        all_done = threading.Event()
+        lock = threading.Lock()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="conversation") as executor:
+
+            def step(state: _ConversationState):
+                nonlocal remaining
+                try:
+                    has_next = self._run_turn(state)
+                except Exception as e:  # 例如 verify 本身拋出例外
+                    state.error, has_next = e, False
+                if has_next:
+                    # 本輪完成才排入下一輪，同一對話不會有兩輪同時執行
+                    executor.submit(step, state)
+                    return
+                state.finished_at = self.model.clock.now()
+                with lock:
+                    remaining -= 1
+                    if remaining == 0:
+                        all_done.set()
+
+            if not states:
+                all_done.set()
+            for state in states:
+                executor.submit(step, state)
+            all_done.wait()
+
+        return self._report(states, self.model.clock.now() - start)
+
+    async def arun(self, scripts: Sequence[ConversationScript]) -> Dict:
+        """run 的非同步版本，以 semaphore 限制同時進行的輪數"""
+        self._check_names(scripts)
+        start = self.model.clock.now()
+        states = [_ConversationState(script, start) for script in scripts if len(script)]
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def converse(state: _ConversationState):
+            script = state.script
+            try:
+                for turn in script.turns:
+                    async with semaphore:
+                        turn_start = self.model.clock.now()
+                        response = await self.model.areply(turn["user"], turn.get("context"), session_id=script.name)
+                    state.turn_latencies.append(self.model.clock.now() - turn_start)
+                    state.responses.append(response)
+                    self._verify(state, turn, response)
+                    state.next_turn += 1
+            except Exception as e:
+                state.error = e
+                logger.warning(f"Conversation {script.name!r} failed at turn {state.next_turn}: {e}")
+            state.finished_at = self.model.clock.now()
+
+        await asyncio.gather(*(converse(state) for state in states))
+        return self._report(states, self.model.clock.now() - start)
+
+    @staticmethod
+    def _check_names(scripts: Sequence[ConversationScript]):
+        names = [script.name for script in scripts]
+        if len(set(names)) != len(names):
+            raise ValueError("腳本名稱不可重複（名稱即 session_id）")
+
+    def _report(self, states: List[_ConversationState], wall_time: float) -> Dict:
+        conversations = {}
+        for state in states:
+            name = state.script.name
+            conversations[name] = {
+                "responses": state.responses,
+                "turn_latencies": state.turn_latencies,
+                # 從開始執行到最後一輪完成，包含等待執行緒池的時間
+                "latency": state.finished_at - state.started_at,
+                "failures": state.failures,
+                "error": state.error,
+            }
+            if not self.keep_sessions:
+                self.model.end_session(name)
+
+        failures = sum(len(state.failures) + (state.error is not None) for state in states)
+        logger.info(
+            f"Ran {len(states)} scripted conversations "
+            f"({sum(len(state.responses) for state in states)} turns) in {wall_time:.2f}s, {failures} failures"
+        )
+        return {
+            "conversations": conversations,
+            "turn_latency": _summarize([latency for state in states for latency in state.turn_latencies]),
+            "conversation_latency": _summarize([conversation["latency"] for conversation in conversations.values()]),
+            "wall_time": wall_time,
+            "failures": failures,
+        }
@@ -0,0 +1,56 @@
+"""
+請求期限 - 以 contextvar 傳遞單次呼叫的截止時間
+ChatModel 設定期限後，後端（包含包裝後端與其背景執行緒）都能讀到剩餘時間；
+期限以設定時傳入的時鐘計時，使用 VirtualClock 時為邏輯時間
+"""
+
+import contextvars
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from ai_models.clock import Clock, SystemClock
+
+_SYSTEM_CLOCK = SystemClock()
+
+# (時鐘, 以該時鐘表示的截止時間)
+_deadline: contextvars.ContextVar = contextvars.ContextVar("chat_deadline", default=None)
+
+
+@contextmanager
+def deadline_scope(timeout: Optional[float], clock: Optional[Clock] = None) -> Iterator[None]:
+    """
+    在區塊內設定呼叫期限；巢狀設定時取較早的期限
+
+    Args:
+        timeout: 從現在起算的秒數，None 表示不設定
+        clock: 計時的時鐘，預設為真實時間
+    """
+    if timeout is None:
+        yield
+        return
+    clock = clock or _SYSTEM_CLOCK
+    current_remaining = remaining_time()
+    if current_remaining is not None and current_remaining <= timeout:
+        yield
+        return
+    token = _deadline.set((clock, clock.now() + timeout))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """目前期限的剩餘秒數（可能為負），沒有期限時回傳 None"""
+    current = _deadline.get()
+    if current is None:
+        return None
+    clock, deadline = current
+    return deadline - clock.now()
+
+
+def check_deadline():
+    """期限已過時拋出 TimeoutError"""
+    remaining = remaining_time()
+    if remaining is not None and remaining <= 0:
+        raise TimeoutError("已超過請求期限")
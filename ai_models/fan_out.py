@@ -0,0 +1,166 @@
+"""
+多模型並行比較 (fan-out)
+同一個 prompt 或資料集同時送往多個模型設定，以有上限的執行緒池並行呼叫，
+結果依完成順序產出，並在成對結果到齊時立即交給 ResponseEvaluator.compare_responses
+"""
+
+import uuid
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Sequence, Union
+
+from ai_models.chat_model import ChatModel
+from ai_models.response_evaluator import ResponseEvaluator
+
+logger = logging.getLogger(__name__)
+
+
+class ModelFanOut:
+    """多模型並行呼叫器"""
+
+    def __init__(
+        self,
+        models: Dict[str, ChatModel],
+        max_workers: int = 8,
+        evaluator: Optional[ResponseEvaluator] = None,
+    ):
+        """
+        初始化多模型並行呼叫器
+
+        Args:
+            models: {名稱: ChatModel}，名稱用於標示結果
+            max_workers: 同時進行的呼叫數上限
+            evaluator: 比較回應用的評估器，預設為 ResponseEvaluator()
+        """
+        if not models:
+            raise ValueError("models 至少需要一個模型")
+        self.models = dict(models)
+        self.max_workers = max_workers
+        self.evaluator = evaluator or ResponseEvaluator()
+
+    @classmethod
+    def from_configs(cls, configs: Dict[str, Dict], **kwargs) -> "ModelFanOut":
+        """
+        依模型設定建立
+
+        Args:
+            configs: {名稱: ChatModel 參數}，例如 {"low_temp": {"temperature": 0.1}}
+            **kwargs: 傳給建構子的其他參數
+        """
+        return cls({name: ChatModel(**config) for name, config in configs.items()}, **kwargs)
+
+    def _call(self, run_id: str, name: str, index: int, prompt: str, context: Optional[Dict]) -> Dict:
+        model = self.models[name]
+        # 每次執行、每個模型、每筆資料使用獨立的對話，避免並行的請求
+        # （包含同時進行的多次 run，或同一個 ChatModel 以不同名稱出現）互相污染對話歷史
+        session_id = ("fan_out", run_id, name, index)
+        start = model.clock.now()
+        try:
+            response, error = model.reply(prompt, context, session_id=session_id), None
+        except Exception as e:
+            response, error = None, e
+        finally:
+            model.end_session(session_id)
+        return {
+            "model": name,
+            "index": index,
+            "prompt": prompt,
+            "response": response,
+            "latency": model.clock.now() - start,
+            "error": error,
+        }
+
+    def run(
+        self,
+        prompts: Union[str, Sequence[str]],
+        contexts: Optional[Sequence[Optional[Dict]]] = None,
+    ) -> Iterator[Dict]:
+        """
+        並行呼叫所有模型，依完成順序產出結果
+
+        Args:
+            prompts: 單一 prompt 或 prompt 列表
+            contexts: 對應每個 prompt 的上下文資訊
+
+        Returns:
+            結果迭代器，每筆為 {model, index, prompt, response, latency, error}
+        """
+        prompts = [prompts] if isinstance(prompts, str) else list(prompts)
+        contexts = list(contexts) if contexts is not None else [None] * len(prompts)
+        run_id = uuid.uuid4().hex
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="fan-out") as executor:
+            # 依資料順序交錯送出，讓各模型同時推進
+            futures = [
+                executor.submit(self._call, run_id, name, index, prompt, context)
+                for index, (prompt, context) in enumerate(zip(prompts, contexts))
+                for name in self.models
+            ]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def compare(
+        self,
+        prompts: Union[str, Sequence[str]],
+        contexts: Optional[Sequence[Optional[Dict]]] = None,
+        baseline: Optional[str] = None,
+    ) -> Dict:
+        """
+        並行呼叫所有模型，並將每個模型的回應與基準模型比較
+
+        Args:
+            prompts: 單一 prompt 或 prompt 列表
+            contexts: 對應每個 prompt 的上下文資訊
+            baseline: 基準模型名稱，預設為第一個模型
+
+        Returns:
+            比較結果字典：responses（{模型: 依資料順序的回應}）、comparisons（依完成順序的比較結果）、
+            model_time（各模型累計呼叫秒數，以各模型的時鐘計時）、wall_time（以基準模型的時鐘計時）、errors
+        """
+        baseline = baseline or next(iter(self.models))
+        if baseline not in self.models:
+            raise ValueError(f"未知的基準模型：{baseline}")
+
+        num_prompts = 1 if isinstance(prompts, str) else len(prompts)
+        responses: Dict[str, List[Optional[str]]] = {name: [None] * num_prompts for name in self.models}
+        finished: Dict[int, Dict[str, Dict]] = {}
+        model_time = {name: 0.0 for name in self.models}
+        comparisons: List[Dict] = []
+        errors: List[Dict] = []
+
+        clock = self.models[baseline].clock
+        start = clock.now()
+        for result in self.run(prompts, contexts):
+            name, index = result["model"], result["index"]
+            model_time[name] += result["latency"]
+            if result["error"] is not None:
+                errors.append(result)
+                continue
+            responses[name][index] = result["response"]
+            done = finished.setdefault(index, {})
+            done[name] = result
+
+            # 成對結果到齊就比較，不等整批完成
+            if name == baseline:
+                pending = [other for other in done.values() if other["model"] != baseline]
+            elif baseline in done:
+                pending = [result]
+            else:
+                pending = []
+            for other in pending:
+                comparison = self.evaluator.compare_responses(done[baseline]["response"], other["response"])
+                comparison.update({"index": index, "baseline": baseline, "model": other["model"]})
+                comparisons.append(comparison)
+
+        wall_time = clock.now() - start
+        logger.info(
+            f"Compared {len(self.models)} models on {num_prompts} prompts in {wall_time:.2f}s "
+            f"(sum of model time {sum(model_time.values()):.2f}s, {len(errors)} errors)"
+        )
+        return {
+            "responses": responses,
+            "comparisons": comparisons,
+            "model_time": model_time,
+            "wall_time": wall_time,
+            "errors": errors,
+        }
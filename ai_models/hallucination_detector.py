@@ -3,10 +3,12 @@ HallucinationDetector - AI 幻覺檢測器
 檢測 AI 是否產生虛構或不準確的資訊
 """
 
-from typing import Dict, List, Optional, Set
+from typing import Dict, List, Optional, Set, Union
 import re
 import logging
 
+from ai_models.text_analysis import AnalyzedText, analyze
+
 logger = logging.getLogger(__name__)
 
 
@@ -31,19 +33,23 @@ class HallucinationDetector:
         ]
 
     def detect_hallucination(
-        self, response: str, known_facts: Optional[List[str]] = None, context: Optional[str] = None
+        self,
+        response: Union[str, AnalyzedText],
+        known_facts: Optional[List[str]] = None,
+        context: Optional[Union[str, AnalyzedText]] = None,
     ) -> Dict:
         """
         綜合檢測幻覺
 
         Args:
-            response: AI 回應文字
+            response: AI 回應文字，傳入 AnalyzedText 時沿用其快取的分析結果
             known_facts: 已知的事實列表
             context: 原始上下文
 
         Returns:
             檢測結果字典
         """
+        response = analyze(response)
         results = {
             "response": response,
             "has_hallucination": False,
@@ -100,7 +106,7 @@ class HallucinationDetector:
         Returns:
             信心分析結果
         """
-        text_lower = text.lower()
+        text_lower = analyze(text).lowered
 
         high_count = sum(text_lower.count(indicator) for indicator in self.confidence_indicators["high"])
 
@@ -187,8 +193,8 @@ class HallucinationDetector:
         conflicts = []
 
         # 提取上下文中的關鍵資訊（數字、日期、名稱等）
-        context_numbers = set(re.findall(r"\d+", context))
-        response_numbers = set(re.findall(r"\d+", response))
+        context_numbers = set(analyze(context).numbers)
+        response_numbers = set(analyze(response).numbers)
 
         # 檢查是否出現了上下文中沒有的數字（可能是編造的）
         new_numbers = response_numbers - context_numbers
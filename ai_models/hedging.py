@@ -0,0 +1,298 @@
+"""
+對沖請求 (Hedged requests) - 降低尾端延遲
+請求超過近期延遲的指定百分位仍未完成時，再送出一個相同的請求，採用先完成者並取消另一個；
+ChatModel(hedging_policy=...) 以 HedgedBackend 包裝後端，reply/areply 可逐次以 hedge=False 關閉
+"""
+
+import bisect
+import asyncio
+import threading
+import contextvars
+import logging
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional
+
+from ai_models.backends import ChatBackend
+from ai_models.clock import Clock, SystemClock
+from ai_models.deadline import remaining_time
+
+logger = logging.getLogger(__name__)
+
+
+class HedgingPolicy:
+    """依近期觀察到的延遲分佈決定何時送出對沖請求"""
+
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        min_samples: int = 20,
+        window: int = 1000,
+        min_delay: float = 0.0,
+        initial_delay: Optional[float] = None,
+    ):
+        """
+        Args:
+            percentile: 等待到近期延遲的第幾百分位仍未完成才對沖 (0-100)
+            min_samples: 累積多少筆延遲後才開始依百分位對沖
+            window: 保留最近多少筆延遲
+            min_delay: 對沖前最少等待的秒數
+            initial_delay: 樣本不足時使用的固定等待秒數，None 表示樣本不足時不對沖
+        """
+        if not 0 < percentile < 100:
+            raise ValueError("percentile 必須介於 0 與 100 之間")
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.initial_delay = initial_delay
+        self._latencies: deque = deque(maxlen=window)
+        # 與 _latencies 內容相同但已排序，每次請求取百分位不必重新排序整個視窗
+        self._sorted: List[float] = []
+        self._lock = threading.Lock()
+
+    def observe(self, latency: float):
+        """記錄一次後端呼叫的延遲"""
+        with self._lock:
+            if len(self._latencies) == self._latencies.maxlen:
+                del self._sorted[bisect.bisect_left(self._sorted, self._latencies[0])]
+            self._latencies.append(latency)
+            bisect.insort(self._sorted, latency)
+
+    def hedge_delay(self) -> Optional[float]:
+        """
+        目前的對沖等待時間
+
+        Returns:
+            秒數；None 表示不對沖
+        """
+        with self._lock:
+            ordered = self._sorted
+            if len(ordered) < self.min_samples:
+                delay = self.initial_delay
+            else:
+                delay = ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))]
+        return None if delay is None else max(delay, self.min_delay)
+
+    def expected_remaining(self, elapsed: float) -> float:
+        """依延遲分佈估算已執行 elapsed 秒的請求還需要多久（用於估算被取消的請求）"""
+        with self._lock:
+            slower = self._sorted[bisect.bisect_right(self._sorted, elapsed):]
+        if not slower:
+            return 0.0
+        return sum(slower) / len(slower) - elapsed
+
+
+class HedgedBackend(ChatBackend):
+    """
+    對沖請求後端，包裝另一個後端使用
+
+    同步呼叫以執行緒池送出請求，落後的執行緒無法中斷，會在背景跑完並以實際延遲計算節省的時間；
+    非同步呼叫則直接取消落後的 task，節省的時間依延遲分佈估算。
+    串流與批次請求不對沖，直接交給後端
+    """
+
+    def __init__(
+        self,
+        backend: ChatBackend,
+        policy: Optional[HedgingPolicy] = None,
+        max_workers: int = 32,
+        clock: Optional[Clock] = None,
+    ):
+        """
+        初始化對沖後端
+
+        Args:
+            backend: 實際的後端
+            policy: 對沖策略，預設為 HedgingPolicy()
+            max_workers: 同步呼叫使用的執行緒數
+            clock: 量測延遲樣本與等待對沖時機的時鐘，預設沿用後端的 clock（例如 MockBackend），沒有時為真實時間
+        """
+        self.backend = backend
+        self.policy = policy or HedgingPolicy()
+        self.clock = clock or getattr(backend, "clock", None) or SystemClock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedged-request")
+
+        # 統計資料
+        self._stats_lock = threading.Lock()
+        self.request_count = 0
+        self.hedge_fired = 0
+        self.hedge_wins = 0
+        self.latency_saved = 0.0
+
+    def _hedge_delay(self) -> Optional[float]:
+        delay = self.policy.hedge_delay()
+        remaining = remaining_time()
+        if delay is not None and remaining is not None and delay >= remaining:
+            return None  # 期限內等不到對沖時機
+        return delay
+
+    def _record(self, requests: int = 0, hedges: int = 0, wins: int = 0, saved: float = 0.0):
+        with self._stats_lock:
+            self.request_count += requests
+            self.hedge_fired += hedges
+            self.hedge_wins += wins
+            self.latency_saved += saved
+
+    # ---- 同步 ----
+
+    def _timed(self, call: Callable[[], str]) -> str:
+        start = self.clock.now()
+        result = call()
+        self.policy.observe(self.clock.now() - start)
+        return result
+
+    def _submit(self, call: Callable[[], str]) -> Future:
+        # 複製 contextvars，讓背景執行緒也能讀到呼叫期限
+        return self._executor.submit(contextvars.copy_context().run, self._timed, call)
+
+    def _hedged_call(self, call: Callable[[], str]) -> str:
+        self._record(requests=1)
+        start = self.clock.now()
+        primary = self._submit(call)
+        delay = self._hedge_delay()
+        attempts = [primary]
+        # 對沖時機從送出主請求起算（虛擬時鐘下主請求可能在開始等待前就已推進邏輯時間）
+        if delay is not None and not self.clock.wait([primary], timeout=delay, since=start)[0]:
+            attempts.append(self._submit(call))
+            self._record(hedges=1)
+            logger.debug(f"Hedge fired after {delay * 1000:.1f} ms")
+
+        pending = set(attempts)
+        winner = None
+        try:
+            while winner is None:
+                checked_at = self.clock.now()
+                remaining = remaining_time()
+                timeout = max(0.0, remaining) if remaining is not None else None
+                done, pending = self.clock.wait(pending, timeout=timeout, return_when=FIRST_COMPLETED, since=checked_at)
+                if not done:
+                    raise TimeoutError("已超過請求期限")
+                winner = next((future for future in attempts if future in done and future.exception() is None), None)
+                if winner is None and not pending:
+                    raise next(future.exception() for future in done)
+        finally:
+            # 包含期限逾時：還在佇列中的請求不再送出（已在執行的執行緒無法中斷）
+            for future in pending:
+                future.cancel()
+
+        won_at = self.clock.now()
+        if winner is not primary:
+            self._record(wins=1)
+            if not primary.done():
+                # 執行中的主請求無法中斷，等它自然結束後記錄實際節省的時間
+                primary.add_done_callback(lambda _: self._record(saved=self.clock.now() - won_at))
+        return winner.result()
+
+    def complete(
+        self, messages: List[Dict[str, str]], model_name: str, temperature: float, context: Optional[Dict] = None
+    ) -> str:
+        return self._hedged_call(lambda: self.backend.complete(messages, model_name, temperature, context))
+
+    # ---- 非同步 ----
+
+    async def _atimed(self, call: Callable[[], Awaitable[str]]) -> str:
+        start = self.clock.now()
+        result = await call()
+        self.policy.observe(self.clock.now() - start)
+        return result
+
+    async def _ahedged_call(self, call: Callable[[], Awaitable[str]]) -> str:
+        self._record(requests=1)
+        start = self.clock.now()
+        primary = asyncio.ensure_future(self._atimed(call))
+        delay = self._hedge_delay()
+        attempts = [primary]
+        if delay is not None:
+            done, _ = await self.clock.await_tasks([primary], timeout=delay, since=start)
+            if not done:
+                attempts.append(asyncio.ensure_future(self._atimed(call)))
+                self._record(hedges=1)
+                logger.debug(f"Hedge fired after {delay * 1000:.1f} ms")
+
+        pending = set(attempts)
+        winner = None
+        try:
+            while winner is None:
+                checked_at = self.clock.now()
+                remaining = remaining_time()
+                timeout = max(0.0, remaining) if remaining is not None else None
+                done, pending = await self.clock.await_tasks(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED, since=checked_at
+                )
+                if not done:
+                    raise TimeoutError("已超過請求期限")
+                winner = next((task for task in attempts if task in done and task.exception() is None), None)
+                if winner is None and not pending:
+                    raise next(task.exception() for task in done)
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if winner is not primary:
+            self._record(wins=1)
+            if primary in pending:
+                # 主請求已被取消，依延遲分佈估算它還需要多久
+                elapsed = self.clock.now() - start
+                self._record(saved=self.policy.expected_remaining(elapsed))
+                self.policy.observe(elapsed)
+        return winner.result()
+
+    async def acomplete(
+        self, messages: List[Dict[str, str]], model_name: str, temperature: float, context: Optional[Dict] = None
+    ) -> str:
+        return await self._ahedged_call(lambda: self.backend.acomplete(messages, model_name, temperature, context))
+
+    # ---- 不對沖的呼叫 ----
+
+    def complete_batch(
+        self,
+        batch_messages: List[List[Dict[str, str]]],
+        model_name: str,
+        temperature: float,
+        contexts: Optional[List[Optional[Dict]]] = None,
+    ) -> List[str]:
+        return self.backend.complete_batch(batch_messages, model_name, temperature, contexts)
+
+    def stream(
+        self, messages: List[Dict[str, str]], model_name: str, temperature: float, context: Optional[Dict] = None
+    ) -> Iterator[str]:
+        return self.backend.stream(messages, model_name, temperature, context)
+
+    def astream(
+        self, messages: List[Dict[str, str]], model_name: str, temperature: float, context: Optional[Dict] = None
+    ) -> AsyncIterator[str]:
+        return self.backend.astream(messages, model_name, temperature, context)
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        取得對沖統計，可直接交給 AIMetricsCollector.record_performance_metrics
+
+        Returns:
+            requests, hedge_fired, hedge_wins, hedge_rate, hedge_latency_saved（累計節省秒數）
+        """
+        with self._stats_lock:
+            return {
+                "requests": self.request_count,
+                "hedge_fired": self.hedge_fired,
+                "hedge_wins": self.hedge_wins,
+                "hedge_rate": self.hedge_fired / self.request_count if self.request_count else 0.0,
+                "hedge_latency_saved": self.latency_saved,
+            }
+
+    def export(self, collector, model_name: str):
+        """
+        將對沖統計寫入 AIMetricsCollector.record_performance_metrics
+
+        Args:
+            collector: AIMetricsCollector 實例
+            model_name: 指標標示的模型名稱
+        """
+        collector.record_performance_metrics(model_name, self.get_stats())
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.backend.close()
+
+    async def aclose(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        await self.backend.aclose()
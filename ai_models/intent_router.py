@@ -0,0 +1,165 @@
+"""
+意圖路由 - 以關鍵字規則決定 Mock 回應
+所有規則的關鍵字編譯成單一 Aho-Corasick 自動機，一次掃描找出命中的規則，再依優先權決定回應
+"""
+
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+from ai_models.automaton import AhoCorasick
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FALLBACK_RESPONSE = "我理解您的問題：「{prompt}」。這是一個很好的問題，讓我為您提供相關資訊..."
+
+# 預設規則，與原本 MockBackend 的判斷順序一致（優先權越高越先採用）
+DEFAULT_INTENT_RULES = [
+    {
+        "name": "greeting",
+        "keywords": ["你好", "hello", "hi", "嗨"],
+        "response": "你好！我是 SysTalk.Chat AI 助手，很高興為您服務。有什麼我可以幫助您的嗎？",
+        "priority": 30,
+    },
+    {
+        "name": "account",
+        "keywords": ["帳戶", "餘額"],
+        "response": "您的帳戶餘額為 NT$10,000。如需更詳細的交易記錄，請告訴我您想查詢的時間範圍。",
+        "priority": 20,
+    },
+    {
+        "name": "weather",
+        "keywords": ["天氣"],
+        "response": "今天台北市天氣晴朗，溫度約 25°C，適合外出活動。",
+        "priority": 10,
+    },
+]
+
+
+class IntentRule:
+    """單一意圖規則"""
+
+    __slots__ = ("name", "keywords", "response", "priority")
+
+    def __init__(self, name: str, keywords: Sequence[str], response: str, priority: int = 0):
+        """
+        Args:
+            name: 意圖名稱
+            keywords: 觸發關鍵字（不分大小寫，子字串比對）
+            response: 回應模板，{prompt} 會被替換為用戶輸入
+            priority: 優先權，多條規則同時命中時採用最高者；相同時採用先定義者
+        """
+        if not keywords:
+            raise ValueError(f"意圖 {name} 至少需要一個關鍵字")
+        self.name = name
+        self.keywords = [keyword.lower() for keyword in keywords]
+        self.response = response
+        self.priority = priority
+
+    def render(self, prompt: str) -> str:
+        """產生回應文本"""
+        return self.response.replace("{prompt}", prompt)
+
+    def __repr__(self) -> str:
+        return f"IntentRule(name={self.name!r}, priority={self.priority})"
+
+
+class IntentRouter:
+    """編譯後的意圖路由器"""
+
+    def __init__(self, rules: Sequence[Union[IntentRule, Dict]], fallback_response: str = DEFAULT_FALLBACK_RESPONSE):
+        """
+        編譯意圖規則
+
+        Args:
+            rules: IntentRule 或 {"name", "keywords", "response", "priority"} 字典的列表
+            fallback_response: 沒有規則命中時的回應模板
+        """
+        self.rules: List[IntentRule] = [rule if isinstance(rule, IntentRule) else IntentRule(**rule) for rule in rules]
+        self.fallback_response = fallback_response
+
+        # 關鍵字 → 含有該關鍵字的規則索引（依優先權由高到低）
+        self._automaton = AhoCorasick(keyword for rule in self.rules for keyword in rule.keywords)
+        keyword_rules: List[List[int]] = [[] for _ in range(len(self._automaton))]
+        for rule_index, rule in enumerate(self.rules):
+            for keyword in rule.keywords:
+                keyword_rules[self._automaton.pattern_index(keyword)].append(rule_index)
+        self._keyword_rules = [tuple(sorted(set(r), key=self._rank, reverse=True)) for r in keyword_rules]
+        logger.debug(f"Compiled {len(self.rules)} intent rules into {len(self._automaton)} keywords")
+
+    def _rank(self, rule_index: int) -> tuple:
+        return (self.rules[rule_index].priority, -rule_index)
+
+    @classmethod
+    def default(cls) -> "IntentRouter":
+        """建立使用預設規則的路由器"""
+        return cls(DEFAULT_INTENT_RULES)
+
+    @classmethod
+    def from_config(cls, config: Dict) -> "IntentRouter":
+        """
+        從設定字典建立路由器
+
+        Args:
+            config: {"fallback_response": "...", "intents": [{...}, ...]}
+        """
+        if "intents" not in config:
+            raise ValueError("意圖設定缺少 intents 欄位")
+        return cls(config["intents"], config.get("fallback_response", DEFAULT_FALLBACK_RESPONSE))
+
+    @classmethod
+    def from_yaml(cls, path: Union[str, Path]) -> "IntentRouter":
+        """
+        從 YAML 檔案載入意圖規則（格式見 config/intents/systalk_intents.yaml）
+
+        Args:
+            path: YAML 檔案路徑
+        """
+        import yaml
+
+        with open(path, "r", encoding="utf-8") as f:
+            router = cls.from_config(yaml.safe_load(f))
+        logger.info(f"Loaded {len(router.rules)} intent rules from {path}")
+        return router
+
+    def match(self, prompt: str) -> Optional[IntentRule]:
+        """
+        找出命中的最高優先權規則
+
+        Args:
+            prompt: 用戶輸入
+
+        Returns:
+            命中的 IntentRule，沒有命中時為 None
+        """
+        best = -1
+        best_rank = None
+        keyword_rules = self._keyword_rules
+        for _, pattern_index in self._automaton.iter_matches(prompt.lower()):
+            rule_index = keyword_rules[pattern_index][0]
+            rank = self._rank(rule_index)
+            if best_rank is None or rank > best_rank:
+                best, best_rank = rule_index, rank
+        return self.rules[best] if best != -1 else None
+
+    def match_all(self, prompt: str) -> List[IntentRule]:
+        """回傳所有命中的規則，依優先權排序"""
+        matched = set()
+        for _, pattern_index in self._automaton.iter_matches(prompt.lower()):
+            matched.update(self._keyword_rules[pattern_index])
+        return [self.rules[i] for i in sorted(matched, key=self._rank, reverse=True)]
+
+    def route(self, prompt: str) -> str:
+        """
+        依命中的規則產生回應，沒有命中時使用預設回應
+
+        Args:
+            prompt: 用戶輸入
+
+        Returns:
+            回應文本
+        """
+        rule = self.match(prompt)
+        if rule is not None:
+            return rule.render(prompt)
+        return self.fallback_response.replace("{prompt}", prompt)
@@ -0,0 +1,194 @@
+"""
+Mock 後端的延遲與故障模型
+延遲可取自固定值、對數常態分佈、含慢尾端的混合分佈或依 prompt token 數計算；
+故障模型依設定的比例注入逾時、5xx 錯誤與中途斷線的串流
+"""
+
+import math
+import random
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ai_models.tokenizer import estimate_tokens_many
+
+try:
+    import httpx
+except ImportError:  # httpx 為選用依賴，未安裝時以 ConnectionError 模擬 5xx
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyModel:
+    """延遲模型介面"""
+
+    def sample(self, rng: random.Random, messages: List[Dict[str, str]]) -> float:
+        """
+        取樣一次呼叫的延遲
+
+        Args:
+            rng: 亂數產生器（由後端提供，可用 seed 重現）
+            messages: 本次請求的訊息列表
+
+        Returns:
+            延遲秒數
+        """
+        raise NotImplementedError
+
+
+class FixedLatency(LatencyModel):
+    """固定延遲"""
+
+    def __init__(self, seconds: float):
+        if seconds < 0:
+            raise ValueError("seconds 不可為負數")
+        self.seconds = seconds
+
+    def sample(self, rng: random.Random, messages: List[Dict[str, str]]) -> float:
+        return self.seconds
+
+
+class LogNormalLatency(LatencyModel):
+    """對數常態分佈延遲，真實 API 的延遲通常右偏"""
+
+    def __init__(self, median: float, sigma: float = 0.5, max_latency: Optional[float] = None):
+        """
+        Args:
+            median: 延遲中位數（秒）
+            sigma: 對數標準差，越大尾端越長
+            max_latency: 延遲上限（秒），None 表示不限制
+        """
+        if median <= 0:
+            raise ValueError("median 必須大於 0")
+        self.mu = math.log(median)
+        self.sigma = sigma
+        self.max_latency = max_latency
+
+    def sample(self, rng: random.Random, messages: List[Dict[str, str]]) -> float:
+        latency = rng.lognormvariate(self.mu, self.sigma)
+        return min(latency, self.max_latency) if self.max_latency is not None else latency
+
+
+class MixtureLatency(LatencyModel):
+    """混合分佈，依權重選擇其中一個延遲模型"""
+
+    def __init__(self, components: Sequence[Tuple[float, LatencyModel]]):
+        """
+        Args:
+            components: [(權重, 延遲模型), ...]，權重會正規化
+        """
+        total = sum(weight for weight, _ in components)
+        if not components or total <= 0:
+            raise ValueError("components 至少需要一個權重大於 0 的模型")
+        self.models = [model for _, model in components]
+        self.cumulative: List[float] = []
+        acc = 0.0
+        for weight, _ in components:
+            acc += weight / total
+            self.cumulative.append(acc)
+
+    @classmethod
+    def slow_tail(cls, base: LatencyModel, tail: LatencyModel, tail_probability: float = 0.05) -> "MixtureLatency":
+        """
+        建立含慢尾端的混合分佈
+
+        Args:
+            base: 一般請求的延遲模型
+            tail: 慢請求的延遲模型
+            tail_probability: 慢請求的比例
+        """
+        return cls([(1 - tail_probability, base), (tail_probability, tail)])
+
+    def sample(self, rng: random.Random, messages: List[Dict[str, str]]) -> float:
+        draw = rng.random()
+        for threshold, model in zip(self.cumulative, self.models):
+            if draw < threshold:
+                return model.sample(rng, messages)
+        return self.models[-1].sample(rng, messages)
+
+
+class TokenLatency(LatencyModel):
+    """依 prompt token 數計算的延遲：base + per_token * tokens（可再加上隨機抖動）"""
+
+    def __init__(self, base: float, per_token: float, jitter: Optional[LatencyModel] = None):
+        """
+        Args:
+            base: 固定開銷（秒）
+            per_token: 每個 prompt token 增加的秒數
+            jitter: 額外加上的隨機延遲模型
+        """
+        self.base = base
+        self.per_token = per_token
+        self.jitter = jitter
+
+    def sample(self, rng: random.Random, messages: List[Dict[str, str]]) -> float:
+        tokens = sum(estimate_tokens_many([message["content"] for message in messages]))
+        latency = self.base + self.per_token * tokens
+        if self.jitter is not None:
+            latency += self.jitter.sample(rng, messages)
+        return latency
+
+
+class FailureModel:
+    """依比例注入故障：逾時、5xx 錯誤、串流中途斷線"""
+
+    TIMEOUT = "timeout"
+    SERVER_ERROR = "server_error"
+    PARTIAL_STREAM = "partial_stream"
+
+    def __init__(
+        self,
+        timeout_rate: float = 0.0,
+        server_error_rate: float = 0.0,
+        partial_stream_rate: float = 0.0,
+        server_error_codes: Sequence[int] = (500, 502, 503),
+        timeout_after: Optional[float] = None,
+    ):
+        """
+        Args:
+            timeout_rate: 請求逾時的比例
+            server_error_rate: 回傳 5xx 的比例
+            partial_stream_rate: 串流輸出一部分後中斷的比例（只影響串流請求）
+            server_error_codes: 5xx 錯誤隨機選用的狀態碼
+            timeout_after: 逾時前等待的秒數，None 表示等待取樣到的延遲
+        """
+        rates = (timeout_rate, server_error_rate, partial_stream_rate)
+        if any(rate < 0 for rate in rates) or sum(rates) > 1:
+            raise ValueError("故障比例必須不小於 0 且總和不超過 1")
+        self.timeout_rate = timeout_rate
+        self.server_error_rate = server_error_rate
+        self.partial_stream_rate = partial_stream_rate
+        self.server_error_codes = tuple(server_error_codes)
+        self.timeout_after = timeout_after
+
+    def draw(self, rng: random.Random, streaming: bool = False) -> Optional[str]:
+        """
+        決定本次呼叫注入的故障
+
+        Returns:
+            TIMEOUT、SERVER_ERROR、PARTIAL_STREAM 或 None（正常）
+        """
+        draw = rng.random()
+        if draw < self.timeout_rate:
+            return self.TIMEOUT
+        draw -= self.timeout_rate
+        if draw < self.server_error_rate:
+            return self.SERVER_ERROR
+        draw -= self.server_error_rate
+        if streaming and draw < self.partial_stream_rate:
+            return self.PARTIAL_STREAM
+        return None
+
+    def server_error(self, rng: random.Random) -> Exception:
+        """
+        建立與 HttpxBackend 相同型別的 5xx 例外
+
+        Returns:
+            httpx.HTTPStatusError；未安裝 httpx 時為 ConnectionError
+        """
+        status_code = rng.choice(self.server_error_codes)
+        message = f"模擬的伺服器錯誤 {status_code}"
+        if httpx is None:
+            return ConnectionError(message)
+        request = httpx.Request("POST", "http://mock-backend/v1/chat/completions")
+        return httpx.HTTPStatusError(message, request=request, response=httpx.Response(status_code, request=request))
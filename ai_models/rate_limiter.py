@@ -0,0 +1,435 @@
+"""
+用戶端流量控制 - 在請求送往 LLM API 之前先行節流
+Token bucket 限制每秒請求數與 token 數，AIMD 依延遲與過載訊號（429 / 503 / 逾時）動態調整並行上限
+"""
+
+import time
+import asyncio
+import threading
+import logging
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+from ai_models.backends import ChatBackend
+from ai_models.tokenizer import estimate_tokens
+
+try:
+    import httpx
+except ImportError:  # httpx 為選用依賴，只用來辨識 HTTP 錯誤
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+OVERLOAD_STATUS_CODES = (429, 503)
+
+
+def is_overload_error(error: Exception) -> bool:
+    """判斷例外是否代表服務端過載（429 / 503 或逾時）"""
+    if isinstance(error, TimeoutError):
+        return True
+    if httpx is not None and isinstance(error, httpx.TimeoutException):
+        return True
+    status_code = getattr(getattr(error, "response", None), "status_code", None)
+    return status_code in OVERLOAD_STATUS_CODES
+
+
+def _retry_after(error: Exception) -> float:
+    """讀取回應的 Retry-After 標頭（秒），沒有時回傳 0"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return max(0.0, float(headers.get("Retry-After", 0)))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class TokenBucket:
+    """
+    Token bucket 限速器（預約制）
+
+    取用時直接扣除額度，額度不足時回傳需要等待的秒數，
+    同步與非同步呼叫端都只需睡眠一次，不必輪詢
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Args:
+            rate: 每秒補充的額度
+            capacity: 最大累積額度（瞬間爆量上限），預設為一秒的額度
+        """
+        if rate <= 0:
+            raise ValueError("rate 必須大於 0")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float = 1) -> float:
+        """
+        預約額度
+
+        Args:
+            amount: 需要的額度（超過 capacity 時以 capacity 計算）
+
+        Returns:
+            需要等待的秒數
+        """
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= amount
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def try_acquire(self, amount: float = 1) -> bool:
+        """額度足夠時立即取用並回傳 True，否則不取用並回傳 False"""
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens < amount:
+                return False
+            self._tokens -= amount
+            return True
+
+    def acquire(self, amount: float = 1):
+        """取用額度，不足時阻塞等待"""
+        wait = self.reserve(amount)
+        if wait:
+            time.sleep(wait)
+
+    async def aacquire(self, amount: float = 1):
+        """取用額度，不足時非阻塞等待"""
+        wait = self.reserve(amount)
+        if wait:
+            await asyncio.sleep(wait)
+
+
+class AIMDLimiter:
+    """
+    AIMD (Additive Increase / Multiplicative Decrease) 並行上限
+
+    每個成功的請求讓上限增加 1/limit（約每一輪往返 +1），
+    遇到過載或延遲超過門檻時上限乘以 backoff_ratio；
+    同一波過載只會調降一次（在上次調降之前送出的請求不再觸發調降）
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 256,
+        backoff_ratio: float = 0.9,
+        latency_threshold: Optional[float] = None,
+    ):
+        """
+        Args:
+            initial_limit: 初始並行上限
+            min_limit: 並行上限的下限
+            max_limit: 並行上限的上限
+            backoff_ratio: 過載時上限的縮減比例 (0-1)
+            latency_threshold: 延遲超過此值（秒）時視為過載，None 表示只看錯誤訊號
+        """
+        if not 0 < backoff_ratio < 1:
+            raise ValueError("backoff_ratio 必須介於 0 與 1 之間")
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError("必須滿足 1 <= min_limit <= initial_limit <= max_limit")
+
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.latency_threshold = latency_threshold
+        self.in_flight = 0
+        self.decrease_count = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    def try_acquire(self) -> Optional[float]:
+        """有空位時佔用並回傳開始時間，否則回傳 None"""
+        with self._condition:
+            if not self._has_capacity():
+                return None
+            self.in_flight += 1
+            return time.monotonic()
+
+    def acquire(self) -> float:
+        """佔用一個並行名額，額滿時阻塞等待；回傳開始時間供 release 使用"""
+        with self._condition:
+            self._condition.wait_for(self._has_capacity)
+            self.in_flight += 1
+            return time.monotonic()
+
+    async def aacquire(self) -> float:
+        """acquire 的非同步版本（額滿時以短暫睡眠讓出事件迴圈）"""
+        delay = 0.0005
+        while True:
+            started_at = self.try_acquire()
+            if started_at is not None:
+                return started_at
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.01)
+
+    def release(self, started_at: float, overloaded: bool = False):
+        """
+        釋放名額並依結果調整上限
+
+        Args:
+            started_at: acquire 回傳的開始時間
+            overloaded: 請求是否遇到過載訊號
+        """
+        now = time.monotonic()
+        latency = now - started_at
+        if self.latency_threshold is not None and latency > self.latency_threshold:
+            overloaded = True
+
+        with self._condition:
+            utilized = self.in_flight * 2 >= self.limit
+            self.in_flight -= 1
+            if overloaded:
+                if started_at >= self._last_decrease:
+                    self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+                    self._last_decrease = now
+                    self.decrease_count += 1
+            elif utilized:
+                # 只在上限確實被用到時才放大，避免閒置時上限無限成長
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
+
+
+class AdmissionController:
+    """
+    請求准入控制：token bucket（每秒請求數與 token 數）+ AIMD 並行上限
+
+    AdmissionController.shared() 回傳同一程序內共用的實例，
+    讓所有 ChatModel 對同一個 API 的請求共享節流狀態
+    """
+
+    _shared: Dict[str, "AdmissionController"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(
+        self,
+        requests_per_second: Optional[float] = None,
+        tokens_per_second: Optional[float] = None,
+        limiter: Optional[AIMDLimiter] = None,
+    ):
+        """
+        Args:
+            requests_per_second: 每秒請求數上限，None 表示不限制
+            tokens_per_second: 每秒 token 數上限（以輸入 token 估算），None 表示不限制
+            limiter: 並行上限控制器，預設為 AIMDLimiter()
+        """
+        self.request_bucket = TokenBucket(requests_per_second) if requests_per_second else None
+        self.token_bucket = TokenBucket(tokens_per_second) if tokens_per_second else None
+        self.limiter = limiter or AIMDLimiter()
+
+        # 統計資料
+        self._stats_lock = threading.Lock()
+        self.admitted_count = 0
+        self.overload_count = 0
+
+    @classmethod
+    def shared(cls, name: str = "default", **kwargs) -> "AdmissionController":
+        """
+        取得程序內共用的准入控制器，第一次呼叫時以 kwargs 建立
+
+        Args:
+            name: 共用實例名稱（通常對應一個 API 端點）
+        """
+        with cls._shared_lock:
+            controller = cls._shared.get(name)
+            if controller is None:
+                controller = cls._shared[name] = cls(**kwargs)
+            return controller
+
+    @classmethod
+    def reset_shared(cls):
+        """移除所有共用實例"""
+        with cls._shared_lock:
+            cls._shared.clear()
+
+    def acquire(self, tokens: int = 0) -> float:
+        """等待准入，回傳開始時間"""
+        if self.request_bucket is not None:
+            self.request_bucket.acquire()
+        if self.token_bucket is not None and tokens:
+            self.token_bucket.acquire(tokens)
+        return self._admitted(self.limiter.acquire())
+
+    async def aacquire(self, tokens: int = 0) -> float:
+        """acquire 的非同步版本"""
+        if self.request_bucket is not None:
+            await self.request_bucket.aacquire()
+        if self.token_bucket is not None and tokens:
+            await self.token_bucket.aacquire(tokens)
+        return self._admitted(await self.limiter.aacquire())
+
+    def _admitted(self, started_at: float) -> float:
+        with self._stats_lock:
+            self.admitted_count += 1
+        return started_at
+
+    def release(self, started_at: float, overloaded: bool = False):
+        """回報請求結果"""
+        if overloaded:
+            with self._stats_lock:
+                self.overload_count += 1
+        self.limiter.release(started_at, overloaded)
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        取得准入統計
+
+        Returns:
+            concurrency_limit, in_flight, admitted, overloaded, limit_decreases
+        """
+        with self._stats_lock:
+            return {
+                "concurrency_limit": self.limiter.limit,
+                "in_flight": self.limiter.in_flight,
+                "admitted": self.admitted_count,
+                "overloaded": self.overload_count,
+                "limit_decreases": self.limiter.decrease_count,
+            }
+
+
+class RateLimitedBackend(ChatBackend):
+    """
+    流量控制後端，包裝另一個後端使用
+
+    每個請求先經過 AdmissionController 准入；遇到過載錯誤時回報並在重試次數內重送
+    """
+
+    def __init__(
+        self,
+        backend: ChatBackend,
+        controller: Optional[AdmissionController] = None,
+        max_retries: int = 3,
+        token_counter: Callable[[str], int] = estimate_tokens,
+    ):
+        """
+        初始化流量控制後端
+
+        Args:
+            backend: 實際的後端
+            controller: 准入控制器，預設使用程序內共用的 AdmissionController.shared()
+            max_retries: 過載錯誤的重試次數
+            token_counter: 估算請求 token 數的函式（供 tokens_per_second 使用）
+        """
+        self.backend = backend
+        self.controller = controller or AdmissionController.shared()
+        self.max_retries = max_retries
+        self.token_counter = token_counter
+
+    def _count_tokens(self, messages: List[Dict[str, str]]) -> int:
+        if self.controller.token_bucket is None:
+            return 0
+        return sum(self.token_counter(message["content"]) for message in messages)
+
+    def _call(self, tokens: int, send: Callable):
+        for attempt in range(self.max_retries + 1):
+            started_at = self.controller.acquire(tokens)
+            overloaded = False
+            try:
+                return send()
+            except Exception as e:
+                overloaded = is_overload_error(e)
+                if not overloaded or attempt == self.max_retries:
+                    raise
+                logger.debug(f"Backend overloaded, retrying ({attempt + 1}/{self.max_retries}): {e}")
+                delay = _retry_after(e)
+            finally:
+                # 放在 finally：KeyboardInterrupt 等非 Exception 的中斷也要歸還並行名額
+                self.controller.release(started_at, overloaded)
+            if delay:
+                time.sleep(delay)
+
+    async def _acall(self, tokens: int, send: Callable):
+        for attempt in range(self.max_retries + 1):
+            started_at = await self.controller.aacquire(tokens)
+            overloaded = False
+            try:
+                return await send()
+            except Exception as e:
+                overloaded = is_overload_error(e)
+                if not overloaded or attempt == self.max_retries:
+                    raise
+                logger.debug(f"Backend overloaded, retrying ({attempt + 1}/{self.max_retries}): {e}")
+                delay = _retry_after(e)
+            finally:
+                # 放在 finally：呼叫端逾時取消（CancelledError）時也要歸還並行名額
+                self.controller.release(started_at, overloaded)
+            if delay:
+                await asyncio.sleep(delay)
+
+    def complete(
+        self, messages: List[Dict[str, str]], model_name: str, temperature: float, context: Optional[Dict] = None
+    ) -> str:
+        return self._call(
+            self._count_tokens(messages),
+            lambda: self.backend.complete(messages, model_name, temperature, context),
+        )
+
+    async def acomplete(
+        self, messages: List[Dict[str, str]], model_name: str, temperature: float, context: Optional[Dict] = None
+    ) -> str:
+        return await self._acall(
+            self._count_tokens(messages),
+            lambda: self.backend.acomplete(messages, model_name, temperature, context),
+        )
+
+    def complete_batch(
+        self,
+        batch_messages: List[List[Dict[str, str]]],
+        model_name: str,
+        temperature: float,
+        contexts: Optional[List[Optional[Dict]]] = None,
+    ) -> List[str]:
+        # 一個批次是一次往返，只佔用一個並行名額
+        return self._call(
+            sum(self._count_tokens(messages) for messages in batch_messages),
+            lambda: self.backend.complete_batch(batch_messages, model_name, temperature, contexts),
+        )
+
+    def stream(
+        self, messages: List[Dict[str, str]], model_name: str, temperature: float, context: Optional[Dict] = None
+    ) -> Iterator[str]:
+        # 串流開始輸出後無法重送，只做准入與結果回報
+        started_at = self.controller.acquire(self._count_tokens(messages))
+        overloaded = False
+        try:
+            yield from self.backend.stream(messages, model_name, temperature, context)
+        except Exception as e:
+            overloaded = is_overload_error(e)
+            raise
+        finally:
+            self.controller.release(started_at, overloaded)
+
+    async def astream(
+        self, messages: List[Dict[str, str]], model_name: str, temperature: float, context: Optional[Dict] = None
+    ) -> AsyncIterator[str]:
+        started_at = await self.controller.aacquire(self._count_tokens(messages))
+        overloaded = False
+        try:
+            async for chunk in self.backend.astream(messages, model_name, temperature, context):
+                yield chunk
+        except Exception as e:
+            overloaded = is_overload_error(e)
+            raise
+        finally:
+            self.controller.release(started_at, overloaded)
+
+    def get_stats(self) -> Dict[str, float]:
+        """取得准入統計"""
+        return self.controller.get_stats()
+
+    def close(self):
+        self.backend.close()
+
+    async def aclose(self):
+        await self.backend.aclose()
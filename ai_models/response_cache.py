@@ -0,0 +1,199 @@
+"""
+回應快取 - 以內容定址的 ChatModel 回應快取
+記憶體層為 LRU + TTL，磁碟層使用 SQLite，跨測試執行保留結果
+"""
+
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_prompt(prompt: str) -> str:
+    """正規化 prompt：Unicode NFKC、去除首尾空白並合併連續空白"""
+    return " ".join(unicodedata.normalize("NFKC", prompt).split())
+
+
+def _stable_hash(value) -> str:
+    data = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """兩層式回應快取"""
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: Optional[float] = 3600.0,
+        disk_path: Optional[Union[str, Path]] = None,
+        disk_ttl: Optional[float] = None,
+    ):
+        """
+        初始化回應快取
+
+        Args:
+            max_entries: 記憶體層最多保留的筆數（LRU 淘汰）
+            ttl: 記憶體層項目的存活時間（秒），None 表示不過期
+            disk_path: SQLite 檔案路徑，None 表示不啟用磁碟層
+            disk_ttl: 磁碟層項目的存活時間（秒），None 表示不過期
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_ttl = disk_ttl
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+        if disk_path is not None:
+            Path(disk_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(disk_path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT, created_at REAL)"
+            )
+            self._db.commit()
+
+        # 統計資料
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    @staticmethod
+    def make_key(
+        model_name: str,
+        temperature: float,
+        prompt: str,
+        context: Optional[Dict] = None,
+        history: Optional[List[Dict[str, str]]] = None,
+    ) -> str:
+        """
+        產生快取鍵
+
+        Args:
+            model_name: 模型名稱
+            temperature: 溫度參數
+            prompt: 用戶輸入（會先正規化）
+            context: 上下文資訊
+            history: 本輪之前的對話歷史
+
+        Returns:
+            SHA-256 十六進位字串
+        """
+        return _stable_hash(
+            {
+                "model": model_name,
+                "temperature": temperature,
+                "prompt": normalize_prompt(prompt),
+                "context": _stable_hash(context) if context else None,
+                "history": _stable_hash(history) if history else None,
+            }
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        """查詢快取，未命中回傳 None"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                response, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    self.bytes_saved += len(response.encode("utf-8"))
+                    return response
+                del self._memory[key]
+
+            response = self._disk_get(key)
+            if response is not None:
+                self._memory_set(key, response)
+                self.disk_hits += 1
+                self.bytes_saved += len(response.encode("utf-8"))
+                return response
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, response: str):
+        """寫入快取（同時寫入記憶體層與磁碟層）"""
+        with self._lock:
+            self._memory_set(key, response)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, created_at) VALUES (?, ?, ?)",
+                    (key, response, time.time()),
+                )
+                self._db.commit()
+
+    def _memory_set(self, key: str, response: str):
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        self._memory[key] = (response, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        if self._db is None:
+            return None
+        row = self._db.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        response, created_at = row
+        if self.disk_ttl is not None and created_at + self.disk_ttl < time.time():
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._db.commit()
+            return None
+        return response
+
+    def clear(self):
+        """清空記憶體層與磁碟層"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        取得快取統計
+
+        Returns:
+            hits, memory_hits, disk_hits, misses, hit_ratio, miss_ratio, bytes_saved, memory_entries
+        """
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            total = hits + self.misses
+            return {
+                "hits": hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": hits / total if total else 0.0,
+                "miss_ratio": self.misses / total if total else 0.0,
+                "bytes_saved": self.bytes_saved,
+                "memory_entries": len(self._memory),
+            }
+
+    def export(self, collector, model_name: str):
+        """
+        將快取統計寫入 AIMetricsCollector.record_cache_metrics
+
+        Args:
+            collector: AIMetricsCollector 實例
+            model_name: 指標標示的模型名稱
+        """
+        collector.record_cache_metrics(model_name, self.get_stats())
+
+    def close(self):
+        """關閉磁碟層連線"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
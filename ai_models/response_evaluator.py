@@ -3,42 +3,364 @@ ResponseEvaluator - AI 回應品質評估器
 評估 AI 回應的品質（相關性、完整性、準確性）
 """
 
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+import os
 import re
-from difflib import SequenceMatcher
+import math
+import time
+import hashlib
+import threading
+import itertools
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
 import logging
 
+from ai_models.automaton import AhoCorasick
+from ai_models.similarity import Similarity, get_similarity
+from ai_models.text_analysis import AnalyzedText, analyze
+
+try:
+    import numpy as np
+except ImportError:  # numpy 為選用依賴，只有向量化計分需要
+    np = None
+
 logger = logging.getLogger(__name__)
 
+# 不完整回應的指標（每出現一種扣 0.3 分）
+INCOMPLETE_INDICATORS = ("...", "[未完成]", "[待續]", "無法回答", "不知道", "沒有資訊")
+_SENTENCE_END_PATTERN = re.compile(r"[。！？.!?]$")
+
+# 相關性評估的停用詞
+STOP_WORDS = frozenset(
+    {"的", "是", "在", "了", "和", "有", "我", "你", "他", "她", "它", "the", "is", "in", "and", "of", "a", "to", "for"}
+)
+
+# BatchEvaluation.issue_flags 的位元
+ISSUE_LOW_KEYWORDS = 0x01
+ISSUE_LOW_RELEVANCE = 0x02
+
+# 分數欄位：(BatchEvaluation 欄位, evaluate_response 的 scores 鍵)
+_SCORE_COLUMNS = (
+    ("overall", "overall"),
+    ("length", "length"),
+    ("completeness", "completeness"),
+    ("keyword", "keywords"),
+    ("relevance", "relevance"),
+)
+
+
+# 關鍵詞數達到此值才以自動機比對；較少時逐一做 C 層的子字串搜尋反而更快
+_AUTOMATON_MIN_KEYWORDS = 128
+
+
+class KeywordSet:
+    """
+    預先編譯的關鍵詞集合（不分大小寫）
+
+    關鍵詞只在建立時轉小寫並編譯成 Aho-Corasick 自動機一次，之後可重複用於整批回應；
+    計分結果與逐一檢查 kw.lower() in response.lower() 相同（重複的關鍵詞各自計分，空字串視為命中）
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        """
+        Args:
+            keywords: 預期關鍵詞
+        """
+        self.keywords: List[str] = list(keywords)
+        lowered = [keyword.lower() for keyword in self.keywords]
+        self._automaton = AhoCorasick(lowered)
+        # 每個關鍵詞對應的自動機 pattern 索引，空字串為 None
+        self._slots: List[Optional[int]] = [
+            self._automaton.pattern_index(keyword) if keyword else None for keyword in lowered
+        ]
+        self._use_automaton = len(self._automaton) >= _AUTOMATON_MIN_KEYWORDS
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def _matched_patterns(self, text_lower: str) -> set:
+        if self._use_automaton:
+            return self._automaton.matched_indices(text_lower)
+        return {index for index, pattern in enumerate(self._automaton.patterns) if pattern in text_lower}
+
+    def hits(self, text: Union[str, AnalyzedText]) -> List[bool]:
+        """回傳每個關鍵詞是否出現在文字中（與 keywords 順序相同）"""
+        matched = self._matched_patterns(analyze(text).lowered)
+        return [slot is None or slot in matched for slot in self._slots]
+
+    def count(self, text: Union[str, AnalyzedText]) -> int:
+        """回傳文字中出現的關鍵詞數"""
+        return sum(self.hits(text))
+
+    def coverage(self, text: Union[str, AnalyzedText]) -> float:
+        """回傳關鍵詞涵蓋率 (0.0-1.0)，沒有關鍵詞時為 1.0"""
+        return self.count(text) / len(self.keywords) if self.keywords else 1.0
+
+    def match(self, text: Union[str, AnalyzedText]) -> Dict:
+        """
+        找出命中的關鍵詞與出現位置
+
+        Args:
+            text: 回應文字
+
+        Returns:
+            {"matched": 命中的關鍵詞, "missing": 未命中的關鍵詞,
+             "positions": {關鍵詞: [起始位置, ...]}, "coverage": 涵蓋率}；
+            位置為小寫文字中的索引（一般文字與原文相同）
+        """
+        positions: Dict[int, List[int]] = {}
+        for start, index in self._automaton.iter_matches(analyze(text).lowered):
+            positions.setdefault(index, []).append(start)
+
+        result = {"matched": [], "missing": [], "positions": {}, "coverage": 1.0}
+        for keyword, slot in zip(self.keywords, self._slots):
+            if slot is None or slot in positions:
+                result["matched"].append(keyword)
+                result["positions"][keyword] = sorted(positions.get(slot, []))
+            else:
+                result["missing"].append(keyword)
+        if self.keywords:
+            result["coverage"] = len(result["matched"]) / len(self.keywords)
+        return result
+
+
+class BatchEvaluation:
+    """
+    批次評估結果（欄式儲存）
+
+    每個分數欄位為 array('d')，passed 與 issue_flags 為 array('B')；
+    以索引取值時才組成與 evaluate_response 相同結構的字典
+    """
+
+    def __init__(self):
+        self.overall = array("d")
+        self.length = array("d")
+        self.completeness = array("d")
+        self.keyword = array("d")
+        self.relevance = array("d")
+        self.passed = array("B")
+        self.issue_flags = array("B")
+        self.elapsed = 0.0
+
+    @classmethod
+    def from_arrays(cls, overall, length, completeness, keyword, relevance, passed, issue_flags) -> "BatchEvaluation":
+        """由 numpy 陣列建立（直接複製記憶體，不逐筆轉換）"""
+        result = cls()
+        for column, values in zip(
+            ("overall", "length", "completeness", "keyword", "relevance"),
+            (overall, length, completeness, keyword, relevance),
+        ):
+            getattr(result, column).frombytes(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+        result.passed.frombytes(np.ascontiguousarray(passed, dtype=np.uint8).tobytes())
+        result.issue_flags.frombytes(np.ascontiguousarray(issue_flags, dtype=np.uint8).tobytes())
+        return result
+
+    def extend(self, other: "BatchEvaluation"):
+        """附加另一批結果"""
+        for column, _ in _SCORE_COLUMNS:
+            getattr(self, column).extend(getattr(other, column))
+        self.passed.extend(other.passed)
+        self.issue_flags.extend(other.issue_flags)
+
+    def __len__(self) -> int:
+        return len(self.overall)
+
+    def issues(self, index: int) -> List[str]:
+        """重建第 index 筆的問題描述（與 evaluate_response 的 issues 相同）"""
+        flags = self.issue_flags[index]
+        issues = []
+        if flags & ISSUE_LOW_KEYWORDS:
+            issues.append(f"缺少預期關鍵詞（分數：{self.keyword[index]:.2f}）")
+        if flags & ISSUE_LOW_RELEVANCE:
+            issues.append(f"回應與問題相關性低（分數：{self.relevance[index]:.2f}）")
+        return issues
+
+    def __getitem__(self, index: int) -> Dict:
+        """
+        Returns:
+            {"scores": {...}, "passed": bool, "issues": [...]}，不含回應本文
+        """
+        if index < 0:
+            index += len(self)
+        return {
+            "scores": {key: getattr(self, column)[index] for column, key in _SCORE_COLUMNS},
+            "passed": bool(self.passed[index]),
+            "issues": self.issues(index),
+        }
+
+    def summary(self) -> Dict:
+        """
+        Returns:
+            統計字典：count、passed、pass_rate、各分數平均、low_keywords、low_relevance、elapsed
+        """
+        count = len(self)
+        passed = sum(self.passed)
+        summary = {"count": count, "passed": passed, "pass_rate": passed / count if count else 0.0}
+        for column, key in _SCORE_COLUMNS:
+            values = getattr(self, column)
+            summary[f"mean_{key}"] = sum(values) / count if count else 0.0
+        summary["low_keywords"] = sum(1 for flags in self.issue_flags if flags & ISSUE_LOW_KEYWORDS)
+        summary["low_relevance"] = sum(1 for flags in self.issue_flags if flags & ISSUE_LOW_RELEVANCE)
+        summary["elapsed"] = self.elapsed
+        return summary
+
+    def to_dict(self) -> Dict[str, List]:
+        """轉為 {欄位: list}，方便交給 pandas.DataFrame 或寫成 JSON"""
+        columns = {key: getattr(self, column).tolist() for column, key in _SCORE_COLUMNS}
+        columns["passed"] = [bool(passed) for passed in self.passed]
+        columns["issue_flags"] = self.issue_flags.tolist()
+        return columns
+
+
+class PreparedContext:
+    """
+    預先處理好的上下文
+
+    保存上下文的小寫文字、有意義詞彙集合與相似度後端的特徵（shingle 集合、MinHash 簽章等），
+    大量回應與同一個上下文比較時，上下文只需處理一次
+    """
+
+    __slots__ = ("text", "lowered", "meaningful_words", "similarity", "similarity_features")
+
+    def __init__(self, context: Union[str, AnalyzedText], similarity: Similarity):
+        """
+        Args:
+            context: 原始問題或上下文
+            similarity: 計算特徵用的相似度後端
+        """
+        self.text = analyze(context)
+        self.lowered = self.text.lowered
+        self.meaningful_words = self.text.word_set - STOP_WORDS
+        self.similarity = similarity
+        # 沒有有意義詞彙時相關性固定為 0.5，不會用到相似度
+        self.similarity_features = similarity.prepare(self.lowered) if self.meaningful_words else None
+
+    def __bool__(self) -> bool:
+        return bool(self.text)
+
+
+class ContextCache:
+    """以上下文雜湊為鍵的 PreparedContext LRU 快取"""
+
+    def __init__(self, similarity: Similarity, max_entries: int = 1024):
+        """
+        Args:
+            similarity: 計算特徵用的相似度後端
+            max_entries: 快取最多保留的上下文數
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries 必須大於 0")
+        self.similarity = similarity
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[bytes, PreparedContext]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(context: str) -> bytes:
+        return hashlib.blake2b(context.encode("utf-8"), digest_size=16).digest()
+
+    def get(self, context: Union[str, AnalyzedText]) -> PreparedContext:
+        """取得上下文的 PreparedContext，不在快取中時建立"""
+        key = self._key(context)
+        with self._lock:
+            prepared = self._cache.get(key)
+            if prepared is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return prepared
+            self.misses += 1
+
+        prepared = PreparedContext(context, self.similarity)
+        with self._lock:
+            self._cache[key] = prepared
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return prepared
+
+    def clear(self):
+        """清空快取"""
+        with self._lock:
+            self._cache.clear()
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        取得快取統計
+
+        Returns:
+            hits, misses, hit_ratio, entries
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+                "entries": len(self._cache),
+            }
+
+    def __getstate__(self) -> Dict:
+        # 傳到批次評估的工作程序時只帶設定，快取在各程序中重新累積
+        return {"similarity": self.similarity, "max_entries": self.max_entries}
+
+    def __setstate__(self, state: Dict):
+        self.__init__(state["similarity"], state["max_entries"])
+
+
+def _evaluate_chunk(evaluator: "ResponseEvaluator", chunk: Sequence[Tuple]) -> BatchEvaluation:
+    """在工作程序中評估一個區塊（需為模組層級函式才能被 pickle）"""
+    result = BatchEvaluation()
+    for response, keywords, context in chunk:
+        evaluator._score_into(result, response, keywords, context)
+    return result
+
 
 class ResponseEvaluator:
     """AI 回應品質評估器"""
 
-    def __init__(self, min_length: int = 10, max_length: int = 1000):
+    def __init__(
+        self,
+        min_length: int = 10,
+        max_length: int = 1000,
+        similarity: Union[str, Similarity, None] = None,
+        context_cache_size: int = 1024,
+    ):
         """
         初始化評估器
 
         Args:
             min_length: 最小回應長度
             max_length: 最大回應長度
+            similarity: 字串相似度後端，名稱（sequence、shingle、minhash、cosine）或 Similarity 實例，
+                預設為 SequenceMatcher；長回應建議使用線性時間的 shingle 或 minhash
+            context_cache_size: 快取的 PreparedContext 數量，0 表示不快取
         """
         self.min_length = min_length
         self.max_length = max_length
+        self.similarity = get_similarity(similarity)
+        self.context_cache = ContextCache(self.similarity, context_cache_size) if context_cache_size > 0 else None
 
     def evaluate_response(
-        self, response: str, expected_keywords: Optional[List[str]] = None, context: Optional[str] = None
+        self,
+        response: Union[str, AnalyzedText],
+        expected_keywords: Optional[Union[List[str], KeywordSet]] = None,
+        context: Optional[Union[str, AnalyzedText, PreparedContext]] = None,
     ) -> Dict:
         """
         綜合評估回應品質
 
         Args:
-            response: AI 回應文字
-            expected_keywords: 預期應包含的關鍵詞列表
-            context: 原始問題或上下文
+            response: AI 回應文字，傳入 AnalyzedText 時沿用其快取的分析結果
+            expected_keywords: 預期應包含的關鍵詞列表或 KeywordSet
+            context: 原始問題或上下文，或 prepare_context 的結果
 
         Returns:
             評估結果字典
         """
+        response = analyze(response)
         results = {
             "response": response,
             "length_score": self.evaluate_length(response),
@@ -87,6 +409,254 @@ class ResponseEvaluator:
 
         return results
 
+    def _score_into(
+        self,
+        result: BatchEvaluation,
+        response: str,
+        keywords: Optional[Union[List[str], KeywordSet]],
+        context: Optional[str],
+    ):
+        """與 evaluate_response 相同的計分，但不記錄日誌，結果直接附加到欄位"""
+        response = analyze(response)
+        length_score = self.evaluate_length(response)
+        completeness_score = self.evaluate_completeness(response)
+        flags = 0
+
+        if keywords:
+            keyword_score = self._count_keywords(response, keywords) / len(keywords)
+            if keyword_score < 0.5:
+                flags |= ISSUE_LOW_KEYWORDS
+        else:
+            keyword_score = 0.0
+
+        if context:
+            relevance_score = self._relevance(response, context)[2]
+            if relevance_score < 0.3:
+                flags |= ISSUE_LOW_RELEVANCE
+        else:
+            relevance_score = 0.0
+
+        scores = [
+            length_score,
+            completeness_score,
+            keyword_score if keywords else 1.0,
+            relevance_score if context else 1.0,
+        ]
+        overall_score = sum(scores) / len(scores)
+
+        result.overall.append(overall_score)
+        result.length.append(length_score)
+        result.completeness.append(completeness_score)
+        result.keyword.append(keyword_score)
+        result.relevance.append(relevance_score)
+        result.passed.append(overall_score >= 0.6 and not flags)
+        result.issue_flags.append(flags)
+
+    def evaluate_batch(
+        self,
+        responses: Iterable[str],
+        keywords: Optional[Union[Iterable[Optional[List[str]]], List[str], KeywordSet]] = None,
+        contexts: Optional[Union[Iterable[Optional[str]], str, PreparedContext]] = None,
+        processes: Optional[int] = None,
+        chunk_size: int = 1000,
+    ) -> BatchEvaluation:
+        """
+        批次評估大量回應，分數與逐筆呼叫 evaluate_response 相同
+
+        輸入以 chunk_size 筆為一個區塊送往程序池，同時最多只有 2 * processes 個區塊在處理中，
+        因此可以直接傳入產生器而不必先把整批資料載入記憶體；不逐筆記錄日誌，只在結束時記錄一行摘要
+
+        Args:
+            responses: 回應文字
+            keywords: 每筆回應的預期關鍵詞列表（可為 None）；傳入字串列表或 KeywordSet 時所有回應共用，
+                字串列表只編譯成 KeywordSet 一次
+            contexts: 每筆回應的上下文（可為 None）；傳入單一字串或 PreparedContext 時所有回應共用，
+                上下文只處理一次
+            processes: 工作程序數，預設為 CPU 數；0 或 1 表示在目前程序中執行
+            chunk_size: 每個區塊的筆數
+
+        Returns:
+            BatchEvaluation 欄式結果
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size 必須大於 0")
+        if isinstance(contexts, str) and contexts:
+            contexts = self.prepare_context(contexts)  # 共用的上下文只處理一次
+        items = zip(responses, self._per_item(keywords, list), self._per_item(contexts, str))
+        chunks = iter(lambda: list(itertools.islice(items, chunk_size)), [])
+        processes = (os.cpu_count() or 1) if processes is None else processes
+
+        start = time.perf_counter()
+        if processes <= 1:
+            result = BatchEvaluation()
+            for chunk in chunks:
+                result.extend(_evaluate_chunk(self, chunk))
+        else:
+            result = self._evaluate_in_pool(chunks, processes)
+        result.elapsed = time.perf_counter() - start
+
+        summary = result.summary()
+        logger.info(
+            f"批次評估完成 - {summary['count']} 筆, 平均總分: {summary['mean_overall']:.2f}, "
+            f"通過率: {summary['pass_rate']:.1%}, 耗時: {result.elapsed:.2f}s"
+        )
+        return result
+
+    @staticmethod
+    def _per_item(values, shared_type: type) -> Iterator:
+        """將共用值或 None 展開為無限序列，逐筆值則原樣迭代"""
+        if values is None or (isinstance(values, (list, tuple)) and not values):
+            return itertools.repeat(None)
+        if isinstance(values, (str, PreparedContext)) and shared_type is str:
+            return itertools.repeat(values)
+        if shared_type is list and isinstance(values, KeywordSet):
+            return itertools.repeat(values)
+        if shared_type is list and isinstance(values, (list, tuple)) and values and isinstance(values[0], str):
+            # 共用的關鍵詞只編譯一次
+            return itertools.repeat(KeywordSet(values))
+        return iter(values)
+
+    def _evaluate_in_pool(self, chunks: Iterator[List[Tuple]], processes: int) -> BatchEvaluation:
+        """以程序池評估，依輸入順序合併結果"""
+        result = BatchEvaluation()
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            pending = deque()
+            for chunk in itertools.islice(chunks, 2 * processes):
+                pending.append(executor.submit(_evaluate_chunk, self, chunk))
+            while pending:
+                result.extend(pending.popleft().result())
+                # 每完成一個區塊才送出下一個，限制同時在記憶體中的區塊數
+                for chunk in itertools.islice(chunks, 1):
+                    pending.append(executor.submit(_evaluate_chunk, self, chunk))
+        return result
+
+    def extract_features(
+        self,
+        responses: Iterable[str],
+        keywords: Optional[Union[Iterable[Optional[List[str]]], List[str], KeywordSet]] = None,
+        contexts: Optional[Union[Iterable[Optional[str]], str, PreparedContext]] = None,
+    ) -> Dict:
+        """
+        擷取資料集的計分特徵，交給 score_features 以向量化方式計分
+
+        Args:
+            responses: 回應文字
+            keywords: 同 evaluate_batch
+            contexts: 同 evaluate_batch
+
+        Returns:
+            {"lengths": 去除前後空白後的長度 (n,), "indicator_hits": 不完整指標命中 (n, len(INCOMPLETE_INDICATORS)),
+             "ends_with_punctuation": (n,), "keyword_hits": 關鍵詞命中 (n, 最多關鍵詞數)，不足的欄位為 False,
+             "keyword_counts": 關鍵詞數 (n,), "relevance": 相關性分數 (n,)，沒有上下文時為 NaN}
+        """
+        if np is None:
+            raise ImportError("向量化計分需要安裝 numpy：pip install numpy")
+        if isinstance(contexts, str) and contexts:
+            contexts = self.prepare_context(contexts)
+
+        lengths, indicator_hits, ends, keyword_rows, relevance = [], [], [], [], []
+        for response, row_keywords, context in zip(
+            responses, self._per_item(keywords, list), self._per_item(contexts, str)
+        ):
+            response = analyze(response)
+            lowered = response.lowered.strip()
+            lengths.append(len(response.stripped))
+            indicator_hits.extend(indicator in lowered for indicator in INCOMPLETE_INDICATORS)
+            ends.append(_SENTENCE_END_PATTERN.search(response.stripped) is not None)
+            if not row_keywords:
+                keyword_rows.append(())
+            elif isinstance(row_keywords, KeywordSet):
+                keyword_rows.append(row_keywords.hits(response))
+            else:
+                keyword_rows.append([keyword.lower() in response.lowered for keyword in row_keywords])
+            relevance.append(self._relevance(response, context)[2] if context else math.nan)
+
+        count = len(lengths)
+        width = max((len(row) for row in keyword_rows), default=0)
+        keyword_hits = np.zeros((count, width), dtype=bool)
+        for i, row in enumerate(keyword_rows):
+            keyword_hits[i, :len(row)] = row
+        return {
+            "lengths": np.array(lengths, dtype=np.int64),
+            "indicator_hits": np.array(indicator_hits, dtype=bool).reshape(count, len(INCOMPLETE_INDICATORS)),
+            "ends_with_punctuation": np.array(ends, dtype=bool),
+            "keyword_hits": keyword_hits,
+            "keyword_counts": np.array([len(row) for row in keyword_rows], dtype=np.int64),
+            "relevance": np.array(relevance, dtype=np.float64),
+        }
+
+    def score_features(
+        self,
+        lengths,
+        indicator_hits,
+        ends_with_punctuation,
+        keyword_hits=None,
+        keyword_counts=None,
+        relevance=None,
+    ) -> BatchEvaluation:
+        """
+        以 numpy 向量化計算分數，結果與逐筆 evaluate_response 完全相同
+
+        Args:
+            lengths: 去除前後空白後的回應長度 (n,)
+            indicator_hits: 不完整指標命中矩陣 (n, m)，每列可命中多個指標
+            ends_with_punctuation: 是否以句末標點結尾 (n,)
+            keyword_hits: 關鍵詞命中矩陣 (n, k)，None 表示都沒有預期關鍵詞
+            keyword_counts: 每列的關鍵詞數 (n,)，None 表示每列都有 k 個；超出的欄位必須為 False
+            relevance: 相關性分數 (n,)，NaN 或 None 表示沒有上下文
+
+        Returns:
+            BatchEvaluation 欄式結果
+        """
+        if np is None:
+            raise ImportError("向量化計分需要安裝 numpy：pip install numpy")
+        lengths = np.asarray(lengths, dtype=np.int64)
+        count = len(lengths)
+
+        # 長度：與 evaluate_length 相同的運算順序
+        ideal_length = (self.min_length + self.max_length) / 2
+        with np.errstate(divide="ignore", invalid="ignore"):
+            in_range = np.maximum(0.5, 1.0 - np.abs(lengths - ideal_length) / ideal_length)
+        length = np.where(lengths < self.min_length, 0.0, np.where(lengths > self.max_length, 0.5, in_range))
+
+        # 完整性：逐次扣分的浮點結果與一次扣 0.3 * k 不同，改以查表取得與逐筆計算相同的值
+        indicator_hits = np.asarray(indicator_hits, dtype=bool).reshape(count, -1)
+        table = np.empty((indicator_hits.shape[1] + 1, 2))
+        for hits in range(table.shape[0]):
+            score = 1.0
+            for _ in range(hits):
+                score -= 0.3
+            table[hits] = (max(0.0, score - 0.2), max(0.0, score))
+        completeness = table[indicator_hits.sum(axis=1), np.asarray(ends_with_punctuation, dtype=np.intp)]
+
+        # 關鍵詞涵蓋率
+        if keyword_hits is None:
+            found = counts = np.zeros(count, dtype=np.int64)
+        else:
+            keyword_hits = np.asarray(keyword_hits, dtype=bool).reshape(count, -1)
+            found = keyword_hits.sum(axis=1)
+            counts = (
+                np.full(count, keyword_hits.shape[1], dtype=np.int64)
+                if keyword_counts is None
+                else np.asarray(keyword_counts, dtype=np.int64)
+            )
+        has_keywords = counts > 0
+        keyword = np.where(has_keywords, found / np.where(has_keywords, counts, 1), 0.0)
+
+        # 相關性
+        relevance = np.full(count, np.nan) if relevance is None else np.asarray(relevance, dtype=np.float64)
+        has_context = ~np.isnan(relevance)
+        relevance = np.where(has_context, relevance, 0.0)
+
+        overall = (
+            length + completeness + np.where(has_keywords, keyword, 1.0) + np.where(has_context, relevance, 1.0)
+        ) / 4
+        issue_flags = np.where(has_keywords & (keyword < 0.5), ISSUE_LOW_KEYWORDS, 0) | np.where(
+            has_context & (relevance < 0.3), ISSUE_LOW_RELEVANCE, 0
+        )
+        passed = (overall >= 0.6) & (issue_flags == 0)
+        return BatchEvaluation.from_arrays(overall, length, completeness, keyword, relevance, passed, issue_flags)
+
     def evaluate_length(self, response: str) -> float:
         """
         評估回應長度是否合適
@@ -97,7 +667,7 @@ class ResponseEvaluator:
         Returns:
             長度分數 (0.0-1.0)
         """
-        length = len(response.strip())
+        length = len(analyze(response).stripped)
 
         if length < self.min_length:
             return 0.0
@@ -120,28 +690,27 @@ class ResponseEvaluator:
             完整性分數 (0.0-1.0)
         """
         score = 1.0
-        response_lower = response.lower().strip()
+        response = analyze(response)
+        response_lower = response.lowered.strip()
 
         # 檢查是否有不完整的跡象
-        incomplete_indicators = ["...", "[未完成]", "[待續]", "無法回答", "不知道", "沒有資訊"]
-
-        for indicator in incomplete_indicators:
+        for indicator in INCOMPLETE_INDICATORS:
             if indicator in response_lower:
                 score -= 0.3
 
         # 檢查是否有句子結束符號
-        if not re.search(r"[。！？.!?]$", response.strip()):
+        if not _SENTENCE_END_PATTERN.search(response.stripped):
             score -= 0.2
 
         return max(0.0, score)
 
-    def evaluate_keywords(self, response: str, keywords: List[str]) -> float:
+    def evaluate_keywords(self, response: str, keywords: Union[List[str], KeywordSet]) -> float:
         """
         評估回應是否包含預期關鍵詞
 
         Args:
             response: AI 回應文字
-            keywords: 預期關鍵詞列表
+            keywords: 預期關鍵詞列表或 KeywordSet
 
         Returns:
             關鍵詞涵蓋率 (0.0-1.0)
@@ -149,72 +718,101 @@ class ResponseEvaluator:
         if not keywords:
             return 1.0
 
-        response_lower = response.lower()
-        found_keywords = sum(1 for kw in keywords if kw.lower() in response_lower)
+        found_keywords = self._count_keywords(response, keywords)
         coverage = found_keywords / len(keywords)
 
         logger.debug(f"關鍵詞覆蓋率: {found_keywords}/{len(keywords)} = {coverage:.2f}")
 
         return coverage
 
-    def evaluate_relevance(self, response: str, context: str) -> float:
+    @staticmethod
+    def _count_keywords(response: str, keywords: Union[List[str], KeywordSet]) -> int:
+        if isinstance(keywords, KeywordSet):
+            return keywords.count(response)
+        response_lower = analyze(response).lowered
+        return sum(1 for kw in keywords if kw.lower() in response_lower)
+
+    def match_keywords(self, response: str, keywords: Union[List[str], KeywordSet]) -> Dict:
         """
-        評估回應與上下文的相關性（使用簡單的字串相似度）
+        找出回應中命中的關鍵詞與出現位置
 
         Args:
             response: AI 回應文字
+            keywords: 預期關鍵詞列表或 KeywordSet（大量回應共用同一組關鍵詞時請先建立 KeywordSet）
+
+        Returns:
+            KeywordSet.match 的結果字典
+        """
+        keywords = keywords if isinstance(keywords, KeywordSet) else KeywordSet(keywords)
+        return keywords.match(response)
+
+    def prepare_context(self, context: Union[str, AnalyzedText, PreparedContext]) -> PreparedContext:
+        """
+        預先處理上下文（經由快取，同一個上下文只處理一次）
+
+        Args:
             context: 原始問題或上下文
 
+        Returns:
+            PreparedContext，可直接傳給 evaluate_relevance、evaluate_response 與 evaluate_batch
+        """
+        if isinstance(context, PreparedContext):
+            if context.similarity is self.similarity:
+                return context
+            context = context.text  # 其他評估器建立的，相似度特徵不相容
+        if self.context_cache is None:
+            return PreparedContext(context, self.similarity)
+        return self.context_cache.get(context)
+
+    def evaluate_relevance(self, response: str, context: Union[str, PreparedContext]) -> float:
+        """
+        評估回應與上下文的相關性（使用簡單的字串相似度）
+
+        Args:
+            response: AI 回應文字
+            context: 原始問題或上下文，或 prepare_context 的結果
+
         Returns:
             相關性分數 (0.0-1.0)
         """
 
-        # 提取有意義的詞彙（移除停用詞）
-        def extract_meaningful_words(text: str) -> set:
-            # 簡單的停用詞列表
-            stop_words = {
-                "的",
-                "是",
-                "在",
-                "了",
-                "和",
-                "有",
-                "我",
-                "你",
-                "他",
-                "她",
-                "它",
-                "the",
-                "is",
-                "in",
-                "and",
-                "of",
-                "a",
-                "to",
-                "for",
-            }
-            words = set(re.findall(r"\w+", text.lower()))
-            return words - stop_words
+        overlap, similarity, final_score = self._relevance(response, context)
+
+        if overlap is not None:
+            logger.debug(f"相關性評估 - 詞彙重疊: {overlap}, 相似度: {similarity:.2f}, 最終: {final_score:.2f}")
+
+        return final_score
+
+    @staticmethod
+    def _meaningful_words(text: str) -> set:
+        """提取有意義的詞彙（移除停用詞）"""
+        return analyze(text).word_set - STOP_WORDS
 
-        response_words = extract_meaningful_words(response)
-        context_words = extract_meaningful_words(context)
+    def _relevance(
+        self, response: str, context: Union[str, PreparedContext]
+    ) -> Tuple[Optional[int], float, float]:
+        """
+        Returns:
+            (詞彙重疊數, 字串相似度, 相關性分數)；上下文沒有有意義詞彙時重疊數為 None
+        """
+        context = self.prepare_context(context)
+        context_words = context.meaningful_words
 
         if not context_words:
-            return 0.5  # 無法判斷，給中等分數
+            return None, 0.0, 0.5  # 無法判斷，給中等分數
 
         # 計算詞彙重疊率
-        overlap = len(response_words & context_words)
+        response = analyze(response)
+        overlap = len(self._meaningful_words(response) & context_words)
         relevance = overlap / len(context_words)
 
         # 也考慮整體字串相似度
-        similarity = SequenceMatcher(None, response.lower(), context.lower()).ratio()
+        similarity = self.similarity.score_prepared(
+            self.similarity.prepare(response.lowered), context.similarity_features
+        )
 
         # 綜合評分（詞彙重疊占 70%，字串相似度占 30%）
-        final_score = 0.7 * min(relevance, 1.0) + 0.3 * similarity
-
-        logger.debug(f"相關性評估 - 詞彙重疊: {overlap}, 相似度: {similarity:.2f}, 最終: {final_score:.2f}")
-
-        return final_score
+        return overlap, similarity, 0.7 * min(relevance, 1.0) + 0.3 * similarity
 
     def compare_responses(self, response1: str, response2: str) -> Dict:
         """
@@ -230,7 +828,7 @@ class ResponseEvaluator:
         eval1 = self.evaluate_response(response1, [], "")
         eval2 = self.evaluate_response(response2, [], "")
 
-        similarity = SequenceMatcher(None, response1, response2).ratio()
+        similarity = self.similarity.score(response1, response2)
 
         result = {
             "response1_score": eval1["overall_score"],
@@ -263,5 +861,4 @@ class ResponseEvaluator:
 
         error_indicators = ["error", "錯誤", "系統異常", "無法處理", "無法回答", "服務暫時不可用", "internal server error"]
 
-        response_lower = response.lower()
-        return any(indicator in response_lower for indicator in error_indicators)
+        return any(indicator in analyze(response).lowered for indicator in error_indicators)
@@ -0,0 +1,222 @@
+"""
+多對話管理 - 讓單一 ChatModel 同時服務多個使用者
+每個對話有獨立的歷史與鎖，管理器以 LRU 與閒置逾時淘汰對話，記憶體用量有上限；
+設定 SessionStore 時，淘汰的對話會編碼後寫入儲存，再次使用時載回（見 session_store.py）
+"""
+
+import time
+import threading
+import logging
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional
+
+from ai_models.conversation_history import ConversationHistory
+from ai_models.session_store import SessionStore, decode_history, encode_history
+
+logger = logging.getLogger(__name__)
+
+
+class ChatSession:
+    """單一對話的狀態"""
+
+    __slots__ = ("session_id", "history", "lock", "last_active", "spilled")
+
+    def __init__(self, session_id: Optional[Hashable], history: ConversationHistory):
+        self.session_id = session_id
+        self.history = history
+        # 只保護歷史的讀寫，不包住後端呼叫，同一對話的多個請求仍可並行生成
+        self.lock = threading.RLock()
+        self.last_active = time.monotonic()
+        # 已被淘汰並寫入冷資料層；之後的對話由 SessionManager.record_turn 改記錄到重新載入的對話
+        self.spilled = False
+
+    def snapshot(self) -> List[Dict[str, str]]:
+        """複製目前的對話歷史"""
+        with self.lock:
+            return self.history.to_list()
+
+    def record_turn(self, prompt: str, response: str):
+        """記錄一輪對話，user 與 assistant 訊息在同一把鎖內成對寫入"""
+        with self.lock:
+            self.history.append({"role": "user", "content": prompt})
+            self.history.append({"role": "assistant", "content": response})
+            self.last_active = time.monotonic()
+
+
+class SessionManager:
+    """對話管理器"""
+
+    def __init__(
+        self,
+        token_counter: Callable[[str], int],
+        history_token_budget: Optional[int] = None,
+        max_sessions: int = 10000,
+        idle_ttl: Optional[float] = None,
+        store: Optional[SessionStore] = None,
+    ):
+        """
+        初始化對話管理器
+
+        Args:
+            token_counter: 計算單則訊息 token 數的函式
+            history_token_budget: 每個對話歷史保留的 token 上限
+            max_sessions: 同時保留的對話數上限，超出時淘汰最久未使用的對話
+            idle_ttl: 對話閒置多久後淘汰（秒），None 表示不因閒置淘汰
+            store: 冷資料層，淘汰的對話寫入此處而非丟棄；None 表示直接丟棄
+        """
+        if max_sessions < 1:
+            raise ValueError("max_sessions 必須大於 0")
+
+        self.token_counter = token_counter
+        self.history_token_budget = history_token_budget
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.store = store
+        self._sessions: "OrderedDict[Hashable, ChatSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        # 正在從冷資料層載入的對話；store.load 會移除資料，同一個對話只能由一個呼叫端載入
+        self._loading: Dict[Hashable, threading.Event] = {}
+
+        # 統計資料
+        self.created_count = 0
+        self.evicted_count = 0
+        self.spilled_count = 0
+        self.restored_count = 0
+
+    def get(self, session_id: Hashable) -> ChatSession:
+        """
+        取得對話，不存在時建立
+
+        Args:
+            session_id: 對話識別碼
+
+        Returns:
+            ChatSession
+        """
+        while True:
+            with self._lock:
+                self._evict_idle()
+                session = self._resident(session_id)
+                if session is not None:
+                    return session
+                loading = self._loading.get(session_id)
+                if loading is None:
+                    loading = self._loading[session_id] = threading.Event()
+                    break
+            # 其他呼叫端正在載入同一個對話，等它放入後重新查詢
+            loading.wait()
+
+        try:
+            # 讀取與解碼冷資料不持有全域鎖，其他對話的請求不必等待儲存的 I/O
+            session = ChatSession(session_id, ConversationHistory(self.token_counter, self.history_token_budget))
+            data = self.store.load(session_id) if self.store is not None else None
+            if data is not None:
+                session.history.restore(decode_history(data))
+
+            with self._lock:
+                if data is not None:
+                    self.restored_count += 1
+                else:
+                    self.created_count += 1
+                self._sessions[session_id] = session
+                while len(self._sessions) > self.max_sessions:
+                    self._evict_oldest()
+                return session
+        finally:
+            with self._lock:
+                del self._loading[session_id]
+            loading.set()
+
+    def _resident(self, session_id: Hashable) -> Optional[ChatSession]:
+        """取得記憶體中的對話並標記為最近使用，不存在時回傳 None（須持有 _lock）"""
+        session = self._sessions.get(session_id)
+        if session is not None:
+            self._sessions.move_to_end(session_id)
+            session.last_active = time.monotonic()
+        return session
+
+    def record_turn(self, session: ChatSession, prompt: str, response: str):
+        """
+        記錄一輪對話
+
+        請求進行中（例如等待後端或讀取串流時）對話可能已被淘汰寫入冷資料層，
+        此時改記錄到目前的對話（必要時從冷資料層載回），不以過期的物件覆寫儲存的歷史
+
+        Args:
+            session: 請求開始時取得的對話
+            prompt: 用戶輸入
+            response: 模型回應
+        """
+        while True:
+            # 淘汰時在 session.lock 內寫入儲存並標記 spilled，鎖內未被標記的對話記錄後一定會被保存
+            with session.lock:
+                if not session.spilled:
+                    session.record_turn(prompt, response)
+                    return
+            session = self.get(session.session_id)
+
+    def _evict_oldest(self):
+        """淘汰最久未使用的對話；有冷資料層時寫入儲存"""
+        session_id, session = self._sessions.popitem(last=False)
+        self.evicted_count += 1
+        if self.store is not None:
+            with session.lock:
+                self.store.save(session_id, encode_history(session.history.entries()))
+                session.spilled = True
+            self.spilled_count += 1
+
+    def _evict_idle(self):
+        """淘汰閒置過久的對話（依最近使用排序，只需檢查最舊的一端）"""
+        if self.idle_ttl is None:
+            return
+        cutoff = time.monotonic() - self.idle_ttl
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if session.last_active > cutoff:
+                break
+            self._evict_oldest()
+
+    def drop(self, session_id: Hashable) -> bool:
+        """
+        結束對話並釋放其歷史
+
+        Returns:
+            對話存在並已移除時為 True
+        """
+        with self._lock:
+            dropped = self._sessions.pop(session_id, None) is not None
+            if self.store is not None:
+                dropped = self.store.delete(session_id) or dropped
+            return dropped
+
+    def clear(self):
+        """移除所有對話（包含冷資料層）"""
+        with self._lock:
+            self._sessions.clear()
+            if self.store is not None:
+                self.store.clear()
+
+    def __contains__(self, session_id: Hashable) -> bool:
+        with self._lock:
+            return session_id in self._sessions or (self.store is not None and session_id in self.store)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        取得對話統計
+
+        Returns:
+            active_sessions（記憶體中）, stored_sessions（冷資料層中）, created, evicted, spilled, restored
+        """
+        with self._lock:
+            return {
+                "active_sessions": len(self._sessions),
+                "stored_sessions": len(self.store) if self.store is not None else 0,
+                "created": self.created_count,
+                "evicted": self.evicted_count,
+                "spilled": self.spilled_count,
+                "restored": self.restored_count,
+            }
@@ -0,0 +1,244 @@
+"""
+對話儲存 - SessionManager 的冷資料層
+記憶體中的熱對話被淘汰時寫入儲存，再次使用時載回；對話歷史以精簡的二進位格式編碼
+"""
+
+import zlib
+import sqlite3
+import threading
+import logging
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 編碼格式：1 byte 標頭 + payload
+# payload = varint(訊息數) + 每則訊息 [role 代碼][varint(token 數)][varint(內容長度)][UTF-8 內容]
+_FORMAT_VERSION = 1
+_COMPRESSED = 0x80
+_COMPRESS_THRESHOLD = 512  # payload 超過此長度才壓縮
+
+_ROLE_CODES = {"user": 0, "assistant": 1, "system": 2}
+_ROLE_NAMES = {code: role for role, code in _ROLE_CODES.items()}
+_OTHER_ROLE = 0xFF
+
+
+def _write_varint(out: bytearray, value: int):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def encode_history(entries: Iterable[Tuple[Dict[str, str], int]]) -> bytes:
+    """
+    將對話歷史編碼為二進位格式（只保留 role 與 content）
+
+    Args:
+        entries: [(訊息, token 數), ...]
+
+    Returns:
+        編碼後的 bytes
+    """
+    entries = list(entries)
+    payload = bytearray()
+    _write_varint(payload, len(entries))
+    for message, tokens in entries:
+        role = message["role"]
+        code = _ROLE_CODES.get(role)
+        if code is None:
+            payload.append(_OTHER_ROLE)
+            role_bytes = role.encode("utf-8")
+            _write_varint(payload, len(role_bytes))
+            payload += role_bytes
+        else:
+            payload.append(code)
+        _write_varint(payload, tokens)
+        content = message["content"].encode("utf-8")
+        _write_varint(payload, len(content))
+        payload += content
+
+    if len(payload) > _COMPRESS_THRESHOLD:
+        compressed = zlib.compress(bytes(payload), 1)
+        if len(compressed) < len(payload):
+            return bytes([_FORMAT_VERSION | _COMPRESSED]) + compressed
+    return bytes([_FORMAT_VERSION]) + bytes(payload)
+
+
+def decode_history(data: bytes) -> List[Tuple[Dict[str, str], int]]:
+    """
+    解碼 encode_history 的輸出
+
+    Returns:
+        [(訊息, token 數), ...]
+    """
+    header = data[0]
+    if header & ~_COMPRESSED != _FORMAT_VERSION:
+        raise ValueError(f"不支援的對話編碼版本：{header}")
+    payload = zlib.decompress(data[1:]) if header & _COMPRESSED else data[1:]
+
+    count, pos = _read_varint(payload, 0)
+    entries = []
+    for _ in range(count):
+        code = payload[pos]
+        pos += 1
+        if code == _OTHER_ROLE:
+            length, pos = _read_varint(payload, pos)
+            role = payload[pos:pos + length].decode("utf-8")
+            pos += length
+        else:
+            role = _ROLE_NAMES[code]
+        tokens, pos = _read_varint(payload, pos)
+        length, pos = _read_varint(payload, pos)
+        content = payload[pos:pos + length].decode("utf-8")
+        pos += length
+        entries.append(({"role": role, "content": content}, tokens))
+    return entries
+
+
+class SessionStore:
+    """對話儲存介面，存放已編碼的對話歷史"""
+
+    def save(self, session_id: Hashable, data: bytes):
+        """寫入（覆寫）對話"""
+        raise NotImplementedError
+
+    def load(self, session_id: Hashable) -> Optional[bytes]:
+        """讀取並移除對話，不存在時回傳 None"""
+        raise NotImplementedError
+
+    def delete(self, session_id: Hashable) -> bool:
+        """刪除對話，存在時回傳 True"""
+        raise NotImplementedError
+
+    def __contains__(self, session_id: Hashable) -> bool:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def clear(self):
+        """刪除所有對話"""
+        raise NotImplementedError
+
+    def close(self):
+        """釋放資源"""
+
+
+class MemorySessionStore(SessionStore):
+    """以 dict 保存編碼後的對話（比 Python 物件精簡，但仍在記憶體中）"""
+
+    def __init__(self):
+        self._data: Dict[Hashable, bytes] = {}
+        self._lock = threading.Lock()
+
+    def save(self, session_id: Hashable, data: bytes):
+        with self._lock:
+            self._data[session_id] = data
+
+    def load(self, session_id: Hashable) -> Optional[bytes]:
+        with self._lock:
+            return self._data.pop(session_id, None)
+
+    def delete(self, session_id: Hashable) -> bool:
+        with self._lock:
+            return self._data.pop(session_id, None) is not None
+
+    def __contains__(self, session_id: Hashable) -> bool:
+        with self._lock:
+            return session_id in self._data
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    SQLite 對話儲存
+
+    session_id 以 repr() 作為鍵；寫入累積 commit_every 筆才提交一次，
+    同一連線讀得到尚未提交的資料，程序結束前請呼叫 close() 或 flush()
+    """
+
+    def __init__(self, path: str = ":memory:", commit_every: int = 1000):
+        """
+        Args:
+            path: 資料庫檔案路徑，":memory:" 表示不落地
+            commit_every: 累積多少筆寫入後提交
+        """
+        self.path = path
+        self.commit_every = commit_every
+        self._pending_writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # 測試用的模擬資料，以寫入速度優先
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, history BLOB NOT NULL)")
+
+    def _written(self):
+        self._pending_writes += 1
+        if self._pending_writes >= self.commit_every:
+            self._conn.commit()
+            self._pending_writes = 0
+
+    def save(self, session_id: Hashable, data: bytes):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO sessions (id, history) VALUES (?, ?)", (repr(session_id), data))
+            self._written()
+
+    def load(self, session_id: Hashable) -> Optional[bytes]:
+        key = repr(session_id)
+        with self._lock:
+            row = self._conn.execute("SELECT history FROM sessions WHERE id = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("DELETE FROM sessions WHERE id = ?", (key,))
+            self._written()
+            return row[0]
+
+    def delete(self, session_id: Hashable) -> bool:
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM sessions WHERE id = ?", (repr(session_id),)).rowcount > 0
+            self._written()
+            return deleted
+
+    def __contains__(self, session_id: Hashable) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM sessions WHERE id = ?", (repr(session_id),)).fetchone() is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions")
+            self._conn.commit()
+            self._pending_writes = 0
+
+    def flush(self):
+        """提交尚未寫入的資料"""
+        with self._lock:
+            self._conn.commit()
+            self._pending_writes = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
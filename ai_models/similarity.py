@@ -0,0 +1,206 @@
+"""
+文字相似度 - ResponseEvaluator 可替換的相似度後端
+SequenceMatcher 最差情況為平方時間；shingle Jaccard、MinHash 與詞集合 cosine 皆為線性時間，
+適合上千字的長回應
+"""
+
+import re
+import math
+import heapq
+import zlib
+import logging
+from difflib import SequenceMatcher
+from typing import Any, Dict, FrozenSet, List, Union
+
+logger = logging.getLogger(__name__)
+
+# 中文逐字成詞，其他語言以連續的字母數字為一詞
+_TOKEN_PATTERN = re.compile(r"[\u4e00-\u9fff]|[^\W\u4e00-\u9fff]+")
+
+
+def char_shingles(text: str, n: int = 3) -> FrozenSet[str]:
+    """
+    字元 n-gram 集合
+
+    Args:
+        text: 輸入文字
+        n: 每個 shingle 的字元數；文字短於 n 時整段作為一個 shingle
+
+    Returns:
+        shingle 集合（空字串回傳空集合）
+    """
+    if len(text) <= n:
+        return frozenset((text,)) if text else frozenset()
+    return frozenset(text[i:i + n] for i in range(len(text) - n + 1))
+
+
+def _jaccard(a: FrozenSet, b: FrozenSet) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class Similarity:
+    """相似度後端介面"""
+
+    name = ""
+
+    def score(self, a: str, b: str) -> float:
+        """
+        計算兩段文字的相似度
+
+        Args:
+            a: 第一段文字
+            b: 第二段文字
+
+        Returns:
+            相似度 (0.0-1.0)，兩段皆為空字串時為 1.0
+        """
+        raise NotImplementedError
+
+    def prepare(self, text: str) -> Any:
+        """
+        預先計算文字的特徵，同一段文字要與大量文字比較時只需計算一次
+
+        Returns:
+            交給 score_prepared 的特徵，預設為原文字
+        """
+        return text
+
+    def score_prepared(self, prepared_a: Any, prepared_b: Any) -> float:
+        """以 prepare 的結果計算相似度，結果與 score 相同"""
+        return self.score(prepared_a, prepared_b)
+
+
+class SequenceMatcherSimilarity(Similarity):
+    """difflib.SequenceMatcher.ratio()，原本的評分方式，最差情況為平方時間"""
+
+    name = "sequence"
+
+    def score(self, a: str, b: str) -> float:
+        return SequenceMatcher(None, a, b).ratio()
+
+
+class ShingleJaccard(Similarity):
+    """字元 n-gram 集合的 Jaccard 相似度"""
+
+    name = "shingle"
+
+    def __init__(self, n: int = 3):
+        """
+        Args:
+            n: shingle 字元數，中文建議 2-3
+        """
+        if n < 1:
+            raise ValueError("n 必須大於 0")
+        self.n = n
+
+    def score(self, a: str, b: str) -> float:
+        return _jaccard(char_shingles(a, self.n), char_shingles(b, self.n))
+
+    def prepare(self, text: str) -> FrozenSet[str]:
+        return char_shingles(text, self.n)
+
+    def score_prepared(self, prepared_a: FrozenSet[str], prepared_b: FrozenSet[str]) -> float:
+        return _jaccard(prepared_a, prepared_b)
+
+
+class MinHashSimilarity(Similarity):
+    """
+    以 bottom-k MinHash 估計 shingle Jaccard 相似度
+
+    每段文字只保留雜湊值最小的 k 個 shingle 作為簽章，比較簽章即可估計 Jaccard，
+    適合同一段文字要與大量文字比較的情況（簽章可先算好再以 compare 比較）
+    """
+
+    name = "minhash"
+
+    def __init__(self, num_hashes: int = 128, n: int = 3):
+        """
+        Args:
+            num_hashes: 簽章大小 k，越大估計越準（誤差約 1/sqrt(k)）
+            n: shingle 字元數
+        """
+        if num_hashes < 1 or n < 1:
+            raise ValueError("num_hashes 與 n 必須大於 0")
+        self.num_hashes = num_hashes
+        self.n = n
+
+    def signature(self, text: str) -> List[int]:
+        """
+        計算簽章（以 crc32 雜湊，不受 PYTHONHASHSEED 影響，跨程序結果一致）
+
+        Returns:
+            由小到大排序、最多 num_hashes 個雜湊值
+        """
+        hashes = (zlib.crc32(shingle.encode("utf-8")) for shingle in char_shingles(text, self.n))
+        return heapq.nsmallest(self.num_hashes, hashes)
+
+    def compare(self, signature_a: List[int], signature_b: List[int]) -> float:
+        """
+        以兩個簽章估計 Jaccard 相似度
+
+        Returns:
+            聯集最小的 k 個雜湊值中，同時出現在兩個簽章的比例
+        """
+        if not signature_a and not signature_b:
+            return 1.0
+        set_a, set_b = set(signature_a), set(signature_b)
+        union = heapq.nsmallest(self.num_hashes, set_a | set_b)
+        return sum(1 for h in union if h in set_a and h in set_b) / len(union)
+
+    def score(self, a: str, b: str) -> float:
+        return self.compare(self.signature(a), self.signature(b))
+
+    def prepare(self, text: str) -> List[int]:
+        return self.signature(text)
+
+    def score_prepared(self, prepared_a: List[int], prepared_b: List[int]) -> float:
+        return self.compare(prepared_a, prepared_b)
+
+
+class TokenCosine(Similarity):
+    """詞集合的 cosine 相似度：|A ∩ B| / sqrt(|A| |B|)，不考慮詞序"""
+
+    name = "cosine"
+
+    @staticmethod
+    def tokens(text: str) -> FrozenSet[str]:
+        """中文逐字、其他語言逐詞的詞集合"""
+        return frozenset(_TOKEN_PATTERN.findall(text))
+
+    def score(self, a: str, b: str) -> float:
+        return self.score_prepared(self.tokens(a), self.tokens(b))
+
+    def prepare(self, text: str) -> FrozenSet[str]:
+        return self.tokens(text)
+
+    def score_prepared(self, tokens_a: FrozenSet[str], tokens_b: FrozenSet[str]) -> float:
+        if not tokens_a or not tokens_b:
+            return 1.0 if tokens_a == tokens_b else 0.0
+        return len(tokens_a & tokens_b) / math.sqrt(len(tokens_a) * len(tokens_b))
+
+
+SIMILARITY_BACKENDS: Dict[str, type] = {
+    backend.name: backend for backend in (SequenceMatcherSimilarity, ShingleJaccard, MinHashSimilarity, TokenCosine)
+}
+
+
+def get_similarity(similarity: Union[str, Similarity, None] = None) -> Similarity:
+    """
+    取得相似度後端
+
+    Args:
+        similarity: 後端名稱（sequence、shingle、minhash、cosine）或 Similarity 實例，None 為 sequence
+
+    Returns:
+        Similarity 實例
+    """
+    if similarity is None:
+        return SequenceMatcherSimilarity()
+    if isinstance(similarity, Similarity):
+        return similarity
+    try:
+        return SIMILARITY_BACKENDS[similarity]()
+    except KeyError:
+        raise ValueError(f"未知的相似度後端：{similarity}（可用：{', '.join(SIMILARITY_BACKENDS)}）") from None
@@ -0,0 +1,147 @@
+"""
+Single-flight - 合併同時進行中的相同請求
+相同模型、參數、正規化後的 prompt、上下文與對話歷史的請求，只有第一個會呼叫後端，其餘共用同一個結果
+"""
+
+import asyncio
+import threading
+import logging
+from concurrent.futures import Future
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from ai_models.backends import ChatBackend
+from ai_models.response_cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlightBackend(ChatBackend):
+    """
+    Single-flight 後端，包裝另一個後端使用
+
+    進行中的請求以 concurrent.futures.Future 登記，執行緒與 asyncio 呼叫端共用同一張表；
+    請求完成後立即移除，之後的相同請求會重新呼叫後端（需要重複使用結果請搭配 ResponseCache）
+    """
+
+    def __init__(self, backend: ChatBackend):
+        """
+        Args:
+            backend: 實際的後端
+        """
+        self.backend = backend
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+        # 統計資料
+        self.request_count = 0
+        self.collapsed_count = 0
+
+    @staticmethod
+    def request_key(
+        messages: List[Dict[str, str]], model_name: str, temperature: float, context: Optional[Dict] = None
+    ) -> str:
+        """請求鍵：與回應快取相同的內容定址方式"""
+        return ResponseCache.make_key(model_name, temperature, messages[-1]["content"], context, messages[:-1])
+
+    def _join(self, key: str) -> Tuple[Future, bool]:
+        """
+        登記請求
+
+        Returns:
+            (Future, 是否由本次呼叫負責執行)
+        """
+        with self._lock:
+            self.request_count += 1
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.collapsed_count += 1
+                return future, False
+            future = self._in_flight[key] = Future()
+            return future, True
+
+    @staticmethod
+    def _set_result(future: Future, result: str):
+        # 共用的 Future 可能已被外部取消，此時結果直接丟棄
+        if not future.done():
+            future.set_result(result)
+
+    @staticmethod
+    def _set_exception(future: Future, error: BaseException):
+        if not future.done():
+            future.set_exception(error)
+
+    def _settle(self, key: str, future: Future, call: Callable[[], str]):
+        try:
+            self._set_result(future, call())
+        except BaseException as e:
+            self._set_exception(future, e)
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def complete(
+        self, messages: List[Dict[str, str]], model_name: str, temperature: float, context: Optional[Dict] = None
+    ) -> str:
+        key = self.request_key(messages, model_name, temperature, context)
+        future, leader = self._join(key)
+        if leader:
+            self._settle(key, future, lambda: self.backend.complete(messages, model_name, temperature, context))
+        return future.result()
+
+    async def acomplete(
+        self, messages: List[Dict[str, str]], model_name: str, temperature: float, context: Optional[Dict] = None
+    ) -> str:
+        key = self.request_key(messages, model_name, temperature, context)
+        future, leader = self._join(key)
+        if leader:
+            try:
+                self._set_result(future, await self.backend.acomplete(messages, model_name, temperature, context))
+            except BaseException as e:
+                # 包含 CancelledError：讓等待中的呼叫端收到例外而不是永遠等待
+                self._set_exception(future, e)
+            finally:
+                with self._lock:
+                    self._in_flight.pop(key, None)
+        # shield：單一呼叫端逾時取消時只取消自己的等待，不取消其他呼叫端共用的 Future
+        return await asyncio.shield(asyncio.wrap_future(future))
+
+    def complete_batch(
+        self,
+        batch_messages: List[List[Dict[str, str]]],
+        model_name: str,
+        temperature: float,
+        contexts: Optional[List[Optional[Dict]]] = None,
+    ) -> List[str]:
+        return self.backend.complete_batch(batch_messages, model_name, temperature, contexts)
+
+    def stream(
+        self, messages: List[Dict[str, str]], model_name: str, temperature: float, context: Optional[Dict] = None
+    ) -> Iterator[str]:
+        # 串流的每個片段都要即時交給各自的呼叫端，不合併
+        return self.backend.stream(messages, model_name, temperature, context)
+
+    def astream(
+        self, messages: List[Dict[str, str]], model_name: str, temperature: float, context: Optional[Dict] = None
+    ) -> AsyncIterator[str]:
+        return self.backend.astream(messages, model_name, temperature, context)
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        取得合併統計
+
+        Returns:
+            requests, collapsed（共用他人結果的請求數）, backend_calls, collapsed_ratio
+        """
+        with self._lock:
+            return {
+                "requests": self.request_count,
+                "collapsed": self.collapsed_count,
+                "backend_calls": self.request_count - self.collapsed_count,
+                "collapsed_ratio": self.collapsed_count / self.request_count if self.request_count else 0.0,
+            }
+
+    def close(self):
+        self.backend.close()
+
+    async def aclose(self):
+        await self.backend.aclose()
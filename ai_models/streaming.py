@@ -0,0 +1,193 @@
+"""
+串流回應 - 逐段產出模型回應並量測 TTFT（time-to-first-token）與 token 間延遲
+"""
+
+import re
+import time
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+from ai_models.clock import Clock
+
+# 中文逐字切分，其他文字以「詞 + 後綴空白」為單位
+_TOKEN_PATTERN = re.compile(r"[\u4e00-\u9fff]|[^\u4e00-\u9fff\s]+\s*|\s+")
+
+
+def split_tokens(text: str) -> List[str]:
+    """
+    將文本切分為模擬串流用的 token 片段，串接後與原文相同
+
+    Args:
+        text: 輸入文本
+
+    Returns:
+        token 片段列表
+    """
+    return _TOKEN_PATTERN.findall(text)
+
+
+class StreamMetrics:
+    """單一串流的延遲指標"""
+
+    def __init__(self, clock: Optional[Clock] = None):
+        """
+        Args:
+            clock: 量測用的時鐘，預設為 time.perf_counter
+        """
+        self._now = clock.now if clock is not None else time.perf_counter
+        self.start_time = self._now()
+        self.first_token_time: Optional[float] = None
+        self.end_time: Optional[float] = None
+        self.token_count = 0
+        self.inter_token_gaps: List[float] = []
+        self._last_token_time: Optional[float] = None
+
+    def record_token(self):
+        """記錄收到一個 token 片段"""
+        now = self._now()
+        if self.first_token_time is None:
+            self.first_token_time = now
+        else:
+            self.inter_token_gaps.append(now - self._last_token_time)
+        self._last_token_time = now
+        self.token_count += 1
+
+    def finish(self):
+        """標記串流結束"""
+        if self.end_time is None:
+            self.end_time = self._now()
+
+    @property
+    def ttft(self) -> Optional[float]:
+        """從發出請求到收到第一個 token 的時間（秒）"""
+        if self.first_token_time is None:
+            return None
+        return self.first_token_time - self.start_time
+
+    @property
+    def total_time(self) -> float:
+        """串流總耗時（秒）"""
+        end = self.end_time if self.end_time is not None else self._now()
+        return end - self.start_time
+
+    @property
+    def tokens_per_second(self) -> float:
+        """整體輸出速率"""
+        total = self.total_time
+        return self.token_count / total if total > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, float]:
+        """
+        轉換為 AIMetricsCollector.record_performance_metrics 可接受的指標字典
+
+        Returns:
+            latency, ttft, inter_token_latency, inter_token_latency_max, token_count, tokens_per_second
+        """
+        gaps = self.inter_token_gaps
+        return {
+            "latency": self.total_time,
+            "ttft": self.ttft or 0.0,
+            "inter_token_latency": sum(gaps) / len(gaps) if gaps else 0.0,
+            "inter_token_latency_max": max(gaps) if gaps else 0.0,
+            "token_count": self.token_count,
+            "tokens_per_second": self.tokens_per_second,
+        }
+
+
+class ResponseStream:
+    """
+    同步串流回應，可直接以 for 迴圈逐段讀取
+
+    串流讀取完畢後 text 為完整回應，並呼叫 on_complete(text, metrics)
+    """
+
+    def __init__(
+        self,
+        chunks: Iterator[str],
+        on_complete: Optional[Callable[[str, StreamMetrics], None]] = None,
+        clock: Optional[Clock] = None,
+    ):
+        self.metrics = StreamMetrics(clock)
+        self._chunks = iter(chunks)
+        self._parts: List[str] = []
+        self._on_complete = on_complete
+        self._done = False
+
+    @property
+    def text(self) -> str:
+        """目前已收到的回應文本"""
+        return "".join(self._parts)
+
+    def __iter__(self) -> "ResponseStream":
+        return self
+
+    def __next__(self) -> str:
+        if self._done:
+            raise StopIteration
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self._complete()
+            raise
+        self.metrics.record_token()
+        self._parts.append(chunk)
+        return chunk
+
+    def read(self) -> str:
+        """讀完整個串流並回傳完整回應"""
+        for _ in self:
+            pass
+        return self.text
+
+    def _complete(self):
+        self._done = True
+        self.metrics.finish()
+        if self._on_complete is not None:
+            self._on_complete(self.text, self.metrics)
+
+
+class AsyncResponseStream:
+    """非同步串流回應，以 async for 逐段讀取"""
+
+    def __init__(
+        self,
+        chunks: AsyncIterator[str],
+        on_complete: Optional[Callable[[str, StreamMetrics], None]] = None,
+        clock: Optional[Clock] = None,
+    ):
+        self.metrics = StreamMetrics(clock)
+        self._chunks = chunks.__aiter__()
+        self._parts: List[str] = []
+        self._on_complete = on_complete
+        self._done = False
+
+    @property
+    def text(self) -> str:
+        """目前已收到的回應文本"""
+        return "".join(self._parts)
+
+    def __aiter__(self) -> "AsyncResponseStream":
+        return self
+
+    async def __anext__(self) -> str:
+        if self._done:
+            raise StopAsyncIteration
+        try:
+            chunk = await self._chunks.__anext__()
+        except StopAsyncIteration:
+            self._complete()
+            raise
+        self.metrics.record_token()
+        self._parts.append(chunk)
+        return chunk
+
+    async def read(self) -> str:
+        """讀完整個串流並回傳完整回應"""
+        async for _ in self:
+            pass
+        return self.text
+
+    def _complete(self):
+        self._done = True
+        self.metrics.finish()
+        if self._on_complete is not None:
+            self._on_complete(self.text, self.metrics)
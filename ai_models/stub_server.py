@@ -0,0 +1,278 @@
+"""
+Stub LLM 伺服器 - 本機模擬 OpenAI 相容的 chat completion API
+在背景執行緒中運行，讓整合與效能測試可以在離線環境量測 HTTP 後端的行為
+"""
+
+import sys
+import json
+import time
+import threading
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, Optional
+
+from ai_models.backends import MockBackend
+from ai_models.rate_limiter import TokenBucket
+from ai_models.streaming import split_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class _StubRequestHandler(BaseHTTPRequestHandler):
+    """處理 chat completion 請求（HTTP/1.1，支援 keep-alive）"""
+
+    protocol_version = "HTTP/1.1"
+    # 標頭與內容分兩次寫出，keep-alive 下需關閉 Nagle 以免與 delayed ACK 互相等待
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        # 每個 handler 實例對應一條 TCP 連線
+        self.server.stub.record_connection()
+
+    def do_POST(self):
+        stub = self.server.stub
+        if self.path != stub.endpoint:
+            self._send_json(404, {"error": {"message": f"Unknown endpoint: {self.path}"}})
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": {"message": "Invalid JSON body"}})
+            return
+
+        if not stub.begin_request():
+            self._send_json(429, {"error": {"message": "Rate limit exceeded", "type": "rate_limit_error"}})
+            return
+
+        try:
+            if payload.get("stream"):
+                self._send_event_stream(stub.stream_completion(payload))
+                return
+
+            status, body = stub.handle_completion(payload)
+            self._send_json(status, body)
+        finally:
+            stub.end_request()
+
+    def _send_event_stream(self, events):
+        """以 chunked transfer encoding 送出 SSE 事件"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for event in events:
+            data = f"data: {event}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _send_json(self, status: int, body: Dict):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug("stub server: " + format, *args)
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # 用戶端在節流或逾時後提早斷線屬於正常情況，不輸出 traceback
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            logger.debug(f"stub server: client {client_address} disconnected")
+            return
+        super().handle_error(request, client_address)
+
+
+class StubLLMServer:
+    """本機 Stub LLM 伺服器"""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        endpoint: str = "/v1/chat/completions",
+        backend: Optional[MockBackend] = None,
+        token_rate: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+        rate_limit: Optional[float] = None,
+    ):
+        """
+        初始化 Stub 伺服器
+
+        Args:
+            host: 監聽位址
+            port: 監聽埠（0 表示自動分配）
+            latency: 每個請求的模擬處理時間（秒）
+            endpoint: chat completion 路徑
+            backend: 產生回應內容的 Mock 後端
+            token_rate: 串流回應時每秒輸出的 token 數（None 表示不延遲）
+            max_concurrency: 同時處理的請求數上限，超出時回應 429（None 表示不限制）
+            rate_limit: 每秒請求數上限，超出時回應 429（None 表示不限制）
+        """
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.endpoint = endpoint
+        self.backend = backend or MockBackend(latency=0.0)
+        self.token_rate = token_rate
+        self.max_concurrency = max_concurrency
+        self._rate_bucket = TokenBucket(rate_limit) if rate_limit else None
+        self.request_count = 0
+        self.connection_count = 0
+        self.throttled_count = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """伺服器位址（啟動後才有實際埠號）"""
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> "StubLLMServer":
+        """在背景執行緒啟動伺服器"""
+        self._server = _StubHTTPServer((self.host, self.port), _StubRequestHandler)
+        self._server.stub = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-llm-server", daemon=True)
+        self._thread.start()
+        logger.info(f"Stub LLM server started at {self.base_url}")
+        return self
+
+    def stop(self):
+        """停止伺服器"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "StubLLMServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def record_connection(self):
+        """記錄一條新的 TCP 連線"""
+        with self._lock:
+            self.connection_count += 1
+
+    def reset_stats(self):
+        """重設請求、連線與節流統計"""
+        with self._lock:
+            self.request_count = 0
+            self.connection_count = 0
+            self.throttled_count = 0
+            self.max_in_flight = 0
+
+    def begin_request(self) -> bool:
+        """
+        模擬服務端節流：超過並行上限或每秒請求數上限時拒絕
+
+        Returns:
+            True 表示受理（之後需呼叫 end_request），False 表示應回應 429
+        """
+        with self._lock:
+            over_concurrency = self.max_concurrency is not None and self.in_flight >= self.max_concurrency
+            if over_concurrency or (self._rate_bucket is not None and not self._rate_bucket.try_acquire()):
+                self.throttled_count += 1
+                return False
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            return True
+
+    def end_request(self):
+        """結束一個已受理的請求"""
+        with self._lock:
+            self.in_flight -= 1
+
+    def handle_completion(self, payload: Dict):
+        """
+        處理 chat completion 請求
+
+        Args:
+            payload: 請求內容 {"model", "messages", "temperature"}
+
+        Returns:
+            (HTTP 狀態碼, 回應內容)
+        """
+        with self._lock:
+            self.request_count += 1
+            request_id = self.request_count
+
+        messages = payload.get("messages") or []
+        if not messages:
+            return 400, {"error": {"message": "messages is required"}}
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        prompt = messages[-1].get("content", "")
+        content = self.backend.generate(prompt)
+        prompt_tokens = sum(len(m.get("content", "")) for m in messages) // 4
+        completion_tokens = len(content) // 4
+
+        return 200, {
+            "id": f"chatcmpl-stub-{request_id}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "stub"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def stream_completion(self, payload: Dict) -> Iterator[str]:
+        """
+        處理串流請求 (stream=true)，依 token_rate 逐段產出 chat.completion.chunk 事件
+
+        Args:
+            payload: 請求內容
+
+        Returns:
+            SSE data 欄位內容的迭代器，最後以 [DONE] 結束
+        """
+        with self._lock:
+            self.request_count += 1
+            request_id = self.request_count
+
+        messages = payload.get("messages") or [{"content": ""}]
+        if self.latency:
+            time.sleep(self.latency)
+
+        interval = 1.0 / self.token_rate if self.token_rate else 0.0
+        content = self.backend.generate(messages[-1].get("content", ""))
+        for i, token in enumerate(split_tokens(content)):
+            if i and interval:
+                time.sleep(interval)
+            chunk = {
+                "id": f"chatcmpl-stub-{request_id}",
+                "object": "chat.completion.chunk",
+                "model": payload.get("model", "stub"),
+                "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+            }
+            yield json.dumps(chunk, ensure_ascii=False)
+        yield "[DONE]"
@@ -0,0 +1,86 @@
+"""
+文字分析 - 各檢測器共用的回應前處理結果
+AnalyzedText 是 str 的子類別，可以直接傳給任何接受 str 的檢測器；
+小寫、Unicode 正規化、分詞、數字與句子切分在第一次使用時計算並保存，
+同一則回應交給多個檢測器時只需處理一次
+"""
+
+import re
+import unicodedata
+import logging
+from functools import cached_property
+from typing import FrozenSet, List, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+_WORD_PATTERN = re.compile(r"\w+")
+_CJK_RUN_PATTERN = re.compile(r"[\u4e00-\u9fff]{2,}")
+_NUMBER_PATTERN = re.compile(r"\d+")
+# 句子以中英文句末標點或換行結尾（連續標點視為同一句，小數點不斷句），最後一句可以沒有標點
+_SENTENCE_PATTERN = re.compile(r"(?:[^。！？.!?\n]|\.(?=\d))+[。！？.!?]*")
+
+
+class AnalyzedText(str):
+    """
+    帶有快取分析結果的文字
+
+    所有屬性都是延遲計算：只用到 lowered 的檢測器不會觸發分詞或句子切分
+    """
+
+    @cached_property
+    def lowered(self) -> str:
+        """小寫形式（與 str.lower() 相同）"""
+        return self.lower()
+
+    @cached_property
+    def stripped(self) -> str:
+        """去除前後空白的形式（與 str.strip() 相同）"""
+        return self.strip()
+
+    @cached_property
+    def normalized(self) -> str:
+        """NFKC 正規化後的小寫形式，全形英數與相容字元會轉為一般字元"""
+        return unicodedata.normalize("NFKC", self).lower()
+
+    @cached_property
+    def words(self) -> List[str]:
+        """小寫後以 \\w+ 切出的詞（連續中文會是一個詞）"""
+        return _WORD_PATTERN.findall(self.lowered)
+
+    @cached_property
+    def word_set(self) -> FrozenSet[str]:
+        """words 的集合"""
+        return frozenset(self.words)
+
+    @cached_property
+    def cjk_bigrams(self) -> List[str]:
+        """連續中文字的二字組，例如「帳戶餘額」為 ["帳戶", "戶餘", "餘額"]"""
+        return [run[i:i + 2] for run in _CJK_RUN_PATTERN.findall(self) for i in range(len(run) - 1)]
+
+    @cached_property
+    def numbers(self) -> List[str]:
+        """文字中的數字（連續數字字元）"""
+        return _NUMBER_PATTERN.findall(self)
+
+    @cached_property
+    def sentence_spans(self) -> List[Tuple[int, int]]:
+        """每個句子在原文中的 (start, end) 位置"""
+        return [match.span() for match in _SENTENCE_PATTERN.finditer(self) if match.group().strip()]
+
+    @cached_property
+    def sentences(self) -> List[str]:
+        """去除前後空白的句子列表"""
+        return [self[start:end].strip() for start, end in self.sentence_spans]
+
+
+def analyze(text: Union[str, AnalyzedText]) -> AnalyzedText:
+    """
+    取得文字的 AnalyzedText（已經是 AnalyzedText 時原樣回傳，共用既有的快取）
+
+    Args:
+        text: 文字或 AnalyzedText
+
+    Returns:
+        AnalyzedText
+    """
+    return text if isinstance(text, AnalyzedText) else AnalyzedText(text)
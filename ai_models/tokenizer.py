@@ -0,0 +1,198 @@
+"""
+Token 估算 - 以正則表達式快速估算中英文 token 數
+可替換為讀取本地詞表的分詞器，並以文本雜湊為鍵的 LRU 快取避免重複分詞
+"""
+
+import re
+import json
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Union
+
+logger = logging.getLogger(__name__)
+
+# 移除所有非中文字元後，剩下的長度即為中文字數（一次 C 層掃描，不逐字進入 Python）
+_NON_CJK_PATTERN = re.compile(r"[^\u4e00-\u9fff]+")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    估算文本的 token 數量（中文約 2 字符/token，其他約 4 字符/token）
+
+    Args:
+        text: 輸入文本
+
+    Returns:
+        估算的 token 數量（至少為 1）
+    """
+    chinese_chars = len(_NON_CJK_PATTERN.sub("", text))
+    other_chars = len(text) - chinese_chars
+    return max(1, (chinese_chars // 2) + (other_chars // 4))
+
+
+def estimate_tokens_many(texts: Iterable[str]) -> List[int]:
+    """
+    批次估算多筆文本的 token 數量
+
+    Args:
+        texts: 文本列表
+
+    Returns:
+        與輸入順序一致的 token 數量列表
+    """
+    sub = _NON_CJK_PATTERN.sub
+    results = []
+    for text in texts:
+        chinese_chars = len(sub("", text))
+        results.append(max(1, (chinese_chars // 2) + ((len(text) - chinese_chars) // 4)))
+    return results
+
+
+class Tokenizer:
+    """分詞器介面，ChatModel 透過 count / count_many 計算 token 數"""
+
+    def count(self, text: str) -> int:
+        raise NotImplementedError
+
+    def count_many(self, texts: Iterable[str]) -> List[int]:
+        return [self.count(text) for text in texts]
+
+
+class HeuristicTokenizer(Tokenizer):
+    """以字元比例估算的預設分詞器"""
+
+    def count(self, text: str) -> int:
+        return estimate_tokens(text)
+
+    def count_many(self, texts: Iterable[str]) -> List[int]:
+        return estimate_tokens_many(texts)
+
+
+class VocabTokenizer(Tokenizer):
+    """
+    讀取本地詞表的分詞器，以最長匹配 (greedy longest-match) 切分
+
+    詞表檔案格式：
+        .json: {"token": id, ...} 或 ["token", ...]
+        其他: 每行一個 token
+    詞表中沒有的字元各計為 1 個 token，空白字元若不在詞表中則不計
+    """
+
+    def __init__(self, vocab_path: Union[str, Path]):
+        """
+        Args:
+            vocab_path: 詞表檔案路徑
+        """
+        self.vocab_path = Path(vocab_path)
+        self.vocab = self._load_vocab(self.vocab_path)
+        if not self.vocab:
+            raise ValueError(f"詞表為空：{self.vocab_path}")
+        # 由長到短嘗試的 token 長度
+        self._lengths = sorted({len(token) for token in self.vocab}, reverse=True)
+        logger.info(f"Loaded vocabulary with {len(self.vocab)} tokens from {self.vocab_path}")
+
+    @staticmethod
+    def _load_vocab(path: Path) -> frozenset:
+        with open(path, "r", encoding="utf-8") as f:
+            if path.suffix == ".json":
+                data = json.load(f)
+                tokens = data.keys() if isinstance(data, dict) else data
+            else:
+                tokens = (line.rstrip("\n") for line in f)
+            return frozenset(token for token in tokens if token)
+
+    def tokenize(self, text: str) -> List[str]:
+        """
+        切分文本
+
+        Args:
+            text: 輸入文本
+
+        Returns:
+            token 列表
+        """
+        vocab = self.vocab
+        tokens = []
+        i = 0
+        n = len(text)
+        while i < n:
+            for length in self._lengths:
+                piece = text[i:i + length]
+                if len(piece) == length and piece in vocab:
+                    tokens.append(piece)
+                    i += length
+                    break
+            else:
+                if not text[i].isspace():
+                    tokens.append(text[i])
+                i += 1
+        return tokens
+
+    def count(self, text: str) -> int:
+        return len(self.tokenize(text))
+
+
+class CachedTokenizer(Tokenizer):
+    """以文本雜湊為鍵的 LRU 快取，包裝另一個分詞器使用"""
+
+    def __init__(self, tokenizer: Tokenizer, max_entries: int = 4096):
+        """
+        Args:
+            tokenizer: 實際計算 token 數的分詞器
+            max_entries: 快取最多保留的筆數
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries 必須大於 0")
+        self.tokenizer = tokenizer
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[bytes, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(text: str) -> bytes:
+        # 只保留固定長度的摘要，長文本不會常駐在快取中
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    def count(self, text: str) -> int:
+        key = self._key(text)
+        with self._lock:
+            tokens = self._cache.get(key)
+            if tokens is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return tokens
+            self.misses += 1
+
+        tokens = self.tokenizer.count(text)
+        with self._lock:
+            self._cache[key] = tokens
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return tokens
+
+    def clear(self):
+        """清空快取"""
+        with self._lock:
+            self._cache.clear()
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        取得快取統計
+
+        Returns:
+            hits, misses, hit_ratio, entries
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+                "entries": len(self._cache),
+            }
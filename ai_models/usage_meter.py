@@ -0,0 +1,184 @@
+"""
+用量計量 - 記錄每次模型呼叫的 prompt / completion token、延遲與估算成本
+每個執行緒寫入自己的累加表，不需要鎖；測試結束時才合併，並依測試、標記與模型分組
+"""
+
+import threading
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 每 1K token 的估算價格（美元）：(prompt, completion)
+DEFAULT_PRICING: Dict[str, Tuple[float, float]] = {
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+    "gpt-4": (0.03, 0.06),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4o": (0.005, 0.015),
+    "gpt-4o-mini": (0.00015, 0.0006),
+}
+
+_CALLS, _PROMPT, _COMPLETION, _LATENCY = range(4)
+
+
+class UsageMeter:
+    """用量計量器"""
+
+    def __init__(self, pricing: Optional[Dict[str, Tuple[float, float]]] = None):
+        """
+        Args:
+            pricing: 覆寫或補充的價格表 {模型名稱: (prompt 每 1K 價格, completion 每 1K 價格)}
+        """
+        self.pricing = dict(DEFAULT_PRICING)
+        if pricing:
+            self.pricing.update(pricing)
+        self._local = threading.local()
+        self._tables: List[Dict] = []
+        self._register_lock = threading.Lock()
+        self._scope: Tuple[str, Tuple[str, ...]] = ("", ())
+
+    def set_scope(self, test_id: str, markers: Iterable[str] = ()):
+        """設定目前的測試（之後所有執行緒的呼叫都歸屬此測試）"""
+        self._scope = (test_id, tuple(markers))
+
+    def clear_scope(self):
+        """清除目前的測試"""
+        self._scope = ("", ())
+
+    def _table(self) -> Dict:
+        table = getattr(self._local, "table", None)
+        if table is None:
+            # 每個執行緒只在第一次記錄時登記一次
+            table = self._local.table = {}
+            with self._register_lock:
+                self._tables.append(table)
+        return table
+
+    def record(self, model_name: str, prompt_tokens: int, completion_tokens: int, latency: float):
+        """
+        記錄一次模型呼叫（只更新本執行緒的累加表）
+
+        Args:
+            model_name: 模型名稱
+            prompt_tokens: 送出的 token 數（含對話歷史）
+            completion_tokens: 回應的 token 數
+            latency: 呼叫耗時（秒）
+        """
+        key = (self._scope, model_name)
+        try:
+            totals = self._local.table[key]
+        except (AttributeError, KeyError):
+            totals = self._table().setdefault(key, [0, 0, 0, 0.0])
+        totals[_CALLS] += 1
+        totals[_PROMPT] += prompt_tokens
+        totals[_COMPLETION] += completion_tokens
+        totals[_LATENCY] += latency
+
+    def estimate_cost(self, model_name: str, prompt_tokens: int, completion_tokens: int) -> float:
+        """依價格表估算成本（美元），未知模型成本為 0"""
+        prompt_price, completion_price = self.pricing.get(model_name, (0.0, 0.0))
+        return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+
+    def merge(self) -> List[Dict]:
+        """
+        合併所有執行緒的累加表
+
+        Returns:
+            每個 (測試, 模型) 一筆：test, markers, model, calls, prompt_tokens, completion_tokens,
+            total_tokens, latency（累計秒數）, avg_latency, cost
+        """
+        with self._register_lock:
+            tables = list(self._tables)
+
+        merged: Dict[tuple, List] = {}
+        for table in tables:
+            for key, totals in list(table.items()):
+                target = merged.setdefault(key, [0, 0, 0, 0.0])
+                for i, value in enumerate(totals):
+                    target[i] += value
+
+        rows = []
+        for ((test_id, markers), model_name), (calls, prompt_tokens, completion_tokens, latency) in merged.items():
+            rows.append({
+                "test": test_id,
+                "markers": markers,
+                "model": model_name,
+                "calls": calls,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "latency": latency,
+                "avg_latency": latency / calls if calls else 0.0,
+                "cost": self.estimate_cost(model_name, prompt_tokens, completion_tokens),
+            })
+        return rows
+
+    def breakdown(self, by: str = "model") -> Dict[str, Dict]:
+        """
+        依測試、標記或模型彙總
+
+        Args:
+            by: "test"、"marker" 或 "model"（一個測試有多個標記時，會計入每個標記）
+
+        Returns:
+            {分組名稱: {calls, prompt_tokens, completion_tokens, total_tokens, latency, avg_latency, cost}}
+        """
+        if by not in ("test", "marker", "model"):
+            raise ValueError("by 必須是 test、marker 或 model")
+
+        groups: Dict[str, Dict] = {}
+        for row in self.merge():
+            names = row["markers"] if by == "marker" else (row[by],)
+            for name in names:
+                group = groups.setdefault(name, {
+                    "calls": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                    "total_tokens": 0, "latency": 0.0, "cost": 0.0,
+                })
+                for field in group:
+                    group[field] += row[field]
+
+        for group in groups.values():
+            group["avg_latency"] = group["latency"] / group["calls"] if group["calls"] else 0.0
+        return groups
+
+    def top_consumers(self, limit: int = 10) -> List[Tuple[str, Dict]]:
+        """token 用量最多的測試，依總 token 數排序"""
+        tests = self.breakdown(by="test")
+        return sorted(tests.items(), key=lambda item: item[1]["total_tokens"], reverse=True)[:limit]
+
+    def export(self, collector):
+        """
+        依模型彙總後寫入 AIMetricsCollector.record_performance_metrics
+
+        Args:
+            collector: AIMetricsCollector 實例
+        """
+        for model_name, usage in self.breakdown(by="model").items():
+            collector.record_performance_metrics(model_name, {
+                "latency": usage["avg_latency"],
+                "token_count": usage["total_tokens"],
+                "prompt_tokens": usage["prompt_tokens"],
+                "completion_tokens": usage["completion_tokens"],
+                "cost": usage["cost"],
+            })
+
+    def reset(self):
+        """清空所有累加表"""
+        with self._register_lock:
+            for table in self._tables:
+                table.clear()
+
+
+# 全域實例
+_usage_meter: Optional[UsageMeter] = None
+_usage_meter_lock = threading.Lock()
+
+
+def get_usage_meter() -> UsageMeter:
+    """獲取全域用量計量器實例"""
+    global _usage_meter
+    if _usage_meter is None:
+        with _usage_meter_lock:
+            if _usage_meter is None:
+                _usage_meter = UsageMeter()
+    return _usage_meter
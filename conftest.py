@@ -92,25 +92,99 @@ def sample_test_cases():
 
 # ==================== AI/LLM Fixtures ====================
 
+@pytest.fixture(scope="session")
+def chat_backend():
+    """
+    聊天模型後端（session 級別）
+
+    設定 CHAT_MODEL_CASSETTE=<路徑> 時使用錄製 / 重播後端：
+    CHAT_MODEL_CASSETTE_MODE=record|replay|auto（預設 auto），
+    CHAT_MODEL_CASSETTE_LATENCY=none|recorded|sampled（預設 none）；
+    未設定時回傳 None，由 ChatModel 使用預設的 Mock 後端
+    """
+    import os
+    cassette_path = os.getenv("CHAT_MODEL_CASSETTE")
+    if not cassette_path:
+        yield None
+        return
+
+    from ai_models.backends import MockBackend
+    from ai_models.cassette import CassetteBackend
+    backend = CassetteBackend(
+        cassette_path,
+        backend=MockBackend(),
+        mode=os.getenv("CHAT_MODEL_CASSETTE_MODE", "auto"),
+        replay_latency=os.getenv("CHAT_MODEL_CASSETTE_LATENCY", "none"),
+    )
+    yield backend
+    backend.close()
+
+
+@pytest.fixture
+def clock(chat_backend):
+    """
+    量測延遲用的時鐘
+
+    使用預設 Mock 後端時為虛擬時鐘，模擬延遲只推進邏輯時間而不實際等待；
+    設定 CHAT_MODEL_CLOCK=real 或使用錄製 / 重播後端時為真實時鐘
+    """
+    import os
+    from ai_models.clock import SystemClock, VirtualClock
+    if chat_backend is not None or os.getenv("CHAT_MODEL_CLOCK", "virtual") == "real":
+        return SystemClock()
+    return VirtualClock()
+
+
 @pytest.fixture
-def chat_model():
+def chat_model(chat_backend, clock):
     """AI 聊天模型 fixture"""
     from ai_models.chat_model import ChatModel
-    model = ChatModel(model_name="gpt-3.5-turbo", temperature=0.7)
+    model = ChatModel(model_name="gpt-3.5-turbo", temperature=0.7, backend=chat_backend, clock=clock)
     yield model
     # Teardown: 清理對話歷史
     model.clear_history()
 
 
 @pytest.fixture
-def chat_model_low_temp():
+def chat_model_low_temp(chat_backend, clock):
     """低溫度的聊天模型（更確定性的回應）"""
     from ai_models.chat_model import ChatModel
-    model = ChatModel(model_name="gpt-3.5-turbo", temperature=0.1)
+    model = ChatModel(model_name="gpt-3.5-turbo", temperature=0.1, backend=chat_backend, clock=clock)
     yield model
     model.clear_history()
 
 
+@pytest.fixture(scope="session")
+def response_cache(reports_dir):
+    """
+    跨測試執行共用的回應快取（opt-in）
+
+    磁碟層存放在 reports/response_cache.sqlite，適合低溫度、結果近乎確定的模型
+    """
+    from ai_models.response_cache import ResponseCache
+    cache = ResponseCache(max_entries=4096, disk_path=reports_dir / "response_cache.sqlite")
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def run_async():
+    """
+    在獨立執行緒的事件迴圈中執行 coroutine
+
+    Playwright 同步 API 會在主執行緒保留一個執行中的事件迴圈，
+    直接呼叫 asyncio.run() 會失敗，因此非同步測試統一透過此 fixture 執行
+    """
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    def _run(coro):
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, coro).result()
+
+    return _run
+
+
 @pytest.fixture
 def sample_prompts():
     """測試用的 prompt 範例"""
@@ -14,3 +14,12 @@ def api_client():
 def mock_llm_response():
     """模擬 LLM 回應"""
     return {"response": "您好！我可以幫您查詢帳戶餘額。", "confidence": 0.95, "intent": "account_inquiry"}
+
+
+@pytest.fixture(scope="session")
+def stub_llm_server():
+    """本機 Stub LLM 伺服器（session 級別），模擬 chat completion API"""
+    from ai_models.stub_server import StubLLMServer
+
+    with StubLLMServer() as server:
+        yield server
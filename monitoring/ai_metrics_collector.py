@@ -197,7 +197,9 @@ class AIMetricsCollector:
 
         Args:
             model_name: 模型名稱
-            metrics: 性能指標，包含 latency, token_count, cost 等
+            metrics: 性能指標，包含 latency, token_count, prompt_tokens, completion_tokens, cost, throughput, ttft,
+                inter_token_latency, tokens_per_second, batch_size, queue_wait,
+                hedge_fired, hedge_rate, hedge_latency_saved 等
         """
         try:
             # 記錄延遲
@@ -227,6 +229,16 @@ class AIMetricsCollector:
                     labels={"metric_type": "performance", "component": "cost"},
                 )
 
+            # 記錄 prompt / completion token 拆分（用量計量）
+            for key in ("prompt_tokens", "completion_tokens"):
+                if key in metrics:
+                    self.observability.record_ai_metric(
+                        model_name=model_name,
+                        metric_name=f"performance.{key}",
+                        value=float(metrics[key]),
+                        labels={"metric_type": "performance", "component": "usage"},
+                    )
+
             # 記錄吞吐量
             if "throughput" in metrics:
                 self.observability.record_ai_metric(
@@ -236,10 +248,69 @@ class AIMetricsCollector:
                     labels={"metric_type": "performance", "component": "throughput"},
                 )
 
+            # 記錄串流延遲指標
+            for key in ("ttft", "inter_token_latency", "inter_token_latency_max", "tokens_per_second"):
+                if key in metrics:
+                    self.observability.record_ai_metric(
+                        model_name=model_name,
+                        metric_name=f"performance.{key}",
+                        value=float(metrics[key]),
+                        labels={"metric_type": "performance", "component": "streaming"},
+                    )
+
+            # 記錄批次大小與佇列等待時間（請求合併器）
+            if "batch_size" in metrics:
+                self.observability.record_ai_metric(
+                    model_name=model_name,
+                    metric_name="performance.batch_size",
+                    value=float(metrics["batch_size"]),
+                    labels={"metric_type": "performance", "component": "batching"},
+                )
+
+            if "queue_wait" in metrics:
+                self.observability.record_ai_metric(
+                    model_name=model_name,
+                    metric_name="performance.queue_wait",
+                    value=float(metrics["queue_wait"]),
+                    labels={"metric_type": "performance", "component": "batching"},
+                )
+
+            # 記錄對沖請求（觸發次數、觸發比例、節省的尾端延遲）
+            for key in ("hedge_fired", "hedge_rate", "hedge_latency_saved"):
+                if key in metrics:
+                    self.observability.record_ai_metric(
+                        model_name=model_name,
+                        metric_name=f"performance.{key}",
+                        value=float(metrics[key]),
+                        labels={"metric_type": "performance", "component": "hedging"},
+                    )
+
             logger.debug(f"Recorded performance metrics for {model_name}: {metrics}")
         except Exception as e:
             logger.error(f"Failed to record performance metrics: {e}")
 
+    def record_cache_metrics(self, model_name: str, cache_stats: Dict[str, Any]) -> None:
+        """
+        記錄回應快取指標
+
+        Args:
+            model_name: 模型名稱
+            cache_stats: 快取統計，包含 hit_ratio, miss_ratio, bytes_saved 等（ResponseCache.get_stats()）
+        """
+        try:
+            for metric_name in ("hit_ratio", "miss_ratio", "bytes_saved", "hits", "misses"):
+                if metric_name in cache_stats:
+                    self.observability.record_ai_metric(
+                        model_name=model_name,
+                        metric_name=f"cache.{metric_name}",
+                        value=float(cache_stats[metric_name]),
+                        labels={"metric_type": "cache", "component": metric_name},
+                    )
+
+            logger.debug(f"Recorded cache metrics for {model_name}: {cache_stats}")
+        except Exception as e:
+            logger.error(f"Failed to record cache metrics: {e}")
+
     def create_monitoring_context(self, model_name: str, operation: str):
         """
         創建監控上下文管理器，用於追蹤 AI 操作
@@ -6,10 +6,15 @@ import pytest
 import time
 from typing import Optional
 from monitoring.observability import get_observability
+from monitoring.ai_metrics_collector import get_ai_metrics_collector
+from ai_models.usage_meter import get_usage_meter
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 不列入用量分組的 pytest 內建標記
+_BUILTIN_MARKERS = {"parametrize", "usefixtures", "filterwarnings", "skip", "skipif", "xfail"}
+
 
 class TestMetricsCollector:
     """測試指標收集器"""
@@ -18,6 +23,7 @@ class TestMetricsCollector:
         self.observability = None
         self.test_start_times = {}
         self.session_start_time = None
+        self.usage_meter = get_usage_meter()
 
     def pytest_configure(self, config):
         """Pytest 配置階段"""
@@ -60,6 +66,15 @@ class TestMetricsCollector:
             # 注意：這裡我們只記錄開始，實際的 span 在 runtest_makereport 中完成
             logger.debug(f"Test started: {nodeid}")
 
+    def pytest_runtest_setup(self, item):
+        """測試 setup 前設定用量歸屬（fixture 內的模型呼叫也計入此測試）"""
+        markers = sorted({mark.name for mark in item.iter_markers()} - _BUILTIN_MARKERS)
+        self.usage_meter.set_scope(item.nodeid, markers)
+
+    def pytest_runtest_logfinish(self, nodeid, location):
+        """測試結束後清除用量歸屬"""
+        self.usage_meter.clear_scope()
+
     def pytest_runtest_makereport(self, item, call):
         """測試報告生成"""
         if call.when == "call":  # 只在實際測試執行階段記錄
@@ -90,6 +105,12 @@ class TestMetricsCollector:
 
     def pytest_sessionfinish(self, session, exitstatus):
         """測試會話結束"""
+        # 合併各執行緒的用量並匯出到 AI 指標
+        try:
+            self.usage_meter.export(get_ai_metrics_collector())
+        except Exception as e:
+            logger.warning(f"Failed to export usage metrics: {e}")
+
         if self.session_start_time and self.observability:
             session_duration = time.time() - self.session_start_time
 
@@ -114,6 +135,25 @@ class TestMetricsCollector:
                     f"{passed} passed, {failed} failed in {session_duration:.2f}s"
                 )
 
+    def pytest_terminal_summary(self, terminalreporter, exitstatus, config):
+        """在測試摘要列出 token 用量最多的測試"""
+        limit = config.getoption("--usage-top", default=10)
+        consumers = self.usage_meter.top_consumers(limit) if limit > 0 else []
+        if not consumers:
+            return
+
+        terminalreporter.write_sep("=", "top token consumers")
+        for test_id, usage in consumers:
+            terminalreporter.write_line(
+                f"{usage['total_tokens']:>10} tokens {usage['calls']:>7} calls "
+                f"${usage['cost']:>9.4f} {usage['avg_latency'] * 1000:>8.1f} ms/call  {test_id or '(outside tests)'}"
+            )
+        for model_name, usage in sorted(self.usage_meter.breakdown(by="model").items()):
+            terminalreporter.write_line(
+                f"{model_name}: {usage['prompt_tokens']} prompt + {usage['completion_tokens']} completion tokens, "
+                f"{usage['calls']} calls, ${usage['cost']:.4f}"
+            )
+
     def pytest_unconfigure(self, config):
         """Pytest 清理階段"""
         if self.observability:
@@ -146,6 +186,13 @@ def pytest_addoption(parser):
         help="Enable Prometheus metrics export",
     )
 
+    group.addoption(
+        "--usage-top",
+        type=int,
+        default=10,
+        help="Number of top token-consuming tests to list in the summary (0 to disable)",
+    )
+
 
 def pytest_configure(config):
     """註冊 plugin"""
@@ -0,0 +1,262 @@
+"""回應評估器單元測試"""
+
+import pytest
+
+
+@pytest.mark.unit
+class TestResponseEvaluatorBatch:
+    """回應批次評估測試"""
+    
+    @staticmethod
+    def dataset():
+        responses = [
+            "您的帳戶餘額為 1000 元。", "不知道", "請至設定頁面重設密碼，完成後重新登入即可。", "The weather is nice..."
+        ]
+        keywords = [["帳戶", "餘額"], ["密碼"], None, ["password", "reset", "login"]]
+        contexts = ["查詢帳戶餘額", "如何重設密碼", "", "How do I reset my password"]
+        return responses, keywords, contexts
+    
+    def test_TC_UNIT_0075_batch_matches_per_item_evaluation(self):
+        """TC-UNIT-0075: 驗證批次評估的分數、通過與問題描述和逐筆 evaluate_response 完全相同"""
+        from ai_models.response_evaluator import ResponseEvaluator
+        
+        # Arrange
+        evaluator = ResponseEvaluator()
+        responses, keywords, contexts = self.dataset()
+        
+        # Act - 輸入可為產生器
+        result = evaluator.evaluate_batch(iter(responses), iter(keywords), iter(contexts), processes=0, chunk_size=3)
+        shared = evaluator.evaluate_batch(responses, ["密碼", "重設"], "如何重設密碼", processes=0)
+        
+        # Assert
+        assert len(result) == 4
+        for i, args in enumerate(zip(responses, keywords, contexts)):
+            expected = evaluator.evaluate_response(*args)
+            assert result[i] == {k: expected[k] for k in ("scores", "passed", "issues")}
+            assert shared[i]["scores"] == evaluator.evaluate_response(responses[i], ["密碼", "重設"], "如何重設密碼")["scores"]
+        summary = result.summary()
+        assert summary["count"] == 4
+        assert summary["passed"] == sum(result.to_dict()["passed"])
+        low_keywords = [i for i in range(4) if any("關鍵詞" in issue for issue in result[i]["issues"])]
+        assert summary["low_keywords"] == len(low_keywords)
+        with pytest.raises(ValueError):
+            evaluator.evaluate_batch(responses, chunk_size=0)
+    
+    def test_TC_UNIT_0076_process_pool_and_single_summary_log(self, caplog):
+        """TC-UNIT-0076: 驗證程序池分塊評估依輸入順序合併，且只記錄一行摘要日誌"""
+        import logging
+        from ai_models.response_evaluator import ResponseEvaluator
+        
+        # Arrange
+        evaluator = ResponseEvaluator()
+        responses, keywords, contexts = (column * 5 for column in self.dataset())
+        
+        local = evaluator.evaluate_batch(responses, keywords, contexts, processes=1)
+        caplog.clear()
+        
+        # Act
+        with caplog.at_level(logging.DEBUG, logger="ai_models.response_evaluator"):
+            pooled = evaluator.evaluate_batch(responses, keywords, contexts, processes=2, chunk_size=3)
+        
+        # Assert
+        assert pooled.to_dict() == local.to_dict()
+        assert len(pooled) == 20
+        records = [r for r in caplog.records if r.name == "ai_models.response_evaluator"]
+        assert len(records) == 1
+        assert "20 筆" in records[0].getMessage()
+
+
+@pytest.mark.unit
+class TestResponseEvaluatorSimilarity:
+    """回應相似度後端測試"""
+    
+    def test_TC_UNIT_0077_pluggable_similarity_backends(self):
+        """TC-UNIT-0077: 驗證每個評估器可選擇相似度後端，預設維持 SequenceMatcher 的分數"""
+        from difflib import SequenceMatcher
+        from ai_models.response_evaluator import ResponseEvaluator
+        from ai_models.similarity import SIMILARITY_BACKENDS, MinHashSimilarity, ShingleJaccard, get_similarity
+        
+        # Arrange
+        a = "您可以登入網路銀行查詢帳戶餘額，或撥打客服專線。" * 3
+        b = "您可以登入網路銀行查詢帳戶餘額，也可以臨櫃辦理。" * 3
+        
+        # Act & Assert - 預設後端分數不變
+        default = ResponseEvaluator().compare_responses(a, b)
+        assert default["similarity"] == SequenceMatcher(None, a, b).ratio()
+        
+        for name in SIMILARITY_BACKENDS:
+            similarity = get_similarity(name)
+            assert similarity.score(a, a) == 1.0
+            assert similarity.score("", "") == 1.0
+            assert 0.0 <= similarity.score(a, b) < 1.0
+            assert similarity.score("帳戶餘額", "weather today") == 0.0
+        
+        # MinHash 估計值接近精確的 shingle Jaccard
+        assert abs(MinHashSimilarity(num_hashes=256).score(a, b) - ShingleJaccard().score(a, b)) < 0.1
+        
+        evaluator = ResponseEvaluator(similarity="shingle")
+        assert evaluator.compare_responses(a, b)["similarity"] == ShingleJaccard().score(a, b)
+        batch = evaluator.evaluate_batch([a, b], contexts="查詢帳戶餘額", processes=2)
+        assert batch[1]["scores"] == evaluator.evaluate_response(b, None, "查詢帳戶餘額")["scores"]
+        with pytest.raises(ValueError):
+            ResponseEvaluator(similarity="levenshtein")
+
+
+@pytest.mark.unit
+class TestAnalyzedText:
+    """共用文字分析測試"""
+    
+    def test_TC_UNIT_0078_detectors_share_one_analysis(self):
+        """TC-UNIT-0078: 驗證同一則回應交給所有檢測器時只分析一次，結果與傳入 str 相同"""
+        from ai_models.bias_detector import BiasDetector
+        from ai_models.hallucination_detector import HallucinationDetector
+        from ai_models.response_evaluator import ResponseEvaluator
+        from ai_models.text_analysis import AnalyzedText, analyze
+        
+        class CountingText(AnalyzedText):
+            lower_calls = 0
+            
+            def lower(self):
+                CountingText.lower_calls += 1
+                return super().lower()
+        
+        # Arrange
+        raw = "根據 2023年 的研究，女性總是比較感性。Your balance is 1,000 NTD! 利率為 3.5%"
+        context = "查詢帳戶餘額 1000"
+        evaluator, hallucination, bias = ResponseEvaluator(), HallucinationDetector(), BiasDetector()
+        
+        # Act
+        text = CountingText(raw)
+        shared = [
+            evaluator.evaluate_response(text, ["balance", "帳戶"], context),
+            hallucination.detect_hallucination(text, None, context),
+            bias.detect_bias(text),
+            evaluator.is_empty_or_error_response(text),
+        ]
+        plain = [
+            evaluator.evaluate_response(raw, ["balance", "帳戶"], context),
+            hallucination.detect_hallucination(raw, None, context),
+            bias.detect_bias(raw),
+            evaluator.is_empty_or_error_response(raw),
+        ]
+        
+        # Assert
+        assert shared == plain
+        assert CountingText.lower_calls == 1
+        assert analyze(text) is text
+        assert text.numbers == ["2023", "1", "000", "3", "5"]
+        assert text.cjk_bigrams[:3] == ["根據", "的研", "研究"]
+        assert text.sentences == ["根據 2023年 的研究，女性總是比較感性。", "Your balance is 1,000 NTD!", "利率為 3.5%"]
+        assert analyze("ＡＢＣ１２３").normalized == "abc123"
+
+
+@pytest.mark.unit
+class TestKeywordSet:
+    """預先編譯的關鍵詞集合測試"""
+    
+    def test_TC_UNIT_0079_keyword_set_matches_and_positions(self):
+        """TC-UNIT-0079: 驗證 KeywordSet 的涵蓋率與逐一比對相同，並回報命中的關鍵詞與位置"""
+        from ai_models.response_evaluator import KeywordSet, ResponseEvaluator
+        
+        # Arrange
+        evaluator = ResponseEvaluator()
+        response = "您的帳戶餘額為 1000 元，Account 狀態正常，帳戶已驗證。"
+        keywords = ["帳戶", "餘額", "account", "密碼", "帳戶", ""]
+        large = keywords + [f"關鍵詞{i}" for i in range(200)]  # 超過門檻改用自動機
+        
+        # Act
+        compiled, large_compiled = KeywordSet(keywords), KeywordSet(large)
+        match = evaluator.match_keywords(response, compiled)
+        
+        # Assert - 重複的關鍵詞各自計分，空字串視為命中
+        assert evaluator.evaluate_keywords(response, compiled) == evaluator.evaluate_keywords(response, keywords)
+        assert evaluator.evaluate_keywords(response, large_compiled) == evaluator.evaluate_keywords(response, large)
+        assert match["matched"] == ["帳戶", "餘額", "account", "帳戶", ""]
+        assert match["missing"] == ["密碼"]
+        assert match["positions"]["帳戶"] == [response.index("帳戶"), response.rindex("帳戶")]
+        assert match["positions"]["account"] == [response.index("Account")]
+        assert match["coverage"] == pytest.approx(5 / 6)
+        assert large_compiled.match(response)["positions"] == match["positions"]
+        assert KeywordSet([]).coverage(response) == 1.0
+        
+        # 批次評估共用的關鍵詞只編譯一次，結果與逐筆評估相同
+        batch = evaluator.evaluate_batch([response, "請重設密碼"], keywords, processes=0)
+        assert batch[1]["scores"] == evaluator.evaluate_response("請重設密碼", keywords)["scores"]
+
+
+@pytest.mark.unit
+class TestPreparedContext:
+    """上下文預處理快取測試"""
+    
+    def test_TC_UNIT_0080_context_prepared_once(self):
+        """TC-UNIT-0080: 驗證同一上下文只處理一次，分數與不快取時相同"""
+        from ai_models.response_evaluator import PreparedContext, ResponseEvaluator
+        
+        # Arrange
+        context = "請問如何查詢帳戶餘額與最近的交易明細？"
+        responses = ["您可以登入網路銀行查詢帳戶餘額。", "交易明細可在網路銀行下載。", "今天天氣晴朗。"]
+        
+        for backend in ("sequence", "shingle", "minhash", "cosine"):
+            cached = ResponseEvaluator(similarity=backend)
+            uncached = ResponseEvaluator(similarity=backend, context_cache_size=0)
+            
+            # Act
+            scores = [cached.evaluate_relevance(response, context) for response in responses]
+            
+            # Assert
+            assert scores == [uncached.evaluate_relevance(response, context) for response in responses]
+            assert cached.context_cache.get_stats()["misses"] == 1
+            assert cached.context_cache.get_stats()["hits"] == 2
+        
+        evaluator = ResponseEvaluator(similarity="shingle")
+        prepared = evaluator.prepare_context(context)
+        assert isinstance(prepared, PreparedContext)
+        assert evaluator.prepare_context(prepared) is prepared
+        assert prepared.meaningful_words == {"請問如何查詢帳戶餘額與最近的交易明細"}
+        assert prepared.lowered == context.lower()
+        assert evaluator.evaluate_response(responses[0], None, prepared) == evaluator.evaluate_response(
+            responses[0], None, context
+        )
+        # 其他評估器建立的 PreparedContext 會以自己的相似度後端重新處理
+        other = ResponseEvaluator().prepare_context(context)
+        assert evaluator.evaluate_relevance(responses[0], other) == evaluator.evaluate_relevance(responses[0], context)
+        # 共用上下文的批次評估也可以送到工作程序
+        batch = evaluator.evaluate_batch(responses, contexts=context, processes=2)
+        assert batch[2]["scores"] == evaluator.evaluate_response(responses[2], None, context)["scores"]
+
+
+@pytest.mark.unit
+class TestVectorizedScoring:
+    """向量化資料集計分測試"""
+    
+    def test_TC_UNIT_0081_vectorized_scores_match_per_item(self):
+        """TC-UNIT-0081: 驗證向量化計分的各項分數、通過與問題描述和逐筆 evaluate_response 完全相同"""
+        import random
+        pytest.importorskip("numpy")
+        from ai_models.response_evaluator import KeywordSet, ResponseEvaluator
+        
+        # Arrange - 涵蓋多個不完整指標、各種長度、空關鍵詞與有無上下文
+        rng = random.Random(7)
+        parts = ["您的帳戶餘額為 1000 元", "不知道", "...", "[待續]", "無法回答", "請重設密碼", "account", "。", "!", " "]
+        evaluator = ResponseEvaluator(min_length=5, max_length=60)
+        responses = ["".join(rng.choices(parts, k=rng.randint(0, 10))) for _ in range(500)]
+        keywords = [
+            None if i % 5 == 0 else rng.sample(["帳戶", "餘額", "密碼", "account", "xyz", ""], rng.randint(0, 4))
+            for i in range(500)
+        ]
+        keywords = [KeywordSet(row) if row and i % 2 else row for i, row in enumerate(keywords)]
+        contexts = [rng.choice([None, "", "查詢帳戶餘額", "reset password 密碼"]) for _ in range(500)]
+        
+        # Act
+        features = evaluator.extract_features(responses, keywords, contexts)
+        result = evaluator.score_features(**features)
+        
+        # Assert
+        assert features["indicator_hits"].shape == (500, 6)
+        assert features["keyword_hits"].shape[0] == 500
+        for i in range(500):
+            expected = evaluator.evaluate_response(responses[i], keywords[i], contexts[i])
+            assert result[i] == {key: expected[key] for key in ("scores", "passed", "issues")}
+        shared_args = (responses[:20], ["帳戶", "餘額"], "查詢帳戶餘額")
+        shared = evaluator.score_features(**evaluator.extract_features(*shared_args))
+        assert shared.to_dict() == evaluator.evaluate_batch(*shared_args, processes=0).to_dict()
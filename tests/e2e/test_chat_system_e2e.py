@@ -4,7 +4,6 @@ AI 聊天系統 E2E 測試
 """
 
 import pytest
-import time
 
 
 @pytest.mark.e2e
@@ -237,9 +236,9 @@ class TestChatSystemPerformanceE2E:
         num_requests = 20
         
         for i in range(num_requests):
-            start = time.time()
+            start = chat_model.clock.now()
             response = chat_model.reply(f"測試問題 {i}")
-            end = time.time()
+            end = chat_model.clock.now()
             
             response_times.append(end - start)
             assert response is not None
@@ -257,13 +256,13 @@ class TestChatSystemPerformanceE2E:
         # Scenario: 長時間對話不應導致效能下降
         
         num_turns = 30
-        start_time = time.time()
+        start_time = chat_model.clock.now()
         
         for i in range(num_turns):
             response = chat_model.reply(f"對話輪次 {i}")
             assert response is not None
         
-        end_time = time.time()
+        end_time = chat_model.clock.now()
         total_time = end_time - start_time
         avg_time_per_turn = total_time / num_turns
         
@@ -350,3 +349,39 @@ class TestChatSystemIntegrationPoints:
                 assert response != "請輸入有效的內容"
             else:
                 assert response == "請輸入有效的內容"
+
+
+@pytest.mark.e2e
+class TestChatSystemScriptedConversations:
+    """腳本化多輪對話 E2E 測試"""
+    
+    def test_TC_E2E_0026_pipelined_scripted_journeys(self, chat_model):
+        """TC-E2E-0026: 測試多個腳本化使用者旅程並行執行，各自的對話依序且完整"""
+        from ai_models.conversation_runner import ConversationRunner, ConversationScript
+        
+        # Scenario: 使用者旅程與客戶支援場景同時進行，各自重複多位使用者
+        journey = [
+            {"user": "你好", "verify": lambda r: "你好" in r or "Hello" in r},
+            "你能幫我做什麼？",
+            {"user": "我想查詢我的帳戶餘額", "verify": lambda r: "帳戶" in r or "餘額" in r},
+            "謝謝你的幫助",
+        ]
+        support = [
+            {"user": "你好，我需要幫助", "verify": lambda r: "你好" in r or "幫助" in r},
+            {"user": "我的帳戶有問題", "verify": lambda r: "帳戶" in r},
+            {"user": "我想查詢餘額", "verify": lambda r: "餘額" in r or "帳戶" in r},
+            "謝謝你的協助",
+        ]
+        scripts = [ConversationScript(f"journey-{i}", journey) for i in range(5)]
+        scripts += [ConversationScript(f"support-{i}", support) for i in range(5)]
+        
+        result = ConversationRunner(chat_model, max_workers=4, keep_sessions=True).run(scripts)
+        
+        # Verify: 所有檢查通過，每個對話歷史完整且順序正確
+        assert result["failures"] == 0
+        assert result["turn_latency"]["count"] == 40
+        for script in scripts:
+            history = chat_model.get_conversation_history(session_id=script.name)
+            assert len(history) == 8
+            assert [m["content"] for m in history[::2]] == [turn["user"] for turn in script.turns]
+            chat_model.end_session(script.name)
@@ -1,9 +1,25 @@
 """效能測試 - 負載測試"""
 
 import pytest
+import os
 import time
+import asyncio
+import logging
+import statistics
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+logger = logging.getLogger(__name__)
+
+
+def _median_time(func, repeats=5):
+    """重複執行取耗時中位數（秒），降低整套測試同時執行時的負載抖動"""
+    timings = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start_time)
+    return statistics.median(timings)
+
 
 @pytest.mark.performance
 class TestLoadPerformance:
@@ -135,3 +151,921 @@ class TestThroughput:
         # 計算吞吐量
         throughput = request_count / duration
         assert throughput > 100, f"吞吐量 {throughput:.0f} req/s 低於預期"
+
+
+@pytest.mark.performance
+class TestAsyncConcurrency:
+    """非同步並發測試 - TC-PERF-0006"""
+
+    def test_TC_PERF_0006_asyncio_vs_thread_throughput(self, run_async):
+        """TC-PERF-0006: 比較 asyncio 與執行緒池的並發對話吞吐量
+
+        asyncio 版本以單一事件迴圈驅動所有對話，不受執行緒數量限制
+        """
+        from ai_models.chat_model import ChatModel
+
+        num_conversations = 200
+        max_workers = 20
+
+        # 執行緒池版本：每個對話一個模型，以避免共享歷史
+        def run_conversation(i):
+            return ChatModel().reply(f"並發問題 {i}")
+
+        thread_start = time.time()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            thread_results = list(executor.map(run_conversation, range(num_conversations)))
+        thread_elapsed = time.time() - thread_start
+
+        # asyncio 版本：同一個事件迴圈內同時驅動所有對話
+        async def run_all():
+            models = [ChatModel() for _ in range(num_conversations)]
+            return await asyncio.gather(*(m.areply(f"並發問題 {i}") for i, m in enumerate(models)))
+
+        async_start = time.time()
+        async_results = run_async(run_all())
+        async_elapsed = time.time() - async_start
+
+        thread_throughput = num_conversations / thread_elapsed
+        async_throughput = num_conversations / async_elapsed
+        logger.info(
+            f"thread: {thread_throughput:.0f} conv/s ({max_workers} workers), "
+            f"asyncio: {async_throughput:.0f} conv/s"
+        )
+
+        # 驗證
+        assert async_results == thread_results
+        assert async_throughput > thread_throughput, "asyncio 吞吐量應高於固定大小的執行緒池"
+
+
+@pytest.mark.performance
+class TestConnectionPooling:
+    """連線池效能測試 - TC-PERF-0007"""
+
+    def test_TC_PERF_0007_pooled_vs_unpooled_latency(self, stub_llm_server):
+        """TC-PERF-0007: 比較連線池與每次新建連線的平均延遲
+
+        使用本機 Stub 伺服器，差異主要來自連線建立成本
+        """
+        pytest.importorskip("httpx")
+        from ai_models.backends import HttpxBackend
+        from ai_models.chat_model import ChatModel
+
+        num_requests = 50
+
+        def measure(pooled):
+            model = ChatModel(backend=HttpxBackend(stub_llm_server.base_url, pooled=pooled))
+            model.reply("暖身")
+            start_time = time.time()
+            for i in range(num_requests):
+                model.clear_history()
+                model.reply(f"延遲測試 {i}")
+            elapsed = time.time() - start_time
+            model.close()
+            return elapsed / num_requests
+
+        pooled_latency = measure(pooled=True)
+        unpooled_latency = measure(pooled=False)
+        logger.info(f"pooled: {pooled_latency * 1000:.2f} ms, unpooled: {unpooled_latency * 1000:.2f} ms")
+
+        # 驗證
+        assert pooled_latency < unpooled_latency, "連線池模式的平均延遲應低於每次新建連線"
+
+
+@pytest.mark.performance
+class TestRequestCoalescing:
+    """請求合併效能測試 - TC-PERF-0008"""
+
+    def test_TC_PERF_0008_coalesced_throughput(self):
+        """TC-PERF-0008: 後端並發受限時，比較合併請求與逐筆請求的吞吐量
+
+        模擬後端同時只能處理 4 個往返（例如供應商的並發配額）
+        """
+        import threading
+        from ai_models.backends import MockBackend
+        from ai_models.batching import RequestCoalescer
+        from ai_models.chat_model import ChatModel
+
+        class LimitedBackend(MockBackend):
+            """同時最多處理 4 個往返的 Mock 後端"""
+
+            def __init__(self):
+                super().__init__()
+                self.slots = threading.Semaphore(4)
+
+            def complete(self, *args, **kwargs):
+                with self.slots:
+                    return super().complete(*args, **kwargs)
+
+            def complete_batch(self, *args, **kwargs):
+                with self.slots:
+                    return super().complete_batch(*args, **kwargs)
+
+        num_requests = 200
+        max_workers = 50
+
+        def run(backend):
+            start_time = time.time()
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                list(executor.map(lambda i: ChatModel(backend=backend).reply(f"請求 {i}"), range(num_requests)))
+            return num_requests / (time.time() - start_time)
+
+        direct_throughput = run(LimitedBackend())
+        coalescer = RequestCoalescer(LimitedBackend(), max_batch_size=32, max_wait=0.002, max_in_flight=4)
+        coalesced_throughput = run(coalescer)
+        stats = coalescer.get_stats()
+        coalescer.close()
+        logger.info(
+            f"direct: {direct_throughput:.0f} req/s, coalesced: {coalesced_throughput:.0f} req/s, "
+            f"avg batch: {stats['batch_size']:.1f}, avg wait: {stats['queue_wait'] * 1000:.2f} ms"
+        )
+
+        # 驗證 - 往返次數大幅減少，吞吐量明顯提升
+        assert stats["request_count"] == num_requests
+        assert stats["batch_count"] < num_requests / 4
+        assert coalesced_throughput > direct_throughput * 2
+
+
+@pytest.mark.performance
+class TestStreamingLoad:
+    """串流負載測試 - TC-PERF-0009"""
+
+    def test_TC_PERF_0009_concurrent_stream_ttft(self, run_async):
+        """TC-PERF-0009: 並發串流下的 TTFT 與輸出速率
+
+        Mock 後端以固定 token 速率輸出，可在離線環境重現串流負載
+        """
+        from ai_models.backends import MockBackend
+        from ai_models.chat_model import ChatModel
+
+        num_streams = 100
+        backend = MockBackend(latency=0.02, token_rate=500)
+
+        async def run_all():
+            models = [ChatModel(backend=backend) for _ in range(num_streams)]
+            streams = [m.areply_stream(f"串流問題 {i}") for i, m in enumerate(models)]
+            await asyncio.gather(*(s.read() for s in streams))
+            return [s.metrics for s in streams]
+
+        metrics = run_async(run_all())
+        ttfts = sorted(m.ttft for m in metrics)
+        p95_ttft = ttfts[int(len(ttfts) * 0.95)]
+        avg_rate = sum(m.tokens_per_second for m in metrics) / len(metrics)
+        logger.info(f"p95 TTFT: {p95_ttft * 1000:.1f} ms, avg rate: {avg_rate:.0f} tokens/s")
+
+        # 驗證
+        assert all(m.token_count > 1 for m in metrics)
+        assert p95_ttft < 0.5, f"p95 TTFT {p95_ttft:.3f}s 超過 0.5 秒"
+
+
+@pytest.mark.performance
+class TestLongConversation:
+    """長對話效能測試 - TC-PERF-0010"""
+
+    def test_TC_PERF_0010_constant_per_turn_cost(self):
+        """TC-PERF-0010: 有 token 預算時，每輪成本不隨對話長度成長"""
+        from ai_models.backends import MockBackend
+        from ai_models.chat_model import ChatModel
+
+        model = ChatModel(backend=MockBackend(latency=0.0), history_token_budget=500)
+        num_turns = 3000
+        window = 300
+
+        def timed_turns(offset):
+            start_time = time.perf_counter()
+            for i in range(window):
+                model.reply(f"長對話第 {offset + i} 輪")
+            return (time.perf_counter() - start_time) / window
+
+        early = timed_turns(0)
+        for i in range(window, num_turns - window):
+            model.reply(f"長對話第 {i} 輪")
+        late = timed_turns(num_turns - window)
+        logger.info(f"early: {early * 1e6:.1f} us/turn, late: {late * 1e6:.1f} us/turn")
+
+        # 驗證
+        assert model.conversation_history.total_tokens <= 500
+        assert late < early * 3, "對話後段每輪耗時不應隨歷史長度成長"
+
+
+@pytest.mark.performance
+class TestTokenEstimation:
+    """Token 估算效能測試 - TC-PERF-0011"""
+
+    def test_TC_PERF_0011_batch_token_estimation(self):
+        """TC-PERF-0011: 正則批次估算與逐字計算的效能比較（中英混合語料）"""
+        from ai_models.chat_model import ChatModel
+
+        def per_char_estimate(text):
+            chinese_chars = sum(1 for char in text if "\u4e00" <= char <= "\u9fff")
+            return max(1, (chinese_chars // 2) + ((len(text) - chinese_chars) // 4))
+
+        model = ChatModel()
+        sentences = ["請問我的帳戶餘額是多少？", "What is the weather like today? ", "訂單 #12345 的 shipping status 如何", "OK"]
+        corpus = [sentences[i % 4] * (1 + i % 80) for i in range(2000)]
+
+        start_time = time.perf_counter()
+        expected = [per_char_estimate(text) for text in corpus]
+        per_char_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        actual = model.estimate_tokens_many(corpus)
+        batch_time = time.perf_counter() - start_time
+        logger.info(f"per-char: {per_char_time * 1000:.1f} ms, batch: {batch_time * 1000:.1f} ms")
+
+        # 驗證
+        assert actual == expected
+        assert batch_time < per_char_time, "正則批次估算應快於逐字計算"
+
+
+@pytest.mark.performance
+class TestMultiSessionLoad:
+    """多對話共用模型負載測試 - TC-PERF-0012"""
+
+    def test_TC_PERF_0012_many_sessions_on_one_model(self):
+        """TC-PERF-0012: 單一模型服務大量模擬使用者，對話數維持在上限內"""
+        from ai_models.backends import MockBackend
+        from ai_models.chat_model import ChatModel
+
+        model = ChatModel(backend=MockBackend(latency=0.001), history_token_budget=200, max_sessions=500)
+        num_users = 2000
+        turns_per_user = 3
+
+        def simulated_user(user_id):
+            for turn in range(turns_per_user):
+                model.reply(f"使用者 {user_id} 第 {turn} 個問題", session_id=user_id)
+            return len(model.get_conversation_history(user_id))
+
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=50) as executor:
+            lengths = list(executor.map(simulated_user, range(num_users)))
+        total_time = time.perf_counter() - start_time
+        stats = model.sessions.get_stats()
+        logger.info(f"{num_users * turns_per_user / total_time:.0f} turns/s, sessions: {stats}")
+
+        # 驗證
+        assert all(length == turns_per_user * 2 for length in lengths)
+        assert stats["active_sessions"] <= 500
+        assert stats["created"] == num_users
+        assert stats["evicted"] == num_users - stats["active_sessions"]
+
+
+@pytest.mark.performance
+class TestIntentRouting:
+    """意圖路由效能測試 - TC-PERF-0013"""
+
+    def test_TC_PERF_0013_compiled_router_scales_to_10k_rules(self):
+        """TC-PERF-0013: 10k 條規則下，編譯後的自動機與逐條 any() 比對的效能比較"""
+        import random
+        from ai_models.intent_router import IntentRouter
+
+        rng = random.Random(42)
+        num_rules = 10000
+        rules = [
+            {
+                "name": f"intent_{i}",
+                "keywords": [f"意圖{i}號", f"kw{i}x", f"product-{i}-faq"],
+                "response": f"response {i}",
+                "priority": rng.randint(0, 100),
+            }
+            for i in range(num_rules)
+        ]
+        prompts = [
+            f"請問 product-{rng.randrange(num_rules)}-faq 和 意圖{rng.randrange(num_rules)}號 的差別？" * 3
+            for _ in range(200)
+        ] + ["沒有任何關鍵字的問題"] * 20
+
+        start_time = time.perf_counter()
+        router = IntentRouter(rules)
+        compile_time = time.perf_counter() - start_time
+
+        # 舊做法：依優先權逐條檢查每個關鍵字
+        ordered = sorted(enumerate(rules), key=lambda item: (-item[1]["priority"], item[0]))
+
+        def linear_route(prompt):
+            prompt_lower = prompt.lower()
+            for _, rule in ordered:
+                if any(word in prompt_lower for word in rule["keywords"]):
+                    return rule["response"]
+            return None
+
+        start_time = time.perf_counter()
+        expected = [linear_route(prompt) for prompt in prompts]
+        linear_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        actual = [rule.response if rule else None for rule in map(router.match, prompts)]
+        compiled_time = time.perf_counter() - start_time
+        logger.info(
+            f"compile: {compile_time * 1000:.0f} ms, linear: {linear_time * 1000:.0f} ms, "
+            f"compiled: {compiled_time * 1000:.1f} ms"
+        )
+
+        # 驗證
+        assert actual == expected
+        assert compiled_time * 10 < linear_time, "編譯後的路由應比逐條比對快一個數量級"
+
+
+@pytest.mark.performance
+class TestAdmissionControl:
+    """准入控制效能測試 - TC-PERF-0014"""
+
+    def test_TC_PERF_0014_aimd_sustains_throughput_under_throttling(self):
+        """TC-PERF-0014: 服務端節流時，AIMD 准入控制的吞吐量接近最佳固定上限且 429 遠少於無節制重送"""
+        pytest.importorskip("httpx")
+        from ai_models.backends import HttpxBackend
+        from ai_models.rate_limiter import AdmissionController, AIMDLimiter, RateLimitedBackend
+        from ai_models.stub_server import StubLLMServer
+
+        messages = [{"role": "user", "content": "查詢帳戶餘額"}]
+        num_requests = 400
+        capacity = 8
+
+        with StubLLMServer(latency=0.02, max_concurrency=capacity) as server:
+            raw_backend = HttpxBackend(server.base_url)
+
+            def unregulated(_):
+                # 沒有用戶端節流，遇到 429 立刻重送
+                while True:
+                    try:
+                        return raw_backend.complete(messages, "gpt-3.5-turbo", 0.7)
+                    except Exception:
+                        pass
+
+            def measure(call):
+                server.reset_stats()
+                start_time = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=32) as executor:
+                    list(executor.map(call, range(num_requests)))
+                return num_requests / (time.perf_counter() - start_time), server.throttled_count
+
+            def limited(backend):
+                return lambda _: backend.complete(messages, "gpt-3.5-turbo", 0.7)
+
+            fixed = RateLimitedBackend(
+                raw_backend,
+                AdmissionController(limiter=AIMDLimiter(initial_limit=capacity, max_limit=capacity)),
+                max_retries=100,
+            )
+            aimd = RateLimitedBackend(raw_backend, AdmissionController(), max_retries=100)
+
+            unregulated_rps, unregulated_throttled = measure(unregulated)
+            fixed_rps, _ = measure(limited(fixed))
+            measure(limited(aimd))  # 暖機：讓上限收斂到服務端容量附近
+            aimd_rps, aimd_throttled = measure(limited(aimd))
+            raw_backend.close()
+
+        logger.info(
+            f"unregulated: {unregulated_rps:.0f} rps ({unregulated_throttled} x 429), "
+            f"fixed: {fixed_rps:.0f} rps, aimd: {aimd_rps:.0f} rps ({aimd_throttled} x 429), "
+            f"limit: {aimd.get_stats()['concurrency_limit']:.1f}"
+        )
+
+        # 驗證
+        assert aimd_rps >= fixed_rps * 0.8, "AIMD 吞吐量應接近最佳固定上限"
+        assert aimd_rps >= unregulated_rps * 0.9, "AIMD 不應以犧牲吞吐量換取較少的 429"
+        assert aimd_throttled * 2 < unregulated_throttled, "AIMD 應大幅減少服務端過載"
+
+
+@pytest.mark.performance
+class TestHedgedRequests:
+    """對沖請求效能測試 - TC-PERF-0015"""
+
+    def test_TC_PERF_0015_hedging_cuts_tail_latency(self):
+        """TC-PERF-0015: 少數上游呼叫特別慢時，對沖請求降低 p99 延遲"""
+        import random
+        import threading
+        from ai_models.backends import MockBackend
+        from ai_models.chat_model import ChatModel
+        from ai_models.hedging import HedgedBackend, HedgingPolicy
+
+        class SlowTailBackend(MockBackend):
+            """95% 的呼叫約 5ms，5% 的呼叫約 150ms"""
+
+            def __init__(self, seed):
+                super().__init__(latency=0.0)
+                self.rng = random.Random(seed)
+                self.lock = threading.Lock()
+
+            def complete(self, messages, model_name, temperature, context=None):
+                with self.lock:
+                    slow = self.rng.random() < 0.05
+                time.sleep(0.15 if slow else 0.005)
+                return self.generate(messages[-1]["content"])
+
+        def p99_latency(model, num_requests=300):
+            latencies = []
+            for i in range(num_requests):
+                start_time = time.perf_counter()
+                model.reply(f"問題 {i}", use_cache=False)
+                latencies.append(time.perf_counter() - start_time)
+            latencies.sort()
+            return latencies[int(num_requests * 0.99)]
+
+        baseline = p99_latency(ChatModel(backend=SlowTailBackend(seed=7), history_token_budget=200))
+        hedged_backend = HedgedBackend(SlowTailBackend(seed=7), HedgingPolicy(percentile=90, min_samples=20))
+        hedged = p99_latency(ChatModel(backend=hedged_backend, history_token_budget=200))
+        stats = hedged_backend.get_stats()
+        hedged_backend.close()
+        logger.info(f"p99 baseline: {baseline * 1000:.1f} ms, hedged: {hedged * 1000:.1f} ms, stats: {stats}")
+
+        # 驗證
+        assert hedged < baseline / 2, "對沖後 p99 延遲應明顯下降"
+        assert stats["hedge_rate"] < 0.3, "只有少數請求需要對沖"
+        assert stats["hedge_wins"] > 0
+
+
+
+@pytest.mark.performance
+class TestUsageMetering:
+    """用量計量效能測試 - TC-PERF-0016"""
+
+    def test_TC_PERF_0016_metering_overhead_under_concurrency(self):
+        """TC-PERF-0016: 多執行緒同時記錄用量時，每次記錄的成本遠低於一次模型呼叫且合併結果正確"""
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+        from ai_models.backends import MockBackend
+        from ai_models.chat_model import ChatModel
+        from ai_models.usage_meter import UsageMeter
+
+        num_threads, records_per_thread = 8, 50000
+        meter = UsageMeter()
+        meter.set_scope("perf_usage", ["performance"])
+
+        # 對照組：所有執行緒共用一把鎖的計數器
+        lock = threading.Lock()
+        shared_totals = [0, 0, 0, 0.0]
+
+        def locked_record(prompt_tokens, completion_tokens, latency):
+            with lock:
+                shared_totals[0] += 1
+                shared_totals[1] += prompt_tokens
+                shared_totals[2] += completion_tokens
+                shared_totals[3] += latency
+
+        def run(record):
+            def worker(_):
+                for _ in range(records_per_thread):
+                    record(120, 40, 0.01)
+
+            start_time = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=num_threads) as executor:
+                list(executor.map(worker, range(num_threads)))
+            return (time.perf_counter() - start_time) / (num_threads * records_per_thread)
+
+        metered = run(lambda p, c, latency: meter.record("gpt-4", p, c, latency))
+        locked = run(locked_record)
+
+        # 同一個模型呼叫的成本（Mock 後端無延遲，只有組訊息與產生回應）
+        model = ChatModel(backend=MockBackend(latency=0.0), usage_meter=meter, history_token_budget=200)
+        start_time = time.perf_counter()
+        for i in range(2000):
+            model.reply(f"問題 {i}")
+        reply_cost = (time.perf_counter() - start_time) / 2000
+
+        usage = meter.breakdown(by="test")["perf_usage"]
+        logger.info(
+            f"per-record: per-thread {metered * 1e6:.2f} us, shared lock {locked * 1e6:.2f} us, "
+            f"reply: {reply_cost * 1e6:.1f} us"
+        )
+
+        # 驗證
+        assert usage["calls"] == num_threads * records_per_thread + 2000
+        assert meter.breakdown(by="model")["gpt-4"]["prompt_tokens"] == 120 * num_threads * records_per_thread
+        assert metered < reply_cost / 5, "計量成本應遠低於一次模型呼叫"
+
+
+@pytest.mark.performance
+class TestRealisticLatencyModel:
+    """擬真延遲與故障模型負載測試 - TC-PERF-0017"""
+
+    def test_TC_PERF_0017_latency_distribution_with_retries(self):
+        """TC-PERF-0017: 對數常態延遲加慢尾端與 503 / 逾時故障下，量測含重送的延遲分佈（虛擬時鐘）"""
+        from ai_models.backends import MockBackend
+        from ai_models.chat_model import ChatModel
+        from ai_models.clock import VirtualClock
+        from ai_models.latency_model import FailureModel, LogNormalLatency, MixtureLatency, TokenLatency
+        from ai_models.rate_limiter import AdmissionController, AIMDLimiter, RateLimitedBackend
+
+        num_requests = 5000
+        clock = VirtualClock()
+        latency = MixtureLatency.slow_tail(
+            base=TokenLatency(base=0.0, per_token=0.002, jitter=LogNormalLatency(median=0.3, sigma=0.4)),
+            tail=LogNormalLatency(median=3.0, sigma=0.3),
+            tail_probability=0.02,
+        )
+        failure_model = FailureModel(
+            timeout_rate=0.01, server_error_rate=0.05, server_error_codes=(503,), timeout_after=10.0
+        )
+        mock = MockBackend(latency=latency, clock=clock, failure_model=failure_model, seed=2024)
+        backend = RateLimitedBackend(mock, AdmissionController(limiter=AIMDLimiter()), max_retries=5)
+        model = ChatModel(backend=backend, clock=clock, history_token_budget=300)
+
+        wall_start = time.perf_counter()
+        latencies = []
+        for i in range(num_requests):
+            start = clock.now()
+            model.reply(f"負載測試問題 {i}", use_cache=False)
+            latencies.append(clock.now() - start)
+        wall_time = time.perf_counter() - wall_start
+
+        latencies.sort()
+        p50, p95, p99 = (latencies[int(num_requests * q)] for q in (0.5, 0.95, 0.99))
+        stats = mock.get_stats()
+        logger.info(
+            f"simulated {clock.now():.0f}s in {wall_time:.2f}s wall; "
+            f"p50 {p50 * 1000:.0f} ms, p95 {p95 * 1000:.0f} ms, p99 {p99 * 1000:.0f} ms; stats: {stats}"
+        )
+
+        # 驗證
+        assert stats["calls"] == num_requests + stats["timeout"] + stats["server_error"]
+        assert p95 > p50 * 1.5, "延遲應有分佈而非定值"
+        assert p99 > 5.0, "逾時與慢尾端應反映在 p99"
+        assert wall_time < clock.now() / 100, "虛擬時鐘下不應實際等待"
+
+
+@pytest.mark.performance
+class TestModelFanOut:
+    """多模型並行比較效能測試 - TC-PERF-0018"""
+
+    def test_TC_PERF_0018_fan_out_wall_time_tracks_slowest_model(self):
+        """TC-PERF-0018: 多模型並行比較的總耗時接近最慢的模型，而非所有模型相加"""
+        from ai_models.backends import MockBackend
+        from ai_models.fan_out import ModelFanOut
+
+        prompts = [f"比較問題 {i}" for i in range(5)]
+        fan_out = ModelFanOut.from_configs({
+            "fast": {"backend": MockBackend(latency=0.02)},
+            "medium": {"backend": MockBackend(latency=0.05)},
+            "slow": {"backend": MockBackend(latency=0.1), "temperature": 0.2},
+        }, max_workers=16)
+
+        # 對照組：逐一呼叫
+        start_time = time.perf_counter()
+        for model in fan_out.models.values():
+            for prompt in prompts:
+                model.reply(prompt, use_cache=False)
+        sequential_time = time.perf_counter() - start_time
+
+        result = fan_out.compare(prompts)
+        slowest_model = max(result["model_time"].values())
+        logger.info(
+            f"sequential {sequential_time:.3f}s, fan-out {result['wall_time']:.3f}s, "
+            f"slowest model {slowest_model:.3f}s"
+        )
+
+        # 驗證
+        assert len(result["comparisons"]) == len(prompts) * 2
+        assert result["wall_time"] < slowest_model, "總耗時應不超過最慢模型的累計呼叫時間"
+        assert result["wall_time"] < sequential_time / 3
+
+
+@pytest.mark.performance
+class TestDiskBackedSessions:
+    """對話冷資料層負載測試 - TC-PERF-0019"""
+
+    @staticmethod
+    def _rss_bytes():
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+    @pytest.mark.skipif(not os.path.exists("/proc/self/statm"), reason="需要 /proc 量測 RSS")
+    @pytest.mark.parametrize("num_sessions", [
+        10_000,
+        pytest.param(100_000, marks=pytest.mark.slow),
+        pytest.param(1_000_000, marks=pytest.mark.slow),
+    ])
+    def test_TC_PERF_0019_disk_backed_session_scaling(self, num_sessions, tmp_path, request):
+        """TC-PERF-0019: 大量對話時熱對話留在記憶體、其餘寫入 SQLite，RSS 不隨對話數線性成長"""
+        import random
+        from ai_models.backends import MockBackend
+        from ai_models.chat_model import ChatModel
+        from ai_models.session_store import SQLiteSessionStore
+        from ai_models.usage_meter import UsageMeter
+
+        if num_sessions > 10_000 and "slow" not in (request.config.getoption("-m") or ""):
+            pytest.skip("大規模基準測試請以 -m slow 執行")
+
+        hot_sessions = 1000
+        store = SQLiteSessionStore(str(tmp_path / "sessions.db"))
+        model = ChatModel(
+            backend=MockBackend(latency=0.0), max_sessions=hot_sessions, session_store=store,
+            history_token_budget=200, usage_meter=UsageMeter()
+        )
+        rss_before = self._rss_bytes()
+
+        start_time = time.perf_counter()
+        for user in range(num_sessions):
+            model.reply(f"使用者 {user} 查詢帳戶餘額", session_id=user, use_cache=False)
+        fill_time = time.perf_counter() - start_time
+
+        # 隨機使用者回來繼續對話（多數需要從磁碟載回）
+        rng = random.Random(1)
+        latencies = []
+        for _ in range(2000):
+            start_time = time.perf_counter()
+            model.reply("今天天氣如何", session_id=rng.randrange(num_sessions))
+            latencies.append(time.perf_counter() - start_time)
+        latencies.sort()
+        rss_growth = self._rss_bytes() - rss_before
+        stats = model.sessions.get_stats()
+        store.close()
+
+        logger.info(
+            f"{num_sessions} sessions: fill {fill_time / num_sessions * 1e6:.0f} us/turn, "
+            f"p50 {latencies[1000] * 1e6:.0f} us, p99 {latencies[1980] * 1e6:.0f} us, "
+            f"RSS +{rss_growth / 1e6:.1f} MB, stats: {stats}"
+        )
+
+        # 驗證 - 記憶體中只保留熱對話，其餘都在冷資料層（RSS 與 p99 受同一程序的其他測試影響，只列入報告）；
+        # 中位數延遲在負載下仍穩定，以寬鬆的上限確認載回不需逐筆掃描
+        assert stats["active_sessions"] == hot_sessions
+        assert stats["stored_sessions"] == num_sessions - hot_sessions
+        assert stats["restored"] > 1000
+        assert latencies[1000] < 0.01
+
+
+@pytest.mark.performance
+class TestScriptedConversations:
+    """腳本化對話並行執行效能測試 - TC-PERF-0020"""
+
+    def test_TC_PERF_0020_pipelined_conversations_saturate_backend(self):
+        """TC-PERF-0020: 多個腳本對話共用執行緒池交錯執行，總耗時遠低於逐一執行"""
+        import threading
+        from ai_models.backends import MockBackend
+        from ai_models.chat_model import ChatModel
+        from ai_models.conversation_runner import ConversationRunner, ConversationScript
+
+        class ConcurrencyTrackingBackend(MockBackend):
+            """記錄同時進行的後端呼叫數峰值"""
+            def __init__(self):
+                super().__init__(latency=0.02)
+                self.lock = threading.Lock()
+                self.in_flight = 0
+                self.peak = 0
+
+            def complete(self, messages, model_name, temperature, context=None):
+                with self.lock:
+                    self.in_flight += 1
+                    self.peak = max(self.peak, self.in_flight)
+                try:
+                    return super().complete(messages, model_name, temperature, context)
+                finally:
+                    with self.lock:
+                        self.in_flight -= 1
+
+        num_conversations, num_turns = 16, 5
+        scripts = [
+            ConversationScript(f"user-{c}", [f"使用者 {c} 第 {t} 輪問題" for t in range(num_turns)])
+            for c in range(num_conversations)
+        ]
+
+        sequential_model = ChatModel(backend=MockBackend(latency=0.02))
+        start_time = time.perf_counter()
+        for script in scripts:
+            for turn in script.turns:
+                sequential_model.reply(turn["user"], session_id=script.name)
+        sequential_time = time.perf_counter() - start_time
+
+        backend = ConcurrencyTrackingBackend()
+        result = ConversationRunner(ChatModel(backend=backend), max_workers=8).run(scripts)
+        logger.info(
+            f"sequential {sequential_time:.2f}s, pipelined {result['wall_time']:.2f}s; "
+            f"turn p50 {result['turn_latency']['p50'] * 1000:.1f} ms, "
+            f"conversation p50 {result['conversation_latency']['p50'] * 1000:.1f} ms"
+        )
+
+        # 驗證 - 8 個工作執行緒同時呼叫後端（單獨執行約加速 8 倍，負載下只要求明顯快於逐一執行），單輪延遲不受影響
+        assert result["turn_latency"]["count"] == num_conversations * num_turns
+        assert backend.peak == 8
+        assert result["wall_time"] < sequential_time / 2
+        assert result["turn_latency"]["p50"] < 0.05
+
+
+@pytest.mark.performance
+class TestBatchEvaluation:
+    """批次評估效能測試 - TC-PERF-0021"""
+
+    @staticmethod
+    def _dataset(size):
+        """產生 (回應, 關鍵詞, 上下文) 的產生器，不先把整批資料載入記憶體"""
+        import random
+
+        rng = random.Random(1)
+        topics = [
+            ("查詢帳戶餘額", ["帳戶", "餘額"]),
+            ("如何重設密碼", ["密碼", "重設"]),
+            ("信用卡年費是多少", ["信用卡", "年費"]),
+            ("How do I reset my password", ["reset", "password"]),
+        ]
+        fillers = ["請登入網路銀行", "您可以在設定頁面操作", "如有疑問請洽客服", "Please sign in first", "不知道"]
+        for _ in range(size):
+            question, keywords = rng.choice(topics)
+            response = f"關於{question}，" + "，".join(rng.sample(fillers, 2)) + rng.choice(["。", "", "..."])
+            yield response, keywords, question
+
+    @pytest.mark.parametrize("num_responses", [
+        10_000,
+        pytest.param(100_000, marks=pytest.mark.slow),
+        pytest.param(1_000_000, marks=pytest.mark.slow),
+    ])
+    def test_TC_PERF_0021_batch_evaluation_throughput(self, num_responses, request):
+        """TC-PERF-0021: 批次評估不逐筆記錄日誌並以程序池分塊處理，吞吐量高於逐筆呼叫 evaluate_response"""
+        from ai_models.response_evaluator import ResponseEvaluator
+
+        if num_responses > 10_000 and "slow" not in (request.config.getoption("-m") or ""):
+            pytest.skip("大規模基準測試請以 -m slow 執行")
+
+        evaluator = ResponseEvaluator()
+
+        # 對照組：逐筆評估（抽樣 2000 筆估算單筆成本）
+        sample = list(self._dataset(2000))
+        start_time = time.perf_counter()
+        expected = [evaluator.evaluate_response(*item) for item in sample]
+        per_item_time = (time.perf_counter() - start_time) / len(sample)
+
+        result = evaluator.evaluate_batch(
+            (response for response, _, _ in self._dataset(num_responses)),
+            (keywords for _, keywords, _ in self._dataset(num_responses)),
+            (context for _, _, context in self._dataset(num_responses)),
+            chunk_size=2000,
+        )
+        batch_time = result.elapsed / num_responses
+        logger.info(
+            f"{num_responses} responses: per-item {per_item_time * 1e6:.1f} us, "
+            f"batch {batch_time * 1e6:.1f} us ({os.cpu_count()} CPUs), "
+            f"total {result.elapsed:.2f}s, summary: {result.summary()}"
+        )
+
+        # 驗證 - 前 2000 筆與逐筆評估完全相同；單筆成本的比較受機器負載影響，只列入報告
+        assert len(result) == num_responses
+        assert all(result[i]["scores"] == expected[i]["scores"] for i in range(len(sample)))
+        assert all(result[i]["passed"] == expected[i]["passed"] for i in range(len(sample)))
+
+
+@pytest.mark.performance
+class TestSimilarityBackends:
+    """相似度後端效能測試 - TC-PERF-0022"""
+
+    SENTENCES = [
+        "您可以登入網路銀行查詢帳戶餘額", "如需重設密碼請至設定頁面", "信用卡年費依卡別而定",
+        "Please contact customer service for details", "交易明細可下載為 PDF", "每日轉帳上限為五十萬元",
+    ]
+
+    def _text(self, rng, length):
+        text = ""
+        while len(text) < length:
+            text += rng.choice(self.SENTENCES) + "。"
+        return text[:length]
+
+    def test_TC_PERF_0022_similarity_scores_and_runtime_by_length(self):
+        """TC-PERF-0022: 比較各相似度後端在不同回應長度下的分數與耗時，線性後端在長回應上遠快於 SequenceMatcher"""
+        import random
+        from ai_models.similarity import SIMILARITY_BACKENDS, get_similarity
+
+        rng = random.Random(1)
+        lengths = [100, 1000, 5000]
+        pairs = {length: (self._text(rng, length), self._text(rng, length)) for length in lengths}
+        timings = {name: {} for name in SIMILARITY_BACKENDS}
+        scores = {name: {} for name in SIMILARITY_BACKENDS}
+
+        for name in SIMILARITY_BACKENDS:
+            similarity = get_similarity(name)
+            for length, (a, b) in pairs.items():
+                repeats = 3 if name == "sequence" and length >= 5000 else 20
+                start_time = time.perf_counter()
+                for _ in range(repeats):
+                    scores[name][length] = similarity.score(a, b)
+                timings[name][length] = (time.perf_counter() - start_time) / repeats
+
+        for name in SIMILARITY_BACKENDS:
+            logger.info(f"{name:>8}: " + ", ".join(
+                f"{length} chars {timings[name][length] * 1e3:.2f} ms (score {scores[name][length]:.2f})"
+                for length in lengths
+            ))
+
+        # 驗證 - 線性後端：長度增為 5 倍，耗時增幅遠小於平方成長的 25 倍
+        for name in ("shingle", "minhash", "cosine"):
+            assert timings[name][5000] < timings["sequence"][5000] / 10
+            assert timings[name][5000] < timings[name][1000] * 15
+        assert abs(scores["minhash"][1000] - scores["shingle"][1000]) < 0.1
+
+
+@pytest.mark.performance
+class TestKeywordMatching:
+    """關鍵詞比對效能測試 - TC-PERF-0023"""
+
+    @pytest.mark.parametrize("num_keywords", [10, 100, 1000])
+    def test_TC_PERF_0023_compiled_keyword_set_vs_loop(self, num_keywords):
+        """TC-PERF-0023: 預先編譯的 KeywordSet 與逐一子字串搜尋比較，關鍵詞越多差距越大"""
+        import random
+        from ai_models.response_evaluator import KeywordSet, ResponseEvaluator
+
+        rng = random.Random(num_keywords)
+        alphabet = "帳戶餘額查詢信用卡密碼重設轉帳上限客服專線網路銀行登入交易明細下載利率年費"
+        keywords = ["".join(rng.choices(alphabet, k=rng.randint(2, 4))) for _ in range(num_keywords)]
+        responses = ["".join(rng.choices(alphabet + "，。 abc", k=400)) + "。" for _ in range(300)]
+        evaluator = ResponseEvaluator()
+
+        expected = [evaluator.evaluate_keywords(response, keywords) for response in responses]
+        loop_time = _median_time(
+            lambda: [evaluator.evaluate_keywords(response, keywords) for response in responses]
+        ) / len(responses)
+
+        start_time = time.perf_counter()
+        compiled = KeywordSet(keywords)
+        build_time = time.perf_counter() - start_time
+        actual = [evaluator.evaluate_keywords(response, compiled) for response in responses]
+        compiled_time = _median_time(
+            lambda: [evaluator.evaluate_keywords(response, compiled) for response in responses]
+        ) / len(responses)
+
+        logger.info(
+            f"{num_keywords} keywords: loop {loop_time * 1e6:.0f} us/response, "
+            f"compiled {compiled_time * 1e6:.0f} us/response (build {build_time * 1e3:.1f} ms)"
+        )
+
+        # 驗證 - 分數相同；以多次量測的中位數比較，關鍵詞少時不明顯變慢，上千個時較快（單獨執行約快 3 倍）
+        assert actual == expected
+        if num_keywords >= 1000:
+            assert compiled_time < loop_time
+        else:
+            assert compiled_time < loop_time * 2
+
+
+@pytest.mark.performance
+class TestPreparedContext:
+    """上下文預處理快取效能測試 - TC-PERF-0024"""
+
+    @pytest.mark.parametrize("similarity", ["shingle", "minhash"])
+    def test_TC_PERF_0024_many_responses_one_context(self, similarity):
+        """TC-PERF-0024: 大量回應與同一個長上下文比較時，上下文只處理一次"""
+        import random
+        from ai_models.response_evaluator import ResponseEvaluator
+
+        rng = random.Random(1)
+        sentences = [
+            "您可以登入網路銀行查詢帳戶餘額", "如需重設密碼請至設定頁面", "信用卡年費依卡別而定",
+            "Please contact customer service for details", "交易明細可下載為 PDF", "每日轉帳上限為五十萬元",
+        ]
+        context = "。".join(rng.choice(sentences) for _ in range(120))  # 約 2000 字的文件
+        responses = ["。".join(rng.sample(sentences, 3)) + "。" for _ in range(2000)]
+
+        timings = {}
+        scores = {}
+        for label, cache_size in (("uncached", 0), ("cached", 1024)):
+            evaluator = ResponseEvaluator(similarity=similarity, context_cache_size=cache_size)
+            start_time = time.perf_counter()
+            scores[label] = [evaluator.evaluate_relevance(response, context) for response in responses]
+            timings[label] = time.perf_counter() - start_time
+
+        logger.info(
+            f"{similarity}: {len(responses)} responses x {len(context)}-char context, "
+            f"uncached {timings['uncached'] * 1e3:.0f} ms, cached {timings['cached'] * 1e3:.0f} ms"
+        )
+
+        # 驗證
+        assert scores["cached"] == scores["uncached"]
+        assert timings["cached"] < timings["uncached"] / 3
+
+
+@pytest.mark.performance
+class TestVectorizedScoring:
+    """向量化資料集計分效能測試 - TC-PERF-0025"""
+
+    def test_TC_PERF_0025_vectorized_scoring_throughput(self):
+        """TC-PERF-0025: 以 numpy 對百萬列特徵計分，每秒可處理數百萬列"""
+        np = pytest.importorskip("numpy")
+        from ai_models.response_evaluator import INCOMPLETE_INDICATORS, ResponseEvaluator
+
+        rng = np.random.default_rng(1)
+        rows, max_keywords = 1_000_000, 8
+        keyword_counts = rng.integers(0, max_keywords + 1, rows)
+        keyword_hits = (rng.random((rows, max_keywords)) < 0.6) & (np.arange(max_keywords) < keyword_counts[:, None])
+        relevance = rng.random(rows)
+        relevance[rng.random(rows) < 0.3] = np.nan
+        features = {
+            "lengths": rng.integers(0, 1500, rows),
+            "indicator_hits": rng.random((rows, len(INCOMPLETE_INDICATORS))) < 0.05,
+            "ends_with_punctuation": rng.random(rows) < 0.8,
+            "keyword_hits": keyword_hits,
+            "keyword_counts": keyword_counts,
+            "relevance": relevance,
+        }
+        evaluator = ResponseEvaluator()
+
+        # 對照組：逐筆 Python 計分（批次評估，不含日誌）
+        responses = [f"您的帳戶餘額為 {i} 元。" for i in range(20_000)]
+        baseline = evaluator.evaluate_batch(responses, ["帳戶", "餘額"], processes=0)
+        baseline_rate = len(responses) / baseline.elapsed
+
+        start_time = time.perf_counter()
+        result = evaluator.score_features(**features)
+        elapsed = time.perf_counter() - start_time
+        logger.info(
+            f"vectorized: {rows} rows in {elapsed * 1e3:.0f} ms ({rows / elapsed / 1e6:.1f}M rows/s), "
+            f"per-item batch: {baseline_rate / 1e3:.0f}k rows/s, pass rate {result.summary()['pass_rate']:.1%}"
+        )
+
+        # 驗證
+        assert len(result) == rows
+        assert rows / elapsed > 1_000_000
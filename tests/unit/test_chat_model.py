@@ -2,6 +2,7 @@
 
 import pytest
 import time
+import asyncio
 
 
 @pytest.mark.unit
@@ -259,9 +260,9 @@ class TestChatModelPerformance:
         prompt = "這是一個測試問題"
         
         # Act
-        start_time = time.time()
+        start_time = chat_model.clock.now()
         response = chat_model.reply(prompt)
-        end_time = time.time()
+        end_time = chat_model.clock.now()
         response_time = end_time - start_time
         
         # Assert
@@ -284,3 +285,1690 @@ class TestChatModelTemperature:
         
         # Assert
         assert response is not None
+
+
+@pytest.mark.unit
+class TestChatModelAsync:
+    """聊天模型非同步介面測試"""
+    
+    def test_TC_UNIT_0031_areply_matches_reply(self, chat_model, run_async):
+        """TC-UNIT-0031: 驗證 areply 與 reply 回應一致且記錄歷史"""
+        # Act
+        async_response = run_async(chat_model.areply("你好"))
+        sync_response = chat_model.reply("你好")
+        
+        # Assert
+        assert async_response == sync_response
+        assert len(chat_model.get_conversation_history()) == 4
+    
+    def test_TC_UNIT_0032_areply_empty_input(self, chat_model, run_async):
+        """TC-UNIT-0032: 驗證 areply 的空輸入處理"""
+        # Act
+        response = run_async(chat_model.areply("   "))
+        
+        # Assert
+        assert response == "請輸入有效的內容"
+        assert len(chat_model.get_conversation_history()) == 0
+    
+    def test_TC_UNIT_0033_achat_interface(self, chat_model, run_async):
+        """TC-UNIT-0033: 驗證非同步多輪對話介面"""
+        # Arrange
+        messages = [{"role": "user", "content": "查詢帳戶餘額"}]
+        
+        # Act
+        response = run_async(chat_model.achat(messages))
+        empty_response = run_async(chat_model.achat([]))
+        
+        # Assert
+        assert "餘額" in response
+        assert empty_response == "沒有接收到任何訊息"
+    
+    def test_TC_UNIT_0034_async_context_manager(self, run_async):
+        """TC-UNIT-0034: 驗證非同步 context manager 與並發對話的歷史配對"""
+        from ai_models.chat_model import ChatModel
+        
+        async def scenario():
+            async with ChatModel() as model:
+                await asyncio.gather(*(model.areply(f"問題 {i}") for i in range(20)))
+                history = model.get_conversation_history()
+            return history, model.get_conversation_history()
+        
+        # Act
+        history, history_after_exit = run_async(scenario())
+        
+        # Assert - 每輪 user/assistant 必須相鄰，離開 context 後歷史被清空
+        assert len(history) == 40
+        for i in range(0, len(history), 2):
+            assert history[i]["role"] == "user"
+            assert history[i + 1]["role"] == "assistant"
+            assert history[i]["content"] in history[i + 1]["content"]
+        assert history_after_exit == []
+
+
+@pytest.mark.unit
+class TestChatModelBatching:
+    """聊天模型批次處理測試"""
+    
+    def test_TC_UNIT_0035_reply_batch(self, chat_model):
+        """TC-UNIT-0035: 驗證批次回應保持輸入順序並記錄歷史"""
+        # Arrange
+        prompts = ["你好", "", "查詢帳戶餘額", "今天天氣如何"]
+        
+        # Act
+        responses = chat_model.reply_batch(prompts)
+        
+        # Assert
+        assert len(responses) == 4
+        assert "你好" in responses[0]
+        assert responses[1] == "請輸入有效的內容"
+        assert "餘額" in responses[2]
+        assert "天氣" in responses[3]
+        assert len(chat_model.get_conversation_history()) == 6  # 空輸入不記錄
+    
+    def test_TC_UNIT_0036_coalescer_groups_concurrent_requests(self):
+        """TC-UNIT-0036: 驗證請求合併器將並發請求合併為批次"""
+        from concurrent.futures import ThreadPoolExecutor
+        from ai_models.backends import MockBackend
+        from ai_models.batching import RequestCoalescer
+        from ai_models.chat_model import ChatModel
+        
+        # Arrange
+        coalescer = RequestCoalescer(MockBackend(), max_batch_size=8, max_wait=0.05)
+        
+        # Act
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            responses = list(executor.map(
+                lambda i: ChatModel(backend=coalescer).reply(f"合併問題 {i}"), range(16)
+            ))
+        stats = coalescer.get_stats()
+        coalescer.close()
+        
+        # Assert
+        assert all(f"合併問題 {i}" in r for i, r in enumerate(responses))
+        assert stats["request_count"] == 16
+        assert stats["batch_count"] < 16
+        assert stats["max_batch_size"] <= 8
+        assert stats["batch_size"] > 1
+    
+    def test_TC_UNIT_0037_coalescer_flushes_on_deadline(self):
+        """TC-UNIT-0037: 驗證單筆請求在等待逾時後送出"""
+        from ai_models.backends import MockBackend
+        from ai_models.batching import RequestCoalescer
+        
+        # Arrange
+        coalescer = RequestCoalescer(MockBackend(latency=0.0), max_batch_size=100, max_wait=0.02)
+        
+        # Act
+        start = time.time()
+        response = coalescer.complete([{"role": "user", "content": "你好"}], "gpt-3.5-turbo", 0.7)
+        elapsed = time.time() - start
+        stats = coalescer.get_stats()
+        coalescer.close()
+        
+        # Assert
+        assert "你好" in response
+        assert elapsed < 1.0
+        assert stats["batch_count"] == 1
+        assert stats["queue_wait"] >= 0.015
+    
+    def test_TC_UNIT_0082_coalescer_skips_cancelled_requests(self, run_async):
+        """TC-UNIT-0082: 驗證批次中有請求在等待時被取消，其餘請求仍正常取得回應"""
+        from ai_models.backends import MockBackend
+        from ai_models.batching import RequestCoalescer
+        
+        # Arrange
+        coalescer = RequestCoalescer(MockBackend(latency=0.01), max_batch_size=100, max_wait=0.1)
+        messages = [[{"role": "user", "content": f"問題 {i}"}] for i in range(3)]
+        
+        # Act - 同步呼叫端：取消的 Future 不影響同批次的其他請求
+        futures = [coalescer.submit(m, "gpt-3.5-turbo", 0.7) for m in messages]
+        assert futures[1].cancel()
+        results = [futures[0].result(timeout=2), futures[2].result(timeout=2)]
+        
+        # 非同步呼叫端：其中一個請求在合併等待期間逾時
+        async def scenario():
+            short = asyncio.wait_for(coalescer.acomplete(messages[0], "gpt-3.5-turbo", 0.7), timeout=0.01)
+            long = asyncio.wait_for(coalescer.acomplete(messages[1], "gpt-3.5-turbo", 0.7), timeout=2)
+            return await asyncio.gather(short, long, return_exceptions=True)
+        
+        timed_out, answered = run_async(scenario())
+        coalescer.close()
+        
+        # Assert
+        assert "問題 0" in results[0] and "問題 2" in results[1]
+        assert isinstance(timed_out, asyncio.TimeoutError)
+        assert "問題 1" in answered
+    
+    def test_TC_UNIT_0093_coalescer_resolves_every_future(self):
+        """TC-UNIT-0093: 驗證後端回應數不足或批次被中斷時，所有 Future 都以例外結束，關閉後拒絕新請求"""
+        from ai_models.backends import MockBackend
+        from ai_models.batching import RequestCoalescer
+        
+        class ShortBatchBackend(MockBackend):
+            def complete_batch(self, batch_messages, model_name, temperature, contexts=None):
+                return super().complete_batch(batch_messages, model_name, temperature, contexts)[:-1]
+        
+        class InterruptedBackend(MockBackend):
+            def complete_batch(self, batch_messages, model_name, temperature, contexts=None):
+                raise KeyboardInterrupt
+        
+        messages = [[{"role": "user", "content": f"問題 {i}"}] for i in range(3)]
+        
+        # Act - 後端少回傳一筆
+        coalescer = RequestCoalescer(ShortBatchBackend(latency=0.0), max_batch_size=3, max_wait=1.0)
+        futures = [coalescer.submit(m, "gpt-3.5-turbo", 0.7) for m in messages]
+        answered = [f.result(timeout=2) for f in futures[:2]]
+        with pytest.raises(ValueError):
+            futures[2].result(timeout=2)
+        coalescer.close()
+        
+        # Assert - 關閉後不再重啟背景執行緒
+        assert "問題 0" in answered[0] and "問題 1" in answered[1]
+        with pytest.raises(RuntimeError):
+            coalescer.submit(messages[0], "gpt-3.5-turbo", 0.7)
+        
+        # Act - 非 Exception 的中斷
+        coalescer = RequestCoalescer(InterruptedBackend(latency=0.0), max_batch_size=3, max_wait=1.0)
+        futures = [coalescer.submit(m, "gpt-3.5-turbo", 0.7) for m in messages]
+        
+        # Assert
+        for future in futures:
+            with pytest.raises(KeyboardInterrupt):
+                future.result(timeout=2)
+        coalescer.close()
+    
+    def test_TC_UNIT_0094_coalescer_stats_exported_on_close(self):
+        """TC-UNIT-0094: 驗證 ChatModel 關閉時將請求合併統計寫入指標收集器"""
+        from ai_models.backends import MockBackend
+        from ai_models.batching import RequestCoalescer
+        from ai_models.chat_model import ChatModel
+        from monitoring.ai_metrics_collector import AIMetricsCollector
+        
+        class RecordingObservability:
+            def __init__(self):
+                self.metrics = {}
+            
+            def record_ai_metric(self, model_name, metric_name, value, labels=None):
+                self.metrics[metric_name] = value
+        
+        # Arrange
+        collector = AIMetricsCollector()
+        collector.observability = RecordingObservability()
+        model = ChatModel(
+            backend=RequestCoalescer(MockBackend(latency=0.0), max_wait=0.01),
+            metrics_collector=collector,
+        )
+        
+        # Act
+        model.reply("你好")
+        model.close()
+        
+        # Assert
+        assert collector.observability.metrics["performance.batch_size"] == 1.0
+        assert collector.observability.metrics["performance.queue_wait"] > 0
+
+
+@pytest.mark.unit
+class TestChatModelStreaming:
+    """聊天模型串流回應測試"""
+    
+    def test_TC_UNIT_0038_reply_stream_chunks(self, chat_model):
+        """TC-UNIT-0038: 驗證串流片段串接後與 reply 結果一致"""
+        # Act
+        stream = chat_model.reply_stream("你好")
+        chunks = list(stream)
+        expected = chat_model.reply("你好")
+        
+        # Assert
+        assert len(chunks) > 1
+        assert "".join(chunks) == expected == stream.text
+        assert stream.metrics.token_count == len(chunks)
+        assert len(chat_model.get_conversation_history()) == 4
+    
+    def test_TC_UNIT_0039_stream_latency_metrics(self):
+        """TC-UNIT-0039: 驗證串流記錄 TTFT、token 間延遲並寫入指標收集器"""
+        from ai_models.backends import MockBackend
+        from ai_models.chat_model import ChatModel
+        
+        class RecordingCollector:
+            def __init__(self):
+                self.calls = []
+            
+            def record_performance_metrics(self, model_name, metrics):
+                self.calls.append((model_name, metrics))
+        
+        # Arrange
+        collector = RecordingCollector()
+        model = ChatModel(backend=MockBackend(latency=0.02, token_rate=200), metrics_collector=collector)
+        
+        # Act
+        stream = model.reply_stream("今天天氣如何")
+        stream.read()
+        metrics = stream.metrics.to_dict()
+        
+        # Assert
+        assert metrics["ttft"] >= 0.02
+        assert metrics["inter_token_latency"] >= 0.004
+        assert metrics["tokens_per_second"] > 0
+        assert collector.calls == [("gpt-3.5-turbo", collector.calls[0][1])]
+        assert collector.calls[0][1]["token_count"] == stream.metrics.token_count
+    
+    def test_TC_UNIT_0040_areply_stream(self, chat_model, run_async):
+        """TC-UNIT-0040: 驗證非同步串流與空輸入處理"""
+        async def collect(prompt):
+            return [chunk async for chunk in chat_model.areply_stream(prompt)]
+        
+        # Act
+        chunks = run_async(collect("查詢帳戶餘額"))
+        empty_chunks = run_async(collect(""))
+        
+        # Assert
+        assert "餘額" in "".join(chunks)
+        assert empty_chunks == ["請輸入有效的內容"]
+        assert len(chat_model.get_conversation_history()) == 2
+
+
+@pytest.mark.unit
+class TestChatModelResponseCache:
+    """聊天模型回應快取測試"""
+    
+    def test_TC_UNIT_0041_cache_hit_skips_backend(self):
+        """TC-UNIT-0041: 驗證相同請求命中快取且不再呼叫後端"""
+        from ai_models.backends import MockBackend
+        from ai_models.chat_model import ChatModel
+        from ai_models.response_cache import ResponseCache
+        
+        class CountingBackend(MockBackend):
+            calls = 0
+            
+            def complete(self, *args, **kwargs):
+                CountingBackend.calls += 1
+                return super().complete(*args, **kwargs)
+        
+        # Arrange
+        cache = ResponseCache()
+        model = ChatModel(temperature=0.1, backend=CountingBackend(), cache=cache)
+        
+        # Act - 每次清空歷史，讓歷史雜湊相同；提示詞空白差異會被正規化
+        first = model.reply("查詢帳戶餘額")
+        model.clear_history()
+        second = model.reply("  查詢帳戶餘額 ")
+        model.clear_history()
+        bypassed = model.reply("查詢帳戶餘額", use_cache=False)
+        stats = cache.get_stats()
+        
+        # Assert
+        assert first == second == bypassed
+        assert CountingBackend.calls == 2
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_ratio"] == 0.5
+        assert stats["bytes_saved"] == len(first.encode("utf-8"))
+    
+    def test_TC_UNIT_0042_cache_key_covers_context_and_history(self):
+        """TC-UNIT-0042: 驗證快取鍵涵蓋模型參數、上下文與對話歷史"""
+        from ai_models.response_cache import ResponseCache
+        
+        base = ResponseCache.make_key("gpt-3.5-turbo", 0.1, "你好")
+        
+        # Assert
+        assert base == ResponseCache.make_key("gpt-3.5-turbo", 0.1, " 你好  ")
+        assert base != ResponseCache.make_key("gpt-4", 0.1, "你好")
+        assert base != ResponseCache.make_key("gpt-3.5-turbo", 0.7, "你好")
+        assert base != ResponseCache.make_key("gpt-3.5-turbo", 0.1, "你好", context={"user": "A"})
+        assert base != ResponseCache.make_key(
+            "gpt-3.5-turbo", 0.1, "你好", history=[{"role": "user", "content": "嗨"}]
+        )
+    
+    def test_TC_UNIT_0043_lru_ttl_and_disk_tier(self, tmp_path):
+        """TC-UNIT-0043: 驗證 LRU 淘汰、TTL 過期與磁碟層跨實例保留"""
+        from ai_models.response_cache import ResponseCache
+        
+        # Arrange
+        disk_path = tmp_path / "cache.sqlite"
+        cache = ResponseCache(max_entries=2, ttl=0.05, disk_path=disk_path)
+        
+        # Act
+        cache.set("a", "回應A")
+        cache.set("b", "回應B")
+        cache.set("c", "回應C")  # 淘汰 a（記憶體層）
+        assert len(cache._memory) == 2
+        assert cache.get("a") == "回應A"  # 由磁碟層補回
+        time.sleep(0.06)
+        assert cache.get("b") == "回應B"  # 記憶體層過期，仍可從磁碟層取得
+        cache.close()
+        
+        reopened = ResponseCache(disk_path=disk_path)
+        
+        # Assert
+        assert reopened.get("c") == "回應C"
+        assert reopened.get_stats()["disk_hits"] == 1
+        assert reopened.get("missing") is None
+        reopened.close()
+    
+    def test_TC_UNIT_0088_cache_stats_exported_on_close(self):
+        """TC-UNIT-0088: 驗證關閉模型時回應快取統計寫入 AIMetricsCollector"""
+        from ai_models.backends import MockBackend
+        from ai_models.chat_model import ChatModel
+        from ai_models.response_cache import ResponseCache
+        from monitoring.ai_metrics_collector import AIMetricsCollector
+        
+        class RecordingObservability:
+            def __init__(self):
+                self.metrics = {}
+            
+            def record_ai_metric(self, model_name, metric_name, value, labels=None):
+                self.metrics[metric_name] = (model_name, value, labels["metric_type"])
+        
+        # Arrange
+        collector = AIMetricsCollector()
+        collector.observability = RecordingObservability()
+        model = ChatModel(backend=MockBackend(latency=0.0), cache=ResponseCache(), metrics_collector=collector)
+        
+        # Act
+        for _ in range(4):
+            model.reply("查詢帳戶餘額", session_id="fresh")
+            model.end_session("fresh")
+        model.reply("你好")
+        model.close()
+        metrics = collector.observability.metrics
+        
+        # Assert - 4 次相同請求 1 次未命中 3 次命中，加上 1 次未命中
+        assert metrics["cache.hits"] == ("gpt-3.5-turbo", 3.0, "cache")
+        assert metrics["cache.misses"] == ("gpt-3.5-turbo", 2.0, "cache")
+        assert metrics["cache.hit_ratio"][1] == pytest.approx(0.6)
+        assert set(metrics) == {
+            "cache.hits", "cache.misses", "cache.hit_ratio", "cache.miss_ratio", "cache.bytes_saved"
+        }
+        
+        # 沒有設定快取時不寫入
+        collector.observability = RecordingObservability()
+        ChatModel(backend=MockBackend(latency=0.0), metrics_collector=collector).close()
+        assert collector.observability.metrics == {}
+
+
+@pytest.mark.unit
+class TestChatModelHistoryBudget:
+    """聊天模型對話歷史 token 預算測試"""
+    
+    def test_TC_UNIT_0044_history_token_budget_eviction(self):
+        """TC-UNIT-0044: 驗證超出 token 預算時淘汰最舊的對話並維持累計 token 數"""
+        from ai_models.chat_model import ChatModel
+        
+        # Arrange
+        model = ChatModel(history_token_budget=200)
+        
+        # Act
+        for i in range(50):
+            model.reply(f"第 {i} 輪的問題")
+        history = model.conversation_history
+        
+        # Assert
+        assert history.total_tokens <= 200
+        assert history.total_tokens == sum(model.estimate_tokens(m["content"]) for m in history)
+        assert history.evicted_count > 0
+        assert history[0]["role"] == "user"  # 不留下孤立的 assistant 訊息
+        assert history[-2]["content"] == "第 49 輪的問題"
+        assert model.get_model_info()["history_tokens"] == history.total_tokens
+    
+    def test_TC_UNIT_0045_history_view_is_read_only(self, chat_model):
+        """TC-UNIT-0045: 驗證對話歷史視圖為唯讀且反映最新狀態"""
+        # Arrange
+        view = chat_model.get_history_view()
+        
+        # Act
+        chat_model.reply("你好")
+        
+        # Assert - 視圖不複製資料，後續的對話直接可見
+        assert len(view) == 2
+        assert view[0]["content"] == "你好"
+        with pytest.raises(TypeError):
+            view[0]["content"] = "被竄改"
+        assert not hasattr(view, "append")
+
+
+@pytest.mark.unit
+class TestChatModelTokenizer:
+    """聊天模型分詞器與批次 token 估算測試"""
+    
+    def test_TC_UNIT_0046_regex_estimator_matches_original_formula(self, chat_model):
+        """TC-UNIT-0046: 驗證正則估算與逐字計算的結果完全一致"""
+        def per_char_estimate(text):
+            chinese_chars = sum(1 for char in text if '\u4e00' <= char <= '\u9fff')
+            return max(1, (chinese_chars // 2) + ((len(text) - chinese_chars) // 4))
+        
+        # Arrange
+        texts = ["", "Hello world", "你好世界", "Hello 你好 World 世界", "查詢帳戶餘額 balance 123！" * 50, "　\n\t混合"]
+        
+        # Act
+        single = [chat_model.estimate_tokens(text) for text in texts]
+        batch = chat_model.estimate_tokens_many(texts)
+        
+        # Assert
+        assert single == [per_char_estimate(text) for text in texts]
+        assert batch == single
+    
+    def test_TC_UNIT_0047_vocab_tokenizer_longest_match(self, tmp_path):
+        """TC-UNIT-0047: 驗證本地詞表分詞器以最長匹配切分"""
+        from ai_models.chat_model import ChatModel
+        from ai_models.tokenizer import VocabTokenizer
+        
+        # Arrange
+        vocab_path = tmp_path / "vocab.txt"
+        vocab_path.write_text("你好\n世界\nhello\nhe\n", encoding="utf-8")
+        tokenizer = VocabTokenizer(vocab_path)
+        model = ChatModel(tokenizer=tokenizer)
+        
+        # Act
+        tokens = tokenizer.tokenize("hello 你好世界!")
+        
+        # Assert - 詞表外的字元各計 1 個 token，空白不計
+        assert tokens == ["hello", "你好", "世界", "!"]
+        assert model.estimate_tokens("hello 你好世界!") == 4
+        assert model.estimate_tokens_many(["你好", "hehe"]) == [1, 2]
+    
+    def test_TC_UNIT_0048_cached_tokenizer_lru(self):
+        """TC-UNIT-0048: 驗證分詞快取以文本雜湊命中並依 LRU 淘汰"""
+        from ai_models.tokenizer import CachedTokenizer, HeuristicTokenizer
+        
+        # Arrange
+        tokenizer = CachedTokenizer(HeuristicTokenizer(), max_entries=2)
+        
+        # Act
+        tokenizer.count("第一段文字")
+        tokenizer.count("第二段文字")
+        tokenizer.count("第一段文字")  # 命中，成為最近使用
+        tokenizer.count("第三段文字")  # 淘汰「第二段文字」
+        tokenizer.count("第二段文字")
+        stats = tokenizer.get_stats()
+        
+        # Assert
+        assert stats["hits"] == 1
+        assert stats["misses"] == 4
+        assert stats["entries"] == 2
+        assert tokenizer.count_many(["第二段文字", "第三段文字"]) == [2, 2]
+
+
+@pytest.mark.unit
+class TestChatModelSessions:
+    """聊天模型多對話管理測試"""
+    
+    def test_TC_UNIT_0049_sessions_are_isolated(self, chat_model):
+        """TC-UNIT-0049: 驗證不同 session_id 的對話歷史互不影響"""
+        # Act
+        chat_model.reply("我是使用者 A", session_id="user-a")
+        chat_model.chat([{"role": "user", "content": "我是使用者 B"}], session_id="user-b")
+        chat_model.reply("預設對話")
+        
+        # Assert
+        assert [m["content"] for m in chat_model.get_conversation_history("user-a")][0] == "我是使用者 A"
+        assert [m["content"] for m in chat_model.get_conversation_history("user-b")][0] == "我是使用者 B"
+        assert len(chat_model.get_conversation_history()) == 2
+        assert chat_model.get_model_info()["active_sessions"] == 2
+        assert chat_model.end_session("user-a") is True
+        assert "user-a" not in chat_model.sessions
+    
+    def test_TC_UNIT_0050_session_lru_and_idle_eviction(self):
+        """TC-UNIT-0050: 驗證對話數超過上限或閒置逾時時被淘汰"""
+        from ai_models.chat_model import ChatModel
+        
+        # Arrange
+        model = ChatModel(max_sessions=3, session_idle_ttl=0.2)
+        
+        # Act - 超過上限時淘汰最久未使用的對話
+        for session_id in ["s1", "s2", "s3"]:
+            model.reply("你好", session_id=session_id)
+        model.reply("再次使用", session_id="s1")
+        model.reply("你好", session_id="s4")
+        
+        # Assert
+        assert "s2" not in model.sessions
+        assert all(s in model.sessions for s in ["s1", "s3", "s4"])
+        
+        # Act - 閒置逾時
+        time.sleep(0.25)
+        model.reply("你好", session_id="s5")
+        stats = model.sessions.get_stats()
+        
+        # Assert
+        assert len(model.sessions) == 1
+        assert stats["created"] == 5
+        assert stats["evicted"] == 4
+    
+    def test_TC_UNIT_0051_concurrent_sessions_on_shared_model(self, chat_model):
+        """TC-UNIT-0051: 驗證多執行緒共用同一模型時，每個對話的輪次完整且成對"""
+        from concurrent.futures import ThreadPoolExecutor
+        
+        # Arrange
+        def user_session(user_id):
+            for turn in range(5):
+                chat_model.reply(f"{user_id}-{turn}", session_id=user_id)
+                chat_model.reply(f"shared-{user_id}-{turn}")
+        
+        # Act
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(user_session, [f"user-{i}" for i in range(16)]))
+        
+        # Assert - 各對話只含自己的輪次且依序
+        for i in range(16):
+            history = chat_model.get_conversation_history(f"user-{i}")
+            assert [m["content"] for m in history[::2]] == [f"user-{i}-{turn}" for turn in range(5)]
+        # 預設對話被多個執行緒共用，user / assistant 仍成對寫入
+        shared = chat_model.get_conversation_history()
+        assert len(shared) == 160
+        assert all(m["role"] == "user" for m in shared[::2])
+        assert all(m["role"] == "assistant" for m in shared[1::2])
+
+
+@pytest.mark.unit
+class TestChatModelIntentRouting:
+    """聊天模型意圖路由測試"""
+    
+    def test_TC_UNIT_0052_automaton_finds_all_occurrences(self):
+        """TC-UNIT-0052: 驗證多模式自動機一次掃描找出所有（含重疊的）關鍵字位置"""
+        from ai_models.automaton import AhoCorasick
+        
+        # Arrange
+        automaton = AhoCorasick(["he", "she", "his", "hers", "帳戶", "帳戶餘額"])
+        
+        # Act
+        matches = automaton.find_all("ushers 查詢帳戶餘額")
+        
+        # Assert
+        assert matches == [(1, "she"), (2, "he"), (2, "hers"), (9, "帳戶"), (9, "帳戶餘額")]
+    
+    def test_TC_UNIT_0053_intent_priority_resolution(self):
+        """TC-UNIT-0053: 驗證多條規則同時命中時採用最高優先權，相同時採用先定義者"""
+        from ai_models.backends import MockBackend
+        from ai_models.chat_model import ChatModel
+        from ai_models.intent_router import IntentRouter
+        
+        # Arrange
+        router = IntentRouter([
+            {"name": "first", "keywords": ["訂單"], "response": "first", "priority": 1},
+            {"name": "second", "keywords": ["訂單", "退貨"], "response": "second", "priority": 1},
+            {"name": "urgent", "keywords": ["退貨"], "response": "急件：{prompt}", "priority": 5},
+        ], fallback_response="fallback")
+        model = ChatModel(backend=MockBackend(latency=0.0, router=router))
+        
+        # Act & Assert
+        assert model.reply("查詢訂單") == "first"
+        assert model.reply("訂單要退貨") == "急件：訂單要退貨"
+        assert [rule.name for rule in router.match_all("訂單要退貨")] == ["urgent", "first", "second"]
+        assert model.reply("其他問題") == "fallback"
+    
+    def test_TC_UNIT_0054_load_intents_from_yaml(self, project_root):
+        """TC-UNIT-0054: 驗證從 config/ YAML 載入的規則涵蓋內建規則的行為"""
+        from ai_models.backends import MockBackend
+        from ai_models.intent_router import IntentRouter
+        
+        # Arrange
+        default_backend = MockBackend(latency=0.0)
+        yaml_backend = MockBackend(
+            latency=0.0, router=IntentRouter.from_yaml(project_root / "config" / "intents" / "systalk_intents.yaml")
+        )
+        
+        # Act & Assert - 內建規則的回應不變
+        for prompt in ["你好", "Hello there", "我的帳戶餘額", "今天天氣如何", "隨便問問"]:
+            assert yaml_backend.generate(prompt) == default_backend.generate(prompt)
+        # 優先權高的真人客服規則勝過問候
+        assert "真人客服" in yaml_backend.generate("你好，請幫我轉接客服")
+
+
+@pytest.mark.unit
+class TestChatModelAdmissionControl:
+    """聊天模型流量控制測試"""
+    
+    def test_TC_UNIT_0055_token_bucket(self):
+        """TC-UNIT-0055: 驗證 token bucket 的爆量上限與預約等待時間"""
+        from ai_models.rate_limiter import TokenBucket
+        
+        # Arrange
+        bucket = TokenBucket(rate=100, capacity=5)
+        
+        # Act & Assert - 先用完爆量額度
+        assert all(bucket.try_acquire() for _ in range(5))
+        assert bucket.try_acquire() is False
+        # 預約 2 個額度約需等待 20ms
+        assert 0.015 < bucket.reserve(2) <= 0.02
+        with pytest.raises(ValueError):
+            TokenBucket(rate=0)
+    
+    def test_TC_UNIT_0056_aimd_limit_adjustment(self):
+        """TC-UNIT-0056: 驗證 AIMD 成功時緩增、過載時倍減，且同一波過載只調降一次"""
+        from ai_models.rate_limiter import AIMDLimiter
+        
+        # Arrange
+        limiter = AIMDLimiter(initial_limit=4, min_limit=2, backoff_ratio=0.5)
+        
+        # Act - 額滿時無法再取得名額
+        started = [limiter.try_acquire() for _ in range(4)]
+        assert limiter.try_acquire() is None
+        for started_at in started:
+            limiter.release(started_at)
+        grown = limiter.limit
+        
+        # Act - 同一波送出的請求全部過載
+        started = [limiter.try_acquire() for _ in range(4)]
+        for started_at in started:
+            limiter.release(started_at, overloaded=True)
+        
+        # Assert
+        assert grown > 4
+        assert limiter.limit == grown * 0.5
+        assert limiter.decrease_count == 1
+        assert limiter.in_flight == 0
+        for _ in range(10):
+            limiter.release(limiter.acquire(), overloaded=True)
+        assert limiter.limit == 2
+    
+    def test_TC_UNIT_0057_rate_limited_backend_retries_overload(self):
+        """TC-UNIT-0057: 驗證流量控制後端重送過載請求，且共用的控制器跨模型共享狀態"""
+        from ai_models.backends import MockBackend
+        from ai_models.chat_model import ChatModel
+        from ai_models.rate_limiter import AdmissionController, RateLimitedBackend
+        
+        class FlakyBackend(MockBackend):
+            def __init__(self):
+                super().__init__(latency=0.0)
+                self.failures = 2
+            
+            def complete(self, messages, model_name, temperature, context=None):
+                if self.failures:
+                    self.failures -= 1
+                    raise TimeoutError("upstream timeout")
+                return super().complete(messages, model_name, temperature, context)
+        
+        # Arrange
+        AdmissionController.reset_shared()
+        model_a = ChatModel(backend=RateLimitedBackend(FlakyBackend()))
+        model_b = ChatModel(backend=RateLimitedBackend(MockBackend(latency=0.0)))
+        
+        # Act
+        response = model_a.reply("你好")
+        model_b.reply("你好")
+        stats = model_b.backend.get_stats()
+        
+        # Assert
+        assert "SysTalk" in response
+        assert model_a.backend.controller is model_b.backend.controller
+        assert stats["admitted"] == 4
+        assert stats["overloaded"] == 2
+        with pytest.raises(TimeoutError):
+            RateLimitedBackend(FlakyBackend(), AdmissionController(), max_retries=1).complete(
+                [{"role": "user", "content": "你好"}], "gpt-3.5-turbo", 0.7
+            )
+        AdmissionController.reset_shared()
+    
+    def test_TC_UNIT_0084_cancelled_request_releases_concurrency_slot(self, run_async):
+        """TC-UNIT-0084: 驗證呼叫期限逾時取消的請求會歸還並行名額，後續請求不會卡住"""
+        from ai_models.backends import MockBackend
+        from ai_models.chat_model import ChatModel
+        from ai_models.rate_limiter import AdmissionController, AIMDLimiter, RateLimitedBackend
+        
+        # Arrange
+        controller = AdmissionController(limiter=AIMDLimiter(initial_limit=2, max_limit=2))
+        slow = ChatModel(backend=RateLimitedBackend(MockBackend(latency=0.3), controller))
+        fast = ChatModel(backend=RateLimitedBackend(MockBackend(latency=0.0), controller))
+        
+        async def scenario():
+            results = await asyncio.gather(
+                slow.areply("你好", deadline=0.05),
+                slow.areply("你好", deadline=0.05),
+                return_exceptions=True,
+            )
+            return results, await asyncio.wait_for(fast.areply("你好"), timeout=1.0)
+        
+        # Act
+        (first, second), response = run_async(scenario())
+        
+        # Assert
+        assert isinstance(first, TimeoutError) and isinstance(second, TimeoutError)
+        assert "SysTalk" in response
+        assert controller.get_stats()["in_flight"] == 0
+
+
+@pytest.mark.unit
+class TestChatModelHedging:
+    """聊天模型期限與對沖請求測試"""
+    
+    def test_TC_UNIT_0058_deadline_propagates_to_backend(self, run_async):
+        """TC-UNIT-0058: 驗證呼叫期限傳遞到後端，逾時拋出 TimeoutError 且不記錄對話"""
+        from ai_models.backends import MockBackend
+        from ai_models.chat_model import ChatModel
+        
+        # Arrange
+        model = ChatModel(backend=MockBackend(latency=0.3))
+        
+        # Act & Assert - 同步
+        start_time = time.perf_counter()
+        with pytest.raises(TimeoutError):
+            model.reply("你好", deadline=0.05)
+        assert time.perf_counter() - start_time < 0.2
+        
+        # Act & Assert - 非同步，asyncio 的逾時也轉成內建 TimeoutError
+        with pytest.raises(TimeoutError, match="請求期限") as exc_info:
+            run_async(model.areply("你好", deadline=0.05))
+        assert type(exc_info.value) is TimeoutError
+        assert model.get_conversation_history() == []
+        assert "SysTalk" in ChatModel(backend=MockBackend(latency=0.01)).reply("你好", deadline=1.0)
+    
+    def test_TC_UNIT_0059_hedged_request_wins_over_slow_primary(self, run_async):
+        """TC-UNIT-0059: 驗證主請求過慢時送出對沖請求，採用先完成者並記錄節省的延遲"""
+        import itertools
+        from ai_models.backends import MockBackend
+        from ai_models.chat_model import ChatModel
+        from ai_models.hedging import HedgedBackend, HedgingPolicy
+        
+        class FirstCallSlowBackend(MockBackend):
+            """每兩次呼叫中的第一次很慢"""
+            def __init__(self):
+                super().__init__(latency=0.0)
+                self.calls = itertools.count()
+            
+            def _delay(self):
+                return 0.3 if next(self.calls) % 2 == 0 else 0.01
+            
+            def complete(self, messages, model_name, temperature, context=None):
+                time.sleep(self._delay())
+                return self.generate(messages[-1]["content"])
+            
+            async def acomplete(self, messages, model_name, temperature, context=None):
+                await asyncio.sleep(self._delay())
+                return self.generate(messages[-1]["content"])
+        
+        for use_async in (False, True):
+            # Arrange
+            backend = HedgedBackend(FirstCallSlowBackend(), HedgingPolicy(initial_delay=0.03))
+            model = ChatModel(backend=backend)
+            
+            # Act
+            start_time = time.perf_counter()
+            response = run_async(model.areply("你好")) if use_async else model.reply("你好")
+            latency = time.perf_counter() - start_time
+            time.sleep(0.35)  # 讓同步模式中無法中斷的主請求跑完
+            stats = backend.get_stats()
+            
+            # Assert
+            assert "SysTalk" in response
+            assert latency < 0.2
+            assert stats["hedge_fired"] == 1
+            assert stats["hedge_wins"] == 1
+            assert stats["hedge_rate"] == 1.0
+            if not use_async:
+                assert stats["hedge_latency_saved"] > 0.2
+            backend.close()
+    
+    def test_TC_UNIT_0060_hedging_stats_recorded_in_metrics_layer(self):
+        """TC-UNIT-0060: 驗證對沖統計可寫入 AIMetricsCollector"""
+        from ai_models.backends import MockBackend
+        from ai_models.hedging import HedgedBackend
+        from monitoring.ai_metrics_collector import AIMetricsCollector
+        
+        class RecordingObservability:
+            def __init__(self):
+                self.metrics = {}
+            
+            def record_ai_metric(self, model_name, metric_name, value, labels=None):
+                self.metrics[metric_name] = (value, labels["component"])
+        
+        # Arrange
+        backend = HedgedBackend(MockBackend(latency=0.0))
+        backend.complete([{"role": "user", "content": "你好"}], "gpt-3.5-turbo", 0.7)
+        collector = AIMetricsCollector()
+        collector.observability = RecordingObservability()
+        
+        # Act
+        collector.record_performance_metrics("gpt-3.5-turbo", backend.get_stats())
+        
+        # Assert
+        assert collector.observability.metrics["performance.hedge_fired"] == (0.0, "hedging")
+        assert set(collector.observability.metrics) == {
+            "performance.hedge_fired", "performance.hedge_rate", "performance.hedge_latency_saved"
+        }
+        backend.close()
+    
+    def test_TC_UNIT_0089_hedging_policy_window_clock_and_deadline(self):
+        """TC-UNIT-0089: 驗證延遲視窗的百分位與完整排序一致、以後端的時鐘取樣，逾時時取消佇列中的對沖請求"""
+        import random
+        import threading
+        from ai_models.backends import MockBackend
+        from ai_models.clock import VirtualClock
+        from ai_models.deadline import deadline_scope
+        from ai_models.hedging import HedgedBackend, HedgingPolicy
+        
+        # Arrange
+        rng = random.Random(5)
+        policy = HedgingPolicy(percentile=90, min_samples=5, window=50)
+        messages = [{"role": "user", "content": "你好"}]
+        
+        # Act & Assert - 視窗滑動後百分位仍與重新排序的結果相同
+        samples = []
+        for _ in range(500):
+            latency = round(rng.expovariate(10), 3)
+            samples.append(latency)
+            policy.observe(latency)
+            window = sorted(samples[-50:])
+            assert policy.hedge_delay() == window[min(len(window) - 1, int(len(window) * 0.9))] or len(samples) < 5
+        assert policy.expected_remaining(0.1) == pytest.approx(
+            sum(x for x in samples[-50:] if x > 0.1) / len([x for x in samples[-50:] if x > 0.1]) - 0.1
+        )
+        
+        # 延遲樣本以 MockBackend 的虛擬時鐘量測
+        clock = VirtualClock()
+        backend = HedgedBackend(MockBackend(latency=0.5, clock=clock))
+        for _ in range(3):
+            backend.complete(messages, "gpt-3.5-turbo", 0.7)
+        assert list(backend.policy._latencies) == [0.5, 0.5, 0.5]
+        backend.close()
+        
+        # 期限逾時時，排在唯一執行緒之後的對沖請求不會再送出
+        class SlowBackend(MockBackend):
+            def __init__(self):
+                super().__init__(latency=0.0)
+                self.calls = 0
+                self.lock = threading.Lock()
+            
+            def complete(self, messages, model_name, temperature, context=None):
+                with self.lock:
+                    self.calls += 1
+                time.sleep(0.2)
+                return self.generate(messages[-1]["content"])
+        
+        inner = SlowBackend()
+        backend = HedgedBackend(inner, HedgingPolicy(initial_delay=0.02), max_workers=1)
+        with pytest.raises(TimeoutError):
+            with deadline_scope(0.1):
+                backend.complete(messages, "gpt-3.5-turbo", 0.7)
+        time.sleep(0.3)
+        assert inner.calls == 1
+        assert backend.get_stats()["hedge_fired"] == 1
+        backend.close()
+    
+    def test_TC_UNIT_0091_chat_model_hedging_option_exports_stats(self):
+        """TC-UNIT-0091: 驗證 ChatModel 的對沖選項可逐次關閉，關閉模型時對沖統計寫入 AIMetricsCollector"""
+        import itertools
+        from ai_models.backends import MockBackend
+        from ai_models.chat_model import ChatModel
+        from ai_models.hedging import HedgingPolicy
+        from monitoring.ai_metrics_collector import AIMetricsCollector
+        
+        class FirstCallSlowBackend(MockBackend):
+            def __init__(self):
+                super().__init__(latency=0.0)
+                self.calls = itertools.count()
+            
+            def complete(self, messages, model_name, temperature, context=None):
+                time.sleep(0.3 if next(self.calls) == 0 else 0.01)
+                return self.generate(messages[-1]["content"])
+        
+        class RecordingObservability:
+            def __init__(self):
+                self.metrics = {}
+            
+            def record_ai_metric(self, model_name, metric_name, value, labels=None):
+                self.metrics[metric_name] = value
+        
+        # Arrange
+        collector = AIMetricsCollector()
+        collector.observability = RecordingObservability()
+        model = ChatModel(
+            backend=FirstCallSlowBackend(),
+            hedging_policy=HedgingPolicy(initial_delay=0.03),
+            metrics_collector=collector,
+        )
+        
+        # Act
+        start_time = time.perf_counter()
+        response = model.reply("你好")
+        hedged_latency = time.perf_counter() - start_time
+        model.reply("你好", hedge=False, use_cache=False)
+        time.sleep(0.35)  # 讓無法中斷的主請求跑完
+        model.close()
+        
+        # Assert
+        assert "SysTalk" in response
+        assert hedged_latency < 0.2
+        assert model.hedged_backend.get_stats()["requests"] == 1
+        assert collector.observability.metrics["performance.hedge_fired"] == 1.0
+        assert collector.observability.metrics["performance.hedge_rate"] == 1.0
+        assert collector.observability.metrics["performance.hedge_latency_saved"] > 0.2
+    
+    def test_TC_UNIT_0092_hedge_delay_waited_on_virtual_clock(self, run_async):
+        """TC-UNIT-0092: 驗證虛擬時鐘下以邏輯時間判斷對沖時機，不以真實時間等待"""
+        from ai_models.backends import MockBackend
+        from ai_models.chat_model import ChatModel
+        from ai_models.clock import VirtualClock
+        from ai_models.hedging import HedgingPolicy
+        
+        for use_async in (False, True):
+            # Arrange - 邏輯延遲 5 秒的後端超過 1 秒的對沖等待；0.5 秒的不超過
+            clock = VirtualClock()
+            slow = ChatModel(
+                backend=MockBackend(latency=5.0, clock=clock), clock=clock,
+                hedging_policy=HedgingPolicy(initial_delay=1.0)
+            )
+            fast = ChatModel(
+                backend=MockBackend(latency=0.5, clock=clock), clock=clock,
+                hedging_policy=HedgingPolicy(initial_delay=1.0)
+            )
+            
+            # Act
+            wall_start = time.perf_counter()
+            for model in (slow, fast):
+                if use_async:
+                    run_async(model.areply("你好"))
+                else:
+                    model.reply("你好")
+            wall_time = time.perf_counter() - wall_start
+            
+            # Assert
+            assert wall_time < 0.5
+            assert slow.hedged_backend.get_stats()["hedge_fired"] == 1
+            assert fast.hedged_backend.get_stats()["hedge_fired"] == 0
+            slow.close()
+            fast.close()
+
+
+@pytest.mark.unit
+class TestChatModelSingleFlight:
+    """聊天模型相同請求合併 (single-flight) 測試"""
+    
+    @staticmethod
+    def counting_backend(latency=0.05):
+        """計算實際呼叫次數的 Mock 後端"""
+        from ai_models.backends import MockBackend
+        
+        class CountingBackend(MockBackend):
+            def __init__(self):
+                super().__init__(latency=latency)
+                self.calls = 0
+            
+            def generate(self, prompt, context=None):
+                self.calls += 1
+                return super().generate(prompt, context)
+        
+        return CountingBackend()
+    
+    def test_TC_UNIT_0061_threaded_identical_requests_share_one_call(self):
+        """TC-UNIT-0061: 驗證多執行緒同時送出的相同請求只呼叫一次後端"""
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+        from ai_models.chat_model import ChatModel
+        from ai_models.single_flight import SingleFlightBackend
+        
+        # Arrange
+        inner = self.counting_backend()
+        backend = SingleFlightBackend(inner)
+        barrier = threading.Barrier(10)
+        
+        def simulated_user(i):
+            model = ChatModel(backend=backend)
+            barrier.wait()
+            # 正規化後相同的 prompt 也會合併
+            return model.reply("你好" if i % 2 else "  你好 ")
+        
+        # Act
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            responses = list(executor.map(simulated_user, range(10)))
+        stats = backend.get_stats()
+        
+        # Assert
+        assert len(set(responses)) == 1
+        assert inner.calls == 1
+        assert stats["collapsed"] == 9
+        assert stats["backend_calls"] == 1
+    
+    def test_TC_UNIT_0062_asyncio_requests_collapse_by_key(self, run_async):
+        """TC-UNIT-0062: 驗證 asyncio 呼叫端依請求內容合併，不同內容或上下文不合併"""
+        from ai_models.chat_model import ChatModel
+        from ai_models.single_flight import SingleFlightBackend
+        
+        # Arrange
+        inner = self.counting_backend()
+        backend = SingleFlightBackend(inner)
+        
+        async def scenario():
+            models = [ChatModel(backend=backend) for _ in range(8)]
+            return await asyncio.gather(
+                *(model.areply("查詢帳戶餘額") for model in models[:4]),
+                models[4].areply("今天天氣如何"),
+                models[5].areply("查詢帳戶餘額", context={"user_id": "u1"}),
+                models[6].areply("查詢帳戶餘額", context={"user_id": "u1"}),
+                models[7].areply("查詢帳戶餘額", context={"user_id": "u2"}),
+            )
+        
+        # Act
+        responses = run_async(scenario())
+        stats = backend.get_stats()
+        
+        # Assert
+        assert len(responses) == 8
+        assert inner.calls == 4
+        assert stats["requests"] == 8
+        assert stats["collapsed"] == 4
+        
+        # 請求完成後不再合併
+        run_async(ChatModel(backend=backend).areply("查詢帳戶餘額"))
+        assert inner.calls == 5
+    
+    def test_TC_UNIT_0083_cancelled_follower_does_not_cancel_shared_call(self, run_async):
+        """TC-UNIT-0083: 驗證跟隨的呼叫端逾時取消時，帶頭與其他呼叫端仍取得結果"""
+        from ai_models.chat_model import ChatModel
+        from ai_models.single_flight import SingleFlightBackend
+        
+        # Arrange
+        inner = self.counting_backend(latency=0.2)
+        backend = SingleFlightBackend(inner)
+        
+        async def scenario():
+            models = [ChatModel(backend=backend) for _ in range(3)]
+            leader = asyncio.ensure_future(models[0].areply("查詢帳戶餘額"))
+            await asyncio.sleep(0.01)
+            return await asyncio.gather(
+                leader,
+                asyncio.wait_for(models[1].areply("查詢帳戶餘額"), timeout=0.05),
+                models[2].areply("查詢帳戶餘額"),
+                return_exceptions=True,
+            )
+        
+        # Act
+        leader_response, cancelled, follower_response = run_async(scenario())
+        
+        # Assert
+        assert isinstance(cancelled, asyncio.TimeoutError)
+        assert isinstance(leader_response, str)
+        assert follower_response == leader_response
+        assert inner.calls == 1
+
+
+@pytest.mark.unit
+class TestChatModelUsageMetering:
+    """聊天模型用量計量測試"""
+    
+    def test_TC_UNIT_0063_usage_breakdown_by_test_marker_and_model(self):
+        """TC-UNIT-0063: 驗證用量依測試、標記與模型分組，多執行緒累加後合併結果正確"""
+        from concurrent.futures import ThreadPoolExecutor
+        from ai_models.usage_meter import UsageMeter
+        
+        # Arrange
+        meter = UsageMeter(pricing={"custom-model": (1.0, 2.0)})
+        
+        # Act
+        meter.set_scope("test_a", ["smoke", "ai_model"])
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(lambda _: meter.record("gpt-4", 100, 50, 0.2), range(40)))
+        meter.set_scope("test_b", ["smoke"])
+        meter.record("custom-model", 1000, 500, 1.0)
+        meter.record("unknown-model", 10, 10, 0.1)
+        meter.clear_scope()
+        
+        by_test = meter.breakdown(by="test")
+        by_marker = meter.breakdown(by="marker")
+        by_model = meter.breakdown(by="model")
+        
+        # Assert
+        assert by_test["test_a"]["calls"] == 40
+        assert by_test["test_a"]["total_tokens"] == 40 * 150
+        assert by_test["test_a"]["cost"] == pytest.approx(40 * (100 * 0.03 + 50 * 0.06) / 1000)
+        assert by_test["test_a"]["avg_latency"] == pytest.approx(0.2)
+        assert by_marker["smoke"]["calls"] == 42
+        assert by_marker["ai_model"]["calls"] == 40
+        assert by_model["custom-model"]["cost"] == pytest.approx(2.0)
+        assert by_model["unknown-model"]["cost"] == 0.0
+        assert [test_id for test_id, _ in meter.top_consumers(2)] == ["test_a", "test_b"]
+        
+        with pytest.raises(ValueError):
+            meter.breakdown(by="user")
+        meter.reset()
+        assert meter.merge() == []
+    
+    def test_TC_UNIT_0064_chat_model_meters_backend_calls_only(self):
+        """TC-UNIT-0064: 驗證 reply、串流與批次呼叫都記錄用量，快取命中不計，prompt 含對話歷史"""
+        from ai_models.backends import MockBackend
+        from ai_models.chat_model import ChatModel
+        from ai_models.response_cache import ResponseCache
+        from ai_models.usage_meter import UsageMeter
+        
+        # Arrange
+        meter = UsageMeter()
+        model = ChatModel(backend=MockBackend(latency=0.0), cache=ResponseCache(), usage_meter=meter)
+        meter.set_scope("usage_test")
+        
+        # Act
+        first = model.reply("你好")
+        usage_after_first = meter.breakdown(by="test")["usage_test"]
+        model.clear_history()
+        model.reply("你好")  # 快取命中
+        model.clear_history()
+        second = model.reply("查詢帳戶餘額")
+        "".join(model.reply_stream("今天天氣如何"))
+        model.reply_batch(["你好", "", "謝謝"])
+        usage = meter.breakdown(by="test")["usage_test"]
+        
+        # Assert
+        assert usage_after_first["prompt_tokens"] == model.estimate_tokens("你好")
+        assert usage_after_first["completion_tokens"] == model.estimate_tokens(first)
+        assert usage["calls"] == 5
+        # 串流的 prompt 包含上一輪對話
+        history_tokens = model.estimate_tokens("查詢帳戶餘額") + model.estimate_tokens(second)
+        assert usage["prompt_tokens"] > history_tokens
+        assert set(meter.breakdown(by="model")) == {"gpt-3.5-turbo"}
+    
+    def test_TC_UNIT_0065_usage_exported_to_ai_metrics(self):
+        """TC-UNIT-0065: 驗證依模型彙總的用量可寫入 AIMetricsCollector"""
+        from ai_models.usage_meter import UsageMeter
+        from monitoring.ai_metrics_collector import AIMetricsCollector
+        
+        class RecordingObservability:
+            def __init__(self):
+                self.metrics = {}
+            
+            def record_ai_metric(self, model_name, metric_name, value, labels=None):
+                self.metrics[(model_name, metric_name)] = (value, labels["component"])
+        
+        # Arrange
+        meter = UsageMeter()
+        meter.record("gpt-4", 1000, 1000, 0.5)
+        meter.record("gpt-4", 1000, 0, 1.5)
+        collector = AIMetricsCollector()
+        collector.observability = RecordingObservability()
+        
+        # Act
+        meter.export(collector)
+        metrics = collector.observability.metrics
+        
+        # Assert
+        assert metrics[("gpt-4", "performance.token_count")] == (3000.0, "tokens")
+        assert metrics[("gpt-4", "performance.prompt_tokens")] == (2000.0, "usage")
+        assert metrics[("gpt-4", "performance.completion_tokens")] == (1000.0, "usage")
+        assert metrics[("gpt-4", "performance.cost")][0] == pytest.approx(0.12)
+        assert metrics[("gpt-4", "performance.latency")][0] == pytest.approx(1.0)
+
+
+@pytest.mark.unit
+class TestChatModelVirtualClock:
+    """聊天模型虛擬時鐘測試"""
+    
+    def test_TC_UNIT_0066_virtual_clock_skips_simulated_latency(self):
+        """TC-UNIT-0066: 驗證虛擬時鐘下模擬延遲不實際等待，但以時鐘量到的延遲與設定相同"""
+        from ai_models.chat_model import ChatModel
+        from ai_models.clock import VirtualClock
+        from ai_models.backends import MockBackend
+        from ai_models.usage_meter import UsageMeter
+        
+        # Arrange
+        clock = VirtualClock()
+        meter = UsageMeter()
+        model = ChatModel(
+            backend=MockBackend(latency=0.5, token_rate=10, clock=clock), clock=clock, usage_meter=meter,
+            history_token_budget=200
+        )
+        
+        # Act
+        wall_start = time.perf_counter()
+        for i in range(200):
+            model.reply(f"問題 {i}", use_cache=False)
+        stream = model.reply_stream("你好")
+        text = stream.read()
+        wall_time = time.perf_counter() - wall_start
+        
+        # Assert - 200 次 0.5 秒的模擬延遲共 100 秒，實際幾乎不耗時
+        assert wall_time < 1.0
+        assert meter.breakdown(by="model")["gpt-3.5-turbo"]["calls"] == 201
+        assert stream.metrics.ttft == pytest.approx(0.5)
+        assert stream.metrics.total_time == pytest.approx(0.5 + (stream.metrics.token_count - 1) * 0.1)
+        assert clock.now() == pytest.approx(200 * 0.5 + stream.metrics.total_time)
+        assert len(text) > 0
+    
+    def test_TC_UNIT_0067_virtual_clock_async_and_deadline(self, run_async):
+        """TC-UNIT-0067: 驗證非同步呼叫也推進虛擬時鐘，呼叫期限仍然生效"""
+        from ai_models.chat_model import ChatModel
+        from ai_models.clock import VirtualClock
+        
+        # Arrange
+        clock = VirtualClock(start=100.0)
+        model = ChatModel(clock=clock)
+        
+        async def scenario():
+            return await asyncio.gather(*(model.areply(f"問題 {i}", session_id=i) for i in range(50)))
+        
+        # Act
+        responses = run_async(scenario())
+        
+        # Assert - 同時進行的 sleep 依序累加
+        assert len(responses) == 50
+        assert clock.now() == pytest.approx(100.0 + 50 * 0.01)
+        with pytest.raises(TimeoutError):
+            model.reply("你好", deadline=0.001)
+        with pytest.raises(ValueError):
+            clock.advance(-1)
+    
+    def test_TC_UNIT_0086_deadline_measured_on_model_clock(self, run_async):
+        """TC-UNIT-0086: 驗證呼叫期限以模型的時鐘計時：虛擬時鐘下只看邏輯時間，不受真實耗時影響"""
+        from ai_models.backends import MockBackend
+        from ai_models.chat_model import ChatModel
+        from ai_models.clock import VirtualClock
+        from ai_models.deadline import deadline_scope, remaining_time
+        
+        class RealWorkBackend(MockBackend):
+            """實際花費真實時間（例如前處理），但只推進少量邏輯時間"""
+            async def acomplete(self, messages, model_name, temperature, context=None):
+                await asyncio.sleep(0.05)
+                return await super().acomplete(messages, model_name, temperature, context)
+        
+        # Arrange
+        clock = VirtualClock()
+        slow = ChatModel(backend=MockBackend(latency=0.5, clock=clock), clock=clock)
+        busy = ChatModel(backend=RealWorkBackend(latency=0.001, clock=clock), clock=clock)
+        
+        # Act & Assert - 邏輯時間超過期限時剛好在期限時逾時
+        with pytest.raises(TimeoutError):
+            slow.reply("你好", deadline=0.2)
+        assert clock.now() == pytest.approx(0.2)
+        with pytest.raises(TimeoutError):
+            run_async(slow.areply("你好", deadline=0.2))
+        assert clock.now() == pytest.approx(0.4)
+        assert "SysTalk" in slow.reply("你好", deadline=1.0)
+        
+        # 真實時間超過期限但邏輯時間未超過，不會逾時
+        assert "SysTalk" in run_async(busy.areply("你好", deadline=0.01))
+        
+        # 巢狀期限取較早者，內層的邏輯時鐘期限較早時以它計算
+        with deadline_scope(10.0):
+            with deadline_scope(0.3, clock):
+                clock.advance(0.1)
+                assert remaining_time() == pytest.approx(0.2)
+            with deadline_scope(20.0, clock):
+                assert remaining_time() == pytest.approx(10.0, abs=0.5)
+
+
+@pytest.mark.unit
+class TestChatModelLatencyModel:
+    """Mock 後端延遲與故障模型測試"""
+    
+    def test_TC_UNIT_0068_latency_distributions(self):
+        """TC-UNIT-0068: 驗證對數常態、慢尾端混合與依 token 計算的延遲分佈，且相同 seed 可重現"""
+        import random
+        import statistics
+        from ai_models.latency_model import FixedLatency, LogNormalLatency, MixtureLatency, TokenLatency
+        
+        # Arrange
+        rng = random.Random(42)
+        messages = [{"role": "user", "content": "你好"}]
+        log_normal = LogNormalLatency(median=0.1, sigma=0.5, max_latency=0.3)
+        slow_tail = MixtureLatency.slow_tail(FixedLatency(0.01), FixedLatency(1.0), tail_probability=0.1)
+        per_token = TokenLatency(base=0.05, per_token=0.001)
+        
+        # Act
+        log_normal_samples = [log_normal.sample(rng, messages) for _ in range(5000)]
+        slow_tail_samples = [slow_tail.sample(rng, messages) for _ in range(5000)]
+        short = per_token.sample(rng, messages)
+        long = per_token.sample(rng, [{"role": "user", "content": "字" * 2000}])
+        
+        # Assert
+        assert statistics.median(log_normal_samples) == pytest.approx(0.1, rel=0.05)
+        assert max(log_normal_samples) == 0.3
+        assert slow_tail_samples.count(1.0) / len(slow_tail_samples) == pytest.approx(0.1, abs=0.02)
+        assert long - short == pytest.approx(0.001 * (1000 - 1))
+        assert [LogNormalLatency(0.1).sample(random.Random(7), messages) for _ in range(3)] == \
+            [LogNormalLatency(0.1).sample(random.Random(7), messages) for _ in range(3)]
+        with pytest.raises(ValueError):
+            MixtureLatency([])
+    
+    def test_TC_UNIT_0069_failure_injection(self):
+        """TC-UNIT-0069: 驗證注入的逾時、5xx 與中斷串流，5xx 可被流量控制後端辨識並重送"""
+        import httpx
+        from ai_models.backends import MockBackend
+        from ai_models.clock import VirtualClock
+        from ai_models.latency_model import FailureModel
+        from ai_models.rate_limiter import AdmissionController, AIMDLimiter, RateLimitedBackend
+        
+        # Arrange
+        clock = VirtualClock()
+        messages = [{"role": "user", "content": "查詢帳戶餘額"}]
+        
+        # Act / Assert - 逾時等待 timeout_after 後拋出 TimeoutError
+        backend = MockBackend(clock=clock, failure_model=FailureModel(timeout_rate=1.0, timeout_after=30.0))
+        with pytest.raises(TimeoutError):
+            backend.complete(messages, "gpt-3.5-turbo", 0.7)
+        assert clock.now() == pytest.approx(30.0)
+        
+        # 5xx 與 HttpxBackend 相同型別
+        backend = MockBackend(clock=clock, failure_model=FailureModel(server_error_rate=1.0, server_error_codes=(502,)))
+        with pytest.raises(httpx.HTTPStatusError) as excinfo:
+            backend.complete(messages, "gpt-3.5-turbo", 0.7)
+        assert excinfo.value.response.status_code == 502
+        
+        # 中斷的串流先輸出部分內容
+        backend = MockBackend(clock=clock, failure_model=FailureModel(partial_stream_rate=1.0), seed=3)
+        received = []
+        with pytest.raises(ConnectionError):
+            for chunk in backend.stream(messages, "gpt-3.5-turbo", 0.7):
+                received.append(chunk)
+        assert len("".join(received)) < len(backend.generate("查詢帳戶餘額"))
+        assert backend.complete(messages, "gpt-3.5-turbo", 0.7)  # 非串流請求不受影響
+        
+        # 503 與逾時經流量控制後端重送
+        flaky = MockBackend(
+            clock=clock, seed=1,
+            failure_model=FailureModel(timeout_rate=0.1, server_error_rate=0.2, server_error_codes=(503,))
+        )
+        backend = RateLimitedBackend(flaky, AdmissionController(limiter=AIMDLimiter()), max_retries=10)
+        responses = [backend.complete(messages, "gpt-3.5-turbo", 0.7) for _ in range(200)]
+        stats = flaky.get_stats()
+        assert len(responses) == 200
+        assert stats["calls"] == 200 + stats["timeout"] + stats["server_error"]
+        assert stats["server_error"] > stats["timeout"] > 0
+        with pytest.raises(ValueError):
+            FailureModel(timeout_rate=0.6, server_error_rate=0.6)
+
+
+@pytest.mark.unit
+class TestChatModelFanOut:
+    """多模型並行比較測試"""
+    
+    def test_TC_UNIT_0070_fan_out_compares_against_baseline(self):
+        """TC-UNIT-0070: 驗證多模型並行呼叫後每筆資料都與基準模型比較，錯誤不影響其他模型"""
+        from ai_models.backends import MockBackend
+        from ai_models.chat_model import ChatModel
+        from ai_models.fan_out import ModelFanOut
+        from ai_models.latency_model import FailureModel
+        
+        # Arrange
+        fan_out = ModelFanOut({
+            "baseline": ChatModel(temperature=0.1, backend=MockBackend(latency=0.0)),
+            "candidate": ChatModel(temperature=0.9, backend=MockBackend(latency=0.0)),
+            "broken": ChatModel(backend=MockBackend(latency=0.0, failure_model=FailureModel(server_error_rate=1.0))),
+        }, max_workers=4)
+        prompts = ["你好", "查詢帳戶餘額", "今天天氣如何"]
+        
+        # Act
+        result = fan_out.compare(prompts)
+        
+        # Assert
+        assert result["responses"]["baseline"] == result["responses"]["candidate"]
+        assert result["responses"]["broken"] == [None, None, None]
+        assert len(result["errors"]) == 3
+        assert sorted(c["index"] for c in result["comparisons"]) == [0, 1, 2]
+        assert all(c["model"] == "candidate" and c["similarity"] == 1.0 for c in result["comparisons"])
+        # 每筆資料使用獨立對話，結束後釋放
+        assert all(len(model.sessions) == 0 for model in fan_out.models.values())
+        assert len(fan_out.models["baseline"].get_conversation_history()) == 0
+        with pytest.raises(ValueError):
+            fan_out.compare("你好", baseline="unknown")
+    
+    def test_TC_UNIT_0087_fan_out_sessions_per_run_and_clock_latency(self):
+        """TC-UNIT-0087: 驗證每次執行與每個模型使用不同對話，延遲以模型的時鐘計時"""
+        from concurrent.futures import ThreadPoolExecutor
+        from ai_models.backends import MockBackend
+        from ai_models.chat_model import ChatModel
+        from ai_models.clock import VirtualClock
+        from ai_models.fan_out import ModelFanOut
+        
+        class RecordingChatModel(ChatModel):
+            def __init__(self, **kwargs):
+                super().__init__(**kwargs)
+                self.session_ids = []
+            
+            def reply(self, prompt, context=None, use_cache=True, session_id=None, deadline=None):
+                self.session_ids.append(session_id)
+                return super().reply(prompt, context, use_cache, session_id, deadline)
+        
+        # Arrange - 同一個模型以兩個名稱出現
+        clock = VirtualClock()
+        model = RecordingChatModel(backend=MockBackend(latency=0.5, clock=clock), clock=clock)
+        fan_out = ModelFanOut({"a": model, "b": model}, max_workers=4)
+        
+        # Act - 兩次執行同時進行
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            runs = list(executor.map(lambda _: list(fan_out.run(["你好", "查詢帳戶餘額"])), range(2)))
+        # 依序呼叫，虛擬時鐘量到的延遲不含其他請求的模擬延遲
+        result = ModelFanOut({"a": model, "b": model}, max_workers=1).compare("你好")
+        
+        # Assert
+        assert len(model.session_ids) == 10
+        assert len(set(model.session_ids)) == 10
+        assert {session_id[2:] for session_id in model.session_ids} == {("a", 0), ("a", 1), ("b", 0), ("b", 1)}
+        assert all(r["error"] is None for run in runs for r in run)
+        assert result["model_time"] == {"a": pytest.approx(0.5), "b": pytest.approx(0.5)}
+        assert result["wall_time"] == pytest.approx(1.0)
+        assert len(model.sessions) == 0
+
+
+@pytest.mark.unit
+class TestChatModelSessionStore:
+    """聊天模型對話冷資料層測試"""
+    
+    def test_TC_UNIT_0071_history_binary_encoding_round_trip(self):
+        """TC-UNIT-0071: 驗證對話歷史二進位編碼可完整還原，且比 JSON 精簡"""
+        import json
+        from ai_models.session_store import decode_history, encode_history
+        
+        # Arrange
+        entries = [
+            ({"role": "system", "content": "你是客服助理"}, 6),
+            ({"role": "user", "content": "查詢帳戶餘額 😀"}, 7),
+            ({"role": "assistant", "content": "您的帳戶餘額為 NT$ 50,000"}, 300),
+            ({"role": "tool", "content": ""}, 0),
+        ]
+        long_entries = [({"role": "user", "content": "重複的內容 " * 200}, 1200)]
+        
+        # Act
+        encoded = encode_history(entries)
+        long_encoded = encode_history(long_entries)
+        
+        # Assert
+        assert decode_history(encoded) == entries
+        assert decode_history(long_encoded) == long_entries
+        assert decode_history(encode_history([])) == []
+        assert len(encoded) < len(json.dumps([m for m, _ in entries], ensure_ascii=False).encode("utf-8"))
+        assert len(long_encoded) < len(long_entries[0][0]["content"].encode("utf-8")) / 10  # 長內容會壓縮
+        with pytest.raises(ValueError):
+            decode_history(b"\x07")
+    
+    def test_TC_UNIT_0072_evicted_sessions_spill_to_sqlite(self, tmp_path):
+        """TC-UNIT-0072: 驗證淘汰的對話寫入 SQLite，再次使用時載回完整歷史"""
+        from ai_models.backends import MockBackend
+        from ai_models.chat_model import ChatModel
+        from ai_models.session_store import SQLiteSessionStore
+        
+        # Arrange
+        store = SQLiteSessionStore(str(tmp_path / "sessions.db"), commit_every=2)
+        model = ChatModel(backend=MockBackend(latency=0.0), max_sessions=2, session_store=store)
+        
+        # Act
+        for user in range(5):
+            model.reply(f"我是使用者 {user}", session_id=f"user-{user}")
+        model.reply("查詢帳戶餘額", session_id="user-0")
+        history = model.get_conversation_history(session_id="user-0")
+        stats = model.sessions.get_stats()
+        
+        # Assert
+        assert [m["content"] for m in history[::2]] == ["我是使用者 0", "查詢帳戶餘額"]
+        restored_tokens = model.sessions.get("user-0").history.total_tokens
+        assert restored_tokens == sum(model.estimate_tokens(m["content"]) for m in history)
+        assert stats["active_sessions"] == 2
+        assert stats["stored_sessions"] == 3
+        assert stats["restored"] == 1
+        assert stats["created"] == 5
+        assert "user-1" in model.sessions
+        assert model.end_session("user-1")
+        assert "user-1" not in model.sessions
+        model.close()
+        assert len(store) == 0
+        store.close()
+    
+    def test_TC_UNIT_0085_turn_recorded_when_session_spilled_mid_request(self, run_async):
+        """TC-UNIT-0085: 驗證請求進行中對話被淘汰時，這一輪仍寫回冷資料層或重新載入的對話"""
+        from ai_models.backends import MockBackend
+        from ai_models.chat_model import ChatModel
+        from ai_models.session_store import MemorySessionStore
+        
+        class SlowPromptBackend(MockBackend):
+            async def acomplete(self, messages, model_name, temperature, context=None):
+                if "慢" in messages[-1]["content"]:
+                    await asyncio.sleep(0.1)
+                return await super().acomplete(messages, model_name, temperature, context)
+        
+        # Arrange
+        model = ChatModel(backend=SlowPromptBackend(latency=0.0), max_sessions=1, session_store=MemorySessionStore())
+        
+        async def scenario():
+            # user-a 在等待後端時被 user-b 擠出記憶體，完成後沒有人重新載入
+            slow = asyncio.ensure_future(model.areply("慢速查詢", session_id="user-a"))
+            await asyncio.sleep(0.02)
+            await model.areply("你好", session_id="user-b")
+            await slow
+            # user-c 等待期間被擠出後又被另一個請求載回記憶體
+            slow = asyncio.ensure_future(model.areply("慢速查詢", session_id="user-c"))
+            await asyncio.sleep(0.02)
+            await model.areply("你好", session_id="user-b")
+            await model.areply("你好", session_id="user-c")
+            await slow
+        
+        # Act
+        run_async(scenario())
+        
+        # Assert
+        assert [m["content"] for m in model.get_conversation_history(session_id="user-a")[::2]] == ["慢速查詢"]
+        assert [m["content"] for m in model.get_conversation_history(session_id="user-c")[::2]] == ["你好", "慢速查詢"]
+    
+    def test_TC_UNIT_0090_concurrent_restore_and_stale_session_turn(self):
+        """TC-UNIT-0090: 驗證同時載入同一個淘汰的對話不會遺失歷史，過期的對話物件不會覆寫較新的歷史"""
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+        from ai_models.session_manager import SessionManager
+        from ai_models.session_store import MemorySessionStore
+        
+        class SlowLoadStore(MemorySessionStore):
+            def load(self, session_id):
+                time.sleep(0.05)
+                return super().load(session_id)
+        
+        # Arrange
+        store = SlowLoadStore()
+        manager = SessionManager(len, max_sessions=1, store=store)
+        manager.record_turn(manager.get("a"), "第一輪", "回應一")
+        manager.get("b")  # 淘汰 a
+        barrier = threading.Barrier(4)
+        
+        def restore(_):
+            barrier.wait()
+            return manager.get("a")
+        
+        # Act - 同時載入
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            sessions = list(executor.map(restore, range(4)))
+        
+        # Assert
+        assert all(session is sessions[0] for session in sessions)
+        assert [m["content"] for m in sessions[0].snapshot()] == ["第一輪", "回應一"]
+        assert manager.get_stats()["restored"] == 1
+        
+        # Act - 過期的 stale 物件在 a 被重新載入、記錄、再淘汰之後才記錄這一輪
+        stale = sessions[0]
+        manager.get("b")  # 淘汰 a
+        manager.record_turn(manager.get("a"), "第二輪", "回應二")
+        manager.get("b")  # 再次淘汰 a
+        manager.record_turn(stale, "第三輪", "回應三")
+        
+        # Assert
+        contents = [m["content"] for m in manager.get("a").snapshot()]
+        assert contents == ["第一輪", "回應一", "第二輪", "回應二", "第三輪", "回應三"]
+
+
+@pytest.mark.unit
+class TestChatModelConversationRunner:
+    """腳本化對話執行器測試"""
+    
+    @staticmethod
+    def recording_backend():
+        """記錄每個請求的對話歷史長度，並追蹤同時進行的請求數"""
+        import threading
+        from ai_models.backends import MockBackend
+        
+        class RecordingBackend(MockBackend):
+            def __init__(self):
+                super().__init__(latency=0.005)
+                self.lock = threading.Lock()
+                self.requests = []
+                self.in_flight = 0
+                self.max_in_flight = 0
+            
+            def complete(self, messages, model_name, temperature, context=None):
+                with self.lock:
+                    self.in_flight += 1
+                    self.max_in_flight = max(self.max_in_flight, self.in_flight)
+                    self.requests.append((messages[-1]["content"], len(messages)))
+                try:
+                    return super().complete(messages, model_name, temperature, context)
+                finally:
+                    with self.lock:
+                        self.in_flight -= 1
+        
+        return RecordingBackend()
+    
+    def test_TC_UNIT_0073_turns_interleave_but_stay_ordered(self):
+        """TC-UNIT-0073: 驗證不同對話的輪次交錯並行，同一對話依序執行且帶有完整歷史"""
+        from ai_models.chat_model import ChatModel
+        from ai_models.conversation_runner import ConversationRunner, ConversationScript
+        
+        # Arrange
+        backend = self.recording_backend()
+        model = ChatModel(backend=backend)
+        scripts = [
+            ConversationScript(f"c{c}", [
+                f"c{c} 第 {t} 輪" if t != 2 else {"user": f"c{c} 第 {t} 輪", "verify": lambda r, c=c: c % 2 == 0}
+                for t in range(4)
+            ])
+            for c in range(6)
+        ]
+        
+        # Act
+        result = ConversationRunner(model, max_workers=4).run(scripts)
+        
+        # Assert - 每一輪送出時都帶著同一對話先前所有輪次的歷史
+        assert all(length == 2 * int(prompt.split()[2]) + 1 for prompt, length in backend.requests)
+        for c in range(6):
+            order = [int(prompt.split()[2]) for prompt, _ in backend.requests if prompt.startswith(f"c{c} ")]
+            assert order == [0, 1, 2, 3]
+            assert len(result["conversations"][f"c{c}"]["turn_latencies"]) == 4
+        assert backend.max_in_flight > 1
+        assert result["failures"] == 3
+        assert result["conversations"]["c1"]["failures"][0]["turn"] == 2
+        assert result["turn_latency"]["count"] == 24
+        assert result["conversation_latency"]["max"] >= result["turn_latency"]["max"]
+        assert len(model.sessions) == 0
+        with pytest.raises(ValueError):
+            ConversationRunner(model).run([ConversationScript("dup", ["a"]), ConversationScript("dup", ["b"])])
+    
+    def test_TC_UNIT_0074_async_runner_and_errors(self, run_async):
+        """TC-UNIT-0074: 驗證非同步執行器依序執行各對話，錯誤只中止該對話"""
+        from ai_models.backends import MockBackend
+        from ai_models.chat_model import ChatModel
+        from ai_models.conversation_runner import ConversationRunner, ConversationScript
+        
+        class FailingBackend(MockBackend):
+            async def acomplete(self, messages, model_name, temperature, context=None):
+                if "故障" in messages[-1]["content"]:
+                    raise ConnectionError("upstream down")
+                return await super().acomplete(messages, model_name, temperature, context)
+        
+        # Arrange
+        model = ChatModel(backend=FailingBackend(latency=0.0))
+        runner = ConversationRunner(model, max_workers=2, keep_sessions=True)
+        scripts = [
+            ConversationScript("ok", ["你好", "查詢帳戶餘額", "謝謝"]),
+            ConversationScript("broken", ["你好", "故障", "謝謝"]),
+        ]
+        
+        # Act
+        result = run_async(runner.arun(scripts))
+        
+        # Assert
+        assert len(result["conversations"]["ok"]["responses"]) == 3
+        assert isinstance(result["conversations"]["broken"]["error"], ConnectionError)
+        assert len(result["conversations"]["broken"]["responses"]) == 1
+        assert result["failures"] == 1
+        assert [m["content"] for m in model.get_conversation_history("ok")[::2]] == ["你好", "查詢帳戶餘額", "謝謝"]